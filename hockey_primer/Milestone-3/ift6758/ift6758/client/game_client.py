@@ -8,7 +8,9 @@ import math
 import time
 
 # Assuming ift6758_milestone3 contains the provided helper functions
-from ift6758.client.ift6758_milestone3 import get_play_data, add_features, fetch_game_data
+from ift6758.client.ift6758_milestone3 import get_play_data, get_game_data, game_table, add_features, fetch_game_data, \
+    TEAM_COLUMNS
+from ift6758.data import jsonio
 
 class GameClient:
     def __init__(self):
@@ -33,13 +35,16 @@ class GameClient:
         self.model_df_length = self.game.shape[0]
    
     def ping_game(self, file_path):
-        with open(file_path, 'r') as file:
-            game_data = json.load(file)
+        # Only decode the fields get_play_data reads
+        game_data = jsonio.load(file_path, schema='web')
 
         # Process the game data to get a DataFrame
+        games = game_table([get_game_data(game_data)])
         df_game_tidied = pd.DataFrame([x for x in get_play_data(game_data)])
         print(df_game_tidied.columns)
-        df_game_features = add_features(df_game_tidied)
+        df_game_features = add_features(df_game_tidied, games)
+        # The dashboard shows the teams of the game with every event
+        df_game_features = df_game_features.join(games[TEAM_COLUMNS], on='gamePk')
         last_event = df_game_features.iloc[-1]
         self.game = df_game_features
         self.update_model_df_length()
@@ -6,6 +6,12 @@ import os
 import json
 import numpy as np
 
+from ift6758.data.downloader import default_downloader
+from ift6758.data.dtypes import compact
+from ift6758.data.schedule import default_discovery, web_api_url
+from ift6758.features.game_index import AWAY, HOME, GameIndex
+from ift6758.features.geometry import shot_geometry
+
 """##1. Update API client (10 %)
 
 #### Updated functions for getting data, cleaning dataframe and adding features
@@ -15,52 +21,39 @@ import numpy as np
 Updated functions for getting data
 '''
 
-def get_team_abbreviations():
-  team_data_url = "https://api.nhle.com/stats/rest/en/team"
-  team_data_response = requests.get(team_data_url)
-  teams = team_data_response.json()["data"]
-  team_abbreviations = [team["triCode"] for team in teams]
-
-  return team_abbreviations
-
-def get_game_ids_for_season(season, team_abbreviations):
-
-  base_schedule_url = "https://api-web.nhle.com/v1/club-schedule-season/{team_abbr}/{season}"
-
-  all_game_ids = set()
-
-  # Iterate through each team and get the season schedule
-  for team_abbr in team_abbreviations:
-    schedule_url = base_schedule_url.format(team_abbr=team_abbr, season=season)
-    schedule_response = requests.get(schedule_url)
-    schedule_data = schedule_response.json()
+def get_team_abbreviations(season=None, discovery=None):
+  # Only the franchises active in the season when one is given (see ift6758.data.schedule)
+  discovery = discovery or default_discovery()
+  return discovery.team_abbreviations(season)
 
-    # Get game IDs and add them to the set
-    game_ids = {game["id"] for game in schedule_data.get("games", [])}
-    all_game_ids.update(game_ids)
 
-  game_ids = list(all_game_ids)
+def get_game_ids_for_season(season, team_abbreviations=None, discovery=None):
+  # Club schedules are fetched concurrently, and the season's game ids cached on disk
+  discovery = discovery or default_discovery()
+  return discovery.game_ids(season, team_abbreviations)
 
-  return game_ids
 
-
-def fetch_game_data(game_id):
-    response = requests.get(f"https://api-web.nhle.com/v1/gamecenter/{game_id}/play-by-play")
-    if response.status_code == 200:
-        return response.json()
-    else:
+def fetch_game_data(game_id, downloader=None, base_url=web_api_url):
+    downloader = downloader or default_downloader()
+    game_data = downloader.get_json(f"{base_url}gamecenter/{game_id}/play-by-play")
+    if game_data is None:
         print(f"Failed to fetch data for game ID {game_id}")
-        return None
+    return game_data
+
 
+def fetch_and_concat_data(season, team_abbreviations=None, discovery=None):
+  discovery = discovery or default_discovery()
+  game_ids = get_game_ids_for_season(season, team_abbreviations, discovery=discovery)
 
-def fetch_and_concat_data(season, team_abbreviations):
-  game_ids = get_game_ids_for_season(season, team_abbreviations)
+  game_urls = {game_id: f"{discovery.web_api_url}gamecenter/{game_id}/play-by-play" for game_id in game_ids}
+  games = discovery.downloader.fetch_many(game_urls, desc=f"games {season}")
 
-  all_data = []
   for game_id in game_ids:
-      game_data = fetch_game_data(game_id)
-      if game_data:
-          all_data.append(game_data)
+      if game_id not in games:
+          print(f"Failed to fetch data for game ID {game_id}")
+
+  # Keep the schedule order so the DataFrame doesn't depend on completion order
+  all_data = [games[game_id] for game_id in game_ids if game_id in games]
 
   # Create a Pandas DataFrame from the list of data
   data_df = pd.DataFrame(all_data)
@@ -71,18 +64,15 @@ def fetch_and_concat_data(season, team_abbreviations):
 Helper functions
 '''
 
-def get_play_data(ld):
-
-  keep_event_types = {'shot-on-goal', 'goal', 'missed-shot'} #'blocked-shot', which event types? (what are hits?)
+# Team fields of a game, in the games table (one row per game) instead of every play
+TEAM_COLUMNS = ['awayTeamId', 'awayTeamName', 'awayTeamAbbrev', 'homeTeamId', 'homeTeamName', 'homeTeamAbbrev']
 
-  meta = {
-      'gamePk': ld['id']
-      #'gameDateTime': ld['startTimeUTC'] #ld['gameData']['datetime'].get('dateTime'),
-      #'gameEndDateTime': ld['gameData']['datetime'].get('endDateTime')
-      }
-  period = {'period': ld['period']}
 
-  teams = {
+def get_game_data(ld):
+  # One row of the games table: the game level fields, shared by all the plays of get_play_data
+  return {
+      'gamePk': ld['id'],
+      'gameDateTime': ld.get('startTimeUTC'),
       'awayTeamId': ld['awayTeam']['id'],
       'awayTeamName': ld['awayTeam']['name']['default'],
       'awayTeamAbbrev': ld['awayTeam']['abbrev'],
@@ -91,6 +81,24 @@ def get_play_data(ld):
       'homeTeamAbbrev': ld['homeTeam']['abbrev']
       }
 
+
+def game_table(games):
+  # Games table of get_game_data rows, indexed by gamePk (dates parsed once per game)
+  games = pd.DataFrame(list(games), columns=['gamePk', 'gameDateTime'] + TEAM_COLUMNS)
+  games['gameDateTime'] = pd.to_datetime(games['gameDateTime'], utc=True)
+  return games.drop_duplicates('gamePk', keep='last').set_index('gamePk')
+
+
+def get_play_data(ld):
+
+  keep_event_types = {'shot-on-goal', 'goal', 'missed-shot'} #'blocked-shot', which event types? (what are hits?)
+
+  # the dates and teams of the game are in the games table (see get_game_data)
+  meta = {
+      'gamePk': ld['id']
+      }
+  period = {'period': ld['period']}
+
   for play in ld['plays']: #ld['liveData']['plays']['allPlays']:
     #sys.exit()
 
@@ -102,7 +110,6 @@ def get_play_data(ld):
 
     playdata.update(meta)
     playdata.update(period)
-    playdata.update(teams)
     playdata['typeDescKey'] =  play.get('typeDescKey')
     playdata['xCoord'] = play['details'].get('xCoord')
     playdata['yCoord'] = play['details'].get('yCoord')
@@ -117,22 +124,12 @@ def get_play_data(ld):
 Helper functions for features
 '''
 
-# Empty net (1 for empty)
-def is_empty_net(row):
-    situation_code = row['situationCode']
-    if pd.isna(situation_code) or situation_code == "":
-        return 0
-    shooter = row['eventOwnerTeamId']
-    if shooter == row['awayTeamId']:
-      if int(situation_code[3]) == 1: # Fourth digit: 1 for goalie on ice for home team
-        return 0
-      else:
-        return 1
-    else:
-      if int(situation_code[0]) == 1: # First digit: 1 for goalie on ice for away team
-        return 0
-      else:
-        return 1
+# Empty net (1 for empty), for the shots of the away team (shooter_is_away) or of the home team
+def is_empty_net(situation_code, shooter_is_away):
+  codes = pd.Series(situation_code).fillna('').astype(str)
+  # Fourth digit: 1 for goalie on ice for home team, first digit: 1 for goalie on ice for away team
+  goalie = np.where(shooter_is_away, codes.str[3], codes.str[0])
+  return np.where(codes.str.len().to_numpy() > 0, goalie != '1', False).astype(int)
 
 
 # if coordinates = left and zoneCode = o then trying to score in left net RIGHT
@@ -143,7 +140,7 @@ def is_empty_net(row):
 
 # for zoneCode = n
 #add period to data
-#find an event with the same gameid, period and team : copy the rink side
+#find an event with the same gameid, period and team : copy the rink side (see period_sides)
 
 def decide_rink_side(row):
   if row['xCoord'] < 0 and row['zoneCode'] == 'O':
@@ -156,6 +153,21 @@ def decide_rink_side(row):
     return 'right'
 
 
+def period_sides(tidied, index):
+  # (gamePk, period, away side, home side) of the periods of the plays: the first rinkSide of the shots of each
+  # team, or the other side than the other team's
+  slot = index.team_slot(tidied['gamePk'], tidied['eventOwnerTeamId'])
+  known = (slot >= 0) & tidied['rinkSide'].notna().to_numpy()
+  sides = pd.DataFrame({'gamePk': tidied['gamePk'].to_numpy()[known], 'period': tidied['period'].to_numpy()[known],
+                        'slot': slot[known], 'side': tidied['rinkSide'].to_numpy(dtype=object)[known]})
+  sides = sides.groupby(['gamePk', 'period', 'slot'])['side'].first().unstack('slot').reindex(columns=[AWAY, HOME])
+
+  other = {'left': 'right', 'right': 'left'}
+  away = sides[AWAY].fillna(sides[HOME].map(other))
+  home = sides[HOME].fillna(sides[AWAY].map(other))
+  return sides.index.get_level_values('gamePk'), sides.index.get_level_values('period'), away, home
+
+
 '''
 Add features:
  -Distance from net
@@ -163,79 +175,56 @@ Add features:
  -Is goal (0 or 1)
  -Empty Net
 '''
-def add_features(tidied_training_set):
+def add_features(tidied_training_set, games):
+
+  # Teams (and rink sides) of the games of the plays (see ift6758.features.game_index)
+  index = GameIndex.from_games(games)
+  game_pk, shooter = tidied_training_set['gamePk'], tidied_training_set['eventOwnerTeamId']
 
   # Add column Is goal (0 or 1)
   print(tidied_training_set)
   tidied_training_set['IsGoal'] = (tidied_training_set['typeDescKey'] == 'goal').astype(int)
 
-  tidied_training_set['emptyNet'] = tidied_training_set.apply(is_empty_net, axis=1)
+  tidied_training_set['emptyNet'] = is_empty_net(tidied_training_set['situationCode'],
+                                                 index.team_slot(game_pk, shooter) == AWAY)
 
   tidied_training_set['rinkSide'] = tidied_training_set.apply(decide_rink_side, axis=1)
 
-  def decide_rink_side_for_neutral_zone(row):
-    if row['zoneCode'] == 'N':
-      game_id = row['gamePk']
-      period = row['period']
-      team = row['homeTeamId']
-
-      # Find the corresponding row with the same gameid, period, and team
-      matching_row = tidied_training_set[
-          (tidied_training_set['gamePk'] == game_id) &
-          (tidied_training_set['period'] == period) &
-          (tidied_training_set['homeTeamId'] == team)
-      ]
-
-      if not matching_row.empty:
-          # Copy the rinkSide value from the matching row
-          return matching_row['rinkSide'].values[0]
-
-    # Return original rinkSide if not in 'N' zoneCode or no matching row found
-    return row['rinkSide']
-
-  tidied_training_set['rinkSide'] = tidied_training_set.apply(decide_rink_side_for_neutral_zone, axis=1)
+  # Neutral zone shots: the rink side of the shooting team in the period, from its shots in the other zones
+  index.set_period_sides(*period_sides(tidied_training_set, index))
+  neutral = (tidied_training_set['zoneCode'] == 'N').to_numpy()
+  rink_side = index.rink_side(game_pk, shooter, tidied_training_set['period'])
+  tidied_training_set['rinkSide'] = np.where(neutral, rink_side, tidied_training_set['rinkSide'].to_numpy(dtype=object))
 
   '''
   if coordinates are for left side
   zoneCode: is this only using coordinates or can i use this as rink side?
   '''
-  # Add column Distance from net
+  # Add columns Distance from net and Angle from net (see ift6758.features.geometry)
 
   # approximate nets as being (-89, 0) and (89, 0)
   # if rink side is left offense is on the right
   # if rink side is left: trying to score in right net (89, 0)
   # if rink side is right: trying to score in left net (-89, 0)
-
-  tidied_training_set['distanceFromNet'] = np.sqrt(
-      np.where(
-          tidied_training_set['rinkSide'] == 'left',
-          (tidied_training_set['xCoord'] - 89) ** 2 + tidied_training_set['yCoord'] ** 2,
-            (tidied_training_set['xCoord'] + 89) ** 2 + tidied_training_set['yCoord'] ** 2))
-
-  # Add column Angle from net
-
   # If shoots from right in from of net (y=0), then angle is 0 deg
   # if shoots completely from the side (x=89 or -89), then angle is 90 deg
+  _, distance, angle = shot_geometry(
+      tidied_training_set['xCoord'].to_numpy(), tidied_training_set['yCoord'].to_numpy(),
+      tidied_training_set['rinkSide'].to_numpy())
+  tidied_training_set['distanceFromNet'] = distance
+  tidied_training_set['angleFromNet'] = angle
 
-  #add a temp column x_distance_from_net
-  tidied_training_set['xDistanceFromNet'] = np.where(
-      tidied_training_set['rinkSide'] == 'left',
-      abs(89 - tidied_training_set['xCoord'] ),
-        abs(-89 - tidied_training_set['xCoord'] ))
-
-  tidied_training_set['angleFromNet'] = np.degrees(np.arccos(tidied_training_set['xDistanceFromNet'] / tidied_training_set['distanceFromNet']))
-
-  #can remove the x_distance_from_net column
-  tidied_training_set.drop(['xDistanceFromNet'], axis=1, inplace=True)
-
-  return tidied_training_set
+  # Compact dtypes (categoricals, small integers, float32, see ift6758.data.dtypes)
+  return compact(tidied_training_set)
 
 
 def get_cleaned_data_with_features(season):
-  data_df = fetch_and_concat_data(season, team_abbreviations)
+  # (events, games): the features of the plays, and the games table they refer to by gamePk
+  data_df = fetch_and_concat_data(season)
+  games = game_table(get_game_data(l) for i, l in data_df.iterrows())
   tidied_training_set = pd.DataFrame(t for i, l in data_df.iterrows() for t in get_play_data(l))
-  final_dataset = add_features(tidied_training_set)
-  return final_dataset
+  final_dataset = add_features(tidied_training_set, games)
+  return final_dataset, games
 
 """#### To run
 
@@ -245,12 +234,10 @@ def get_cleaned_data_with_features(season):
 
 # directory = "/content/drive/MyDrive/DS-Project/Milestone3"  # Change this to your directory
 
-# team_abbreviations = get_team_abbreviations()
-
 # seasons = ["20162017"]#, "20172018", "20182019", "20192020", "20202021"]
 
 # for season in seasons:
-#     data = get_cleaned_data_with_features(season)
+#     data, games = get_cleaned_data_with_features(season)
 
 #     # save as csv
 #     data.to_csv(os.path.join(directory, f"{season}.csv"), index=False)
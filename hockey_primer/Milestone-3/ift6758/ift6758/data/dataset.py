@@ -0,0 +1,107 @@
+"""
+Partitioned Parquet datasets of tidied events.
+
+A dataset is a directory of parquet files partitioned by season and game type, both taken from the
+gamePk (season = 4 digits, game type = 2 digits: 2016020001 -> season=2016/game_type=2):
+
+    data/shots_f2/season=2016/game_type=2/<part>.parquet
+
+Columns keep their (compact, see ift6758.data.dtypes) dtypes: no re-parsing of numbers, booleans and
+dates like with csv. The repeated strings (event types, team names, ...) are stored as dictionaries, and
+reading can skip both the columns and the partitions that are not needed:
+
+    read_dataset("data/shots_f2", columns=["Distance_from_net", "angle_from_net", "IsGoal"],
+                 seasons=range(2015, 2019), game_types=[2])
+
+The game level fields (dates, teams, ...) are not repeated in the events: they are kept in a games table
+(one row per gamePk, written as a dataset too) and joined to the events only when asked for:
+
+    join_games(events, read_dataset("data/games_f2"), columns=["home_team_name", "away_team_name"])
+
+Needs the pyarrow package.
+"""
+
+import pandas as pd
+
+from ift6758.data.dtypes import compact
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+PARTITION_COLUMNS = ["season", "game_type"]
+
+
+def _check_pyarrow():
+    if pyarrow is None:
+        raise ImportError("parquet datasets need the pyarrow package (pip install pyarrow)")
+
+
+def with_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a copy of `df` with the dtypes it is stored with: object columns holding only numbers become
+    numeric columns, then the compact dtypes of ift6758.data.dtypes (categoricals, small integers, float32, ...).
+    """
+    return compact(df.infer_objects())
+
+
+def write_dataset(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """
+    Writes the events of `df` (which needs a gamePk column) to the dataset at `path`, partitioned by
+    season and game type. Only the partitions present in `df` are replaced; the others are kept.
+    Returns the written DataFrame (with its dtypes and partition columns).
+    """
+    _check_pyarrow()
+
+    df = with_dtypes(df)
+    df["season"] = (df["gamePk"] // 1000000).astype("int32")
+    df["game_type"] = (df["gamePk"] // 10000 % 100).astype("int32")
+
+    df.to_parquet(
+        path, engine="pyarrow", index=False, partition_cols=PARTITION_COLUMNS,
+        existing_data_behavior="delete_matching",
+    )
+    return df
+
+
+def read_dataset(path: str, columns: list = None, seasons=None, game_types=None) -> pd.DataFrame:
+    """
+    Reads the dataset at `path`.
+
+    Args:
+        path (str): The dataset directory.
+        columns (list): Columns to read (all of them by default). Only these are read from the files.
+        seasons (iterable): Only read these seasons (e.g. range(2015, 2019)); the other partitions are
+            skipped without being opened.
+        game_types (iterable): Only read these game types (2 = regular season, 3 = playoffs).
+    """
+    _check_pyarrow()
+
+    filters = []
+    if seasons is not None:
+        filters.append(("season", "in", [int(s) for s in seasons]))
+    if game_types is not None:
+        filters.append(("game_type", "in", [int(t) for t in game_types]))
+
+    df = pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters or None)
+
+    # partition values come back as categoricals
+    for c in PARTITION_COLUMNS:
+        if c in df:
+            df[c] = df[c].astype("int32")
+
+    return df
+
+
+def join_games(events: pd.DataFrame, games: pd.DataFrame, columns: list = None) -> pd.DataFrame:
+    """
+    `events` with the columns of their game (all of them by default), from a games table indexed by gamePk
+    or with a gamePk column (e.g. read with read_dataset).
+    """
+    if "gamePk" in games.columns:
+        games = games.drop(columns=[c for c in PARTITION_COLUMNS if c in games]).set_index("gamePk")
+    if columns is not None:
+        games = games[list(columns)]
+    return events.join(games, on="gamePk")
@@ -0,0 +1,258 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ift6758.data import jsonio
+
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limited or transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Args:
+        rate (float): Tokens added per second. A rate of 0 or None disables the limit.
+        capacity (float): Maximum number of tokens, i.e. the allowed burst. Defaults to `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it"""
+        if not self.rate:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class Progress:
+    """
+    Counts finished requests and periodically logs throughput and the estimated time left (at the INFO level:
+    scripts show it with logging.basicConfig(level=logging.INFO), as main.py does).
+
+    Args:
+        total (int): Number of requests expected.
+        desc (str): Label used in the log lines.
+        every (float): Minimum number of seconds between two progress lines.
+    """
+
+    def __init__(self, total: int, desc: str = "requests", every: float = 5.0):
+        self.total = total
+        self.desc = desc
+        self.every = every
+        self.done = 0
+        self.failed = 0
+        self.nbytes = 0
+        self.start = time.monotonic()
+        self._last_report = self.start
+        self._lock = threading.Lock()
+
+    def update(self, nbytes: int = 0, failed: bool = False):
+        with self._lock:
+            self.done += 1
+            self.failed += int(failed)
+            self.nbytes += nbytes
+
+            now = time.monotonic()
+            if now - self._last_report >= self.every:
+                self._last_report = now
+                logger.info(self.summary())
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        summary = (
+            f"{self.desc}: {self.done}/{self.total} done, {self.failed} failed, "
+            f"{self.done / elapsed:.1f} req/s, {self.nbytes / elapsed / 1e6:.2f} MB/s, {elapsed:.1f}s elapsed"
+        )
+        if 0 < self.done < self.total:
+            summary += f", ~{(self.total - self.done) * elapsed / self.done:.0f}s left"
+        return summary
+
+
+class Downloader:
+    """
+    Concurrent HTTP client shared by the season downloaders.
+
+    Requests go through one pooled keep-alive session, are limited to `max_workers` in flight and
+    to `rate` per second (token bucket), and are retried with exponential backoff on connection
+    errors and on 429/5xx responses. The base URLs are left to the callers, so pointing them to
+    a local stand-in server is enough to exercise the whole download path offline.
+
+    Args:
+        max_workers (int): Maximum number of concurrent requests.
+        rate (float): Maximum number of requests started per second (0 or None for no limit).
+        burst (float): Token bucket capacity. Defaults to `rate`.
+        max_retries (int): Number of retries after the first attempt.
+        backoff (float): Base delay in seconds, doubled at every retry.
+        timeout (float): Per-request timeout in seconds.
+        session (requests.Session): Session to use instead of a new pooled one.
+    """
+
+    def __init__(self, max_workers: int = 8, rate: float = 10.0, burst: float = None, max_retries: int = 5,
+                 backoff: float = 0.5, timeout: float = 30.0, session: requests.Session = None):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def _retry_delay(self, attempt: int, response: requests.Response = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None and retry_after.isdigit():
+                return float(retry_after)
+
+        return self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+
+    def get(self, url: str, headers: dict = None) -> requests.Response:
+        """
+        GET `url`, retrying on connection errors and retryable statuses.
+
+        Returns the last response received, which may still be an error response once the retries
+        are exhausted. Re-raises the last connection error if no response was ever received.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.debug("Connection error on %s, retrying in %.2fs", url, delay)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                delay = self._retry_delay(attempt, response)
+                logger.debug("Got %s on %s, retrying in %.2fs", response.status_code, url, delay)
+
+            time.sleep(delay)
+
+    def get_json(self, url: str):
+        """GET `url` and return the decoded json, or None if the request failed"""
+        try:
+            response = self.get(url)
+        except requests.RequestException as e:
+            logger.warning("Failed to fetch %s: %s", url, e)
+            return None
+
+        if response.status_code != 200:
+            logger.warning("Failed to fetch %s: status %s", url, response.status_code)
+            return None
+
+        return jsonio.loads(response.content)
+
+    def fetch_many(self, urls: dict, handle=None, desc: str = "requests", progress_every: float = 5.0,
+                   headers: dict = None, ok_statuses=(200,)) -> dict:
+        """
+        Fetches every url of `urls` concurrently.
+
+        Args:
+            urls (dict): Mapping from a caller key (e.g. a game id) to the url to fetch.
+            handle (callable): Called as `handle(key, response)` in the worker thread for every
+                successful response; its return value is collected. Defaults to decoding the
+                json body.
+            desc (str): Label for the progress report.
+            progress_every (float): Seconds between two progress log lines.
+            headers (dict): Optional mapping from a key to extra request headers for its url
+                (e.g. conditional request validators).
+            ok_statuses (tuple): Statuses passed to `handle`, e.g. (200, 304) for conditional requests.
+
+        Returns:
+            dict: key -> handled result, for the successful requests only. Failures, including the
+            exceptions raised by `handle`, are logged and leave the other keys unaffected.
+        """
+        if handle is None:
+            handle = lambda key, response: jsonio.loads(response.content)
+
+        progress = Progress(len(urls), desc=desc, every=progress_every)
+        results = dict()
+
+        def work(key, url):
+            try:
+                response = self.get(url, headers=headers.get(key) if headers else None)
+            except requests.RequestException as e:
+                progress.update(failed=True)
+                logger.warning("Failed to fetch %s: %s", url, e)
+                return key, None, False
+
+            if response.status_code not in ok_statuses:
+                progress.update(failed=True)
+                logger.warning("Failed to fetch %s: status %s", url, response.status_code)
+                return key, None, False
+
+            try:
+                result = handle(key, response)
+            except Exception as e:
+                # a response that can't be handled (e.g. a truncated body) fails its key only
+                progress.update(failed=True)
+                logger.warning("Failed to handle %s: %s", url, e, exc_info=True)
+                return key, None, False
+
+            progress.update(nbytes=len(response.content))
+            return key, result, True
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(work, key, url) for key, url in urls.items()]
+            for future in as_completed(futures):
+                key, result, ok = future.result()
+                if ok:
+                    results[key] = result
+
+        logger.info(progress.summary())
+
+        return results
+
+
+_default_downloader = None
+_default_lock = threading.Lock()
+
+
+def default_downloader() -> Downloader:
+    """Lazily created process-wide Downloader, shared by callers that don't pass their own"""
+    global _default_downloader
+
+    with _default_lock:
+        if _default_downloader is None:
+            _default_downloader = Downloader()
+
+    return _default_downloader
@@ -0,0 +1,169 @@
+"""
+Compact dtypes of tidied frames (plays, features, games tables).
+
+One policy for every stage that hands frames over (tidy_data, add_features2, the M3 add_features and the
+parquet datasets):
+
+    categoricals  the low cardinality strings (event types, team names, rink sides, "MM:SS" times, ...), with
+                  the sorted values present as categories: equal values give equal frames, whatever frame (batch,
+                  cached game) they were cut from
+    int8/16/32    periods, counts, seconds and ids, when they have no missing values and fit
+    float32       coordinates and geometry; ids with missing values (exact below 2**24, player ids are ~8.5e6)
+    boolean       object columns of booleans (+ NaN)
+    datetime64    the timestamps of the plays and games (UTC)
+
+gamePk stays int64 (it is combined into int64 keys, see ift6758.features.strength). Columns outside of the policy
+are kept as they are.
+
+    compact(df)          # a copy of df with the policy applied
+    memory_report(df)    # prints the bytes of every column before / after compact
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Low cardinality string columns, stored as categoricals
+CATEGORICAL_COLUMNS = [
+    "event", "eventTypeId", "secondaryType", "penaltySeverity", "strength_code", "strength_name",
+    "periodType", "ordinalNum", "team_name", "team_triCode", "rink_side", "last_event_type_id",
+    "periodTime", "periodTimeRemaining", "last_event_time",
+    "home_team_name", "away_team_name", "home_rink_side", "away_rink_side",
+    # api-web plays and games (ift6758_milestone3)
+    "typeDescKey", "zoneCode", "shotType", "rinkSide", "homeTeamDefendingSide",
+    "awayTeamName", "awayTeamAbbrev", "homeTeamName", "homeTeamAbbrev",
+]
+
+# Integer columns and their dtype
+INTEGER_COLUMNS = {
+    "period": "int8", "IsGoal": "int8", "emptyNet": "int8", "goals_away": "int8", "goals_home": "int8",
+    "n_players": "int8", "n_opposing_players": "int8",
+    "period_seconds": "int16", "eventIdx": "int16", "sortOrder": "int16",
+    "game_seconds": "int32",
+}
+
+FLOAT32_COLUMNS = [
+    "x", "y", "xCoord", "yCoord", "penaltyMinutes",
+    "Distance_from_net", "angle_from_net", "distanceFromNet", "angleFromNet",
+    "last_event_x", "last_event_y", "last_event_angle", "time_from_last_event", "dist_from_last_event",
+    "change_in_angle", "speed", "time_since_powerplay",
+]
+
+DATETIME_COLUMNS = ["dateTime", "gameDateTime", "gameEndDateTime"]
+
+# Largest integer a float32 holds exactly
+FLOAT32_EXACT = 2 ** 24
+
+
+def is_id_column(column: str) -> bool:
+    """Ids of teams, players and events (team_id, Shooter_id, eventOwnerTeamId, ...), but not gamePk"""
+    return column.endswith("_id") or column.endswith("Id")
+
+
+def _smallest_integer(low, high):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def _as_integer(s: pd.Series, dtype=None) -> pd.Series:
+    # s as dtype (the smallest integer dtype that fits by default), or s itself if it has missing or non integer
+    # values, or values out of the range of dtype
+    if s.dtype == dtype:
+        return s
+    if s.dtype.kind in "iufb":
+        values = s.to_numpy()
+    elif s.dtype == object:
+        values = pd.to_numeric(s, errors="coerce").to_numpy()
+    else:
+        return s
+    if values.dtype.kind not in "iufb" or (values.dtype.kind == "f" and (np.isnan(values).any() or
+                                                                         (values % 1 != 0).any())):
+        return s
+    if not len(values):
+        return pd.Series(values.astype(dtype or np.int8), index=s.index, name=s.name)
+
+    low, high = values.min(), values.max()
+    if dtype is None:
+        dtype = _smallest_integer(low, high)
+    elif low < np.iinfo(dtype).min or high > np.iinfo(dtype).max:
+        return s
+    if s.dtype == dtype:
+        return s
+    return pd.Series(values.astype(dtype), index=s.index, name=s.name)
+
+
+def _present_categories(s: pd.Series) -> pd.Series:
+    # s with the sorted values present as categories (s itself if it has them already)
+    categories = s.cat.categories
+    codes = s.cat.codes.to_numpy()
+    used = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+    if used.all() and categories.is_monotonic_increasing:
+        return s
+    return s.cat.set_categories(categories[used].sort_values())
+
+
+def _compact_column(column: str, s: pd.Series) -> pd.Series:
+    if column in CATEGORICAL_COLUMNS:
+        return _present_categories(s) if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+
+    if column in INTEGER_COLUMNS:
+        return _as_integer(s, INTEGER_COLUMNS[column])
+
+    if column in DATETIME_COLUMNS and s.dtype.kind != "M":
+        return pd.to_datetime(s, utc=True)
+
+    if column in FLOAT32_COLUMNS and s.dtype.kind in "iuf":
+        return s if s.dtype == np.float32 else s.astype(np.float32)
+
+    if is_id_column(column) and s.dtype.kind in "iuf":
+        compacted = _as_integer(s)
+        if compacted is s and s.dtype == np.float64 and not (s.abs() >= FLOAT32_EXACT).any():
+            return s.astype(np.float32)
+        return compacted
+
+    if s.dtype == object:
+        values = s.dropna()
+        if len(values) and values.map(type).eq(bool).all():
+            return s.astype("boolean")
+
+    return s
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a copy of `df` with the dtypes of the policy (see the module docstring). Casts that would lose
+    values (missing values in an integer column, integers out of range) are not done.
+    """
+    df = df.copy(deep=False)
+    for c in df.columns:
+        s = df[c]
+        compacted = _compact_column(c, s)
+        if compacted is not s:
+            df[c] = compacted
+    return df
+
+
+def memory_report(df: pd.DataFrame, compacted: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Prints the dtype and bytes (deep) of every column of `df` before and after compact (or `compacted`, if
+    already computed), with the totals. Returns the report, one row per column.
+    """
+    if compacted is None:
+        compacted = compact(df)
+
+    before = df.memory_usage(deep=True, index=False)
+    after = compacted.memory_usage(deep=True, index=False).reindex(before.index)
+    report = pd.DataFrame({
+        "dtype_before": df.dtypes.astype(str), "bytes_before": before,
+        "dtype_after": compacted.dtypes.reindex(before.index).astype(str), "bytes_after": after,
+    })
+    report["ratio"] = report["bytes_before"] / report["bytes_after"]
+
+    total_before, total_after = before.sum(), after.sum()
+    print(report.to_string(formatters={"ratio": "{:.1f}x".format}))
+    print(f"total: {total_before / 2 ** 20:.1f} MB -> {total_after / 2 ** 20:.1f} MB "
+          f"({total_before / total_after:.1f}x less), {len(df)} rows")
+    return report
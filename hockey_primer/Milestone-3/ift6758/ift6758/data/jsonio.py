@@ -0,0 +1,137 @@
+"""
+Json decoding for the raw play-by-play files.
+
+`loads` uses orjson or msgspec when installed and falls back to the standard library json module.
+
+With `schema='statsapi'` or `schema='web'` (and msgspec installed), games are decoded against a
+typed schema that only keeps the fields the tidy functions read: the game id, dates and teams, and
+the plays. Everything else (rosters, boxscores, linescores, ...) is skipped by the decoder instead of
+being materialized. The result is still made of plain dicts and lists, so it goes through
+`get_play_data` unchanged. A game that does not fit its schema (a field of another type, a missing game
+id, ...) is decoded in full instead, as the tidy functions tolerate what they don't read.
+"""
+
+import json
+from typing import List, TypedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if orjson is not None:
+    backend = "orjson"
+elif msgspec is not None:
+    backend = "msgspec"
+else:
+    backend = "json"
+
+
+# statsapi `game/<gamePk>/feed/live`
+
+class PlayerRef(TypedDict, total=False):
+    id: int
+
+
+class PlayerEntry(TypedDict, total=False):
+    player: PlayerRef
+    playerType: str
+
+
+class StatsApiPlay(TypedDict, total=False):
+    players: List[PlayerEntry]
+    result: dict
+    about: dict
+    coordinates: dict
+    team: dict
+
+
+class StatsApiPlays(TypedDict):
+    allPlays: List[StatsApiPlay]
+
+
+class StatsApiLiveData(TypedDict):
+    plays: StatsApiPlays
+
+
+class StatsApiGameData(TypedDict, total=False):
+    datetime: dict
+    status: dict
+    teams: dict
+
+
+class StatsApiGame(TypedDict):
+    gamePk: int
+    gameData: StatsApiGameData
+    liveData: StatsApiLiveData
+
+
+# api-web `gamecenter/<id>/play-by-play`
+
+class WebTeam(TypedDict, total=False):
+    id: int
+    name: dict
+    abbrev: str
+
+
+class WebPlay(TypedDict, total=False):
+    typeDescKey: str
+    situationCode: str
+    period: int
+    timeInPeriod: str
+    details: dict
+
+
+class WebGame(TypedDict, total=False):
+    id: int
+    startTimeUTC: str
+    period: int
+    gameState: str
+    awayTeam: WebTeam
+    homeTeam: WebTeam
+    plays: List[WebPlay]
+
+
+SCHEMAS = {"statsapi": StatsApiGame, "web": WebGame}
+
+_decoders = dict()
+
+
+def _typed_decoder(schema: str):
+    if schema not in _decoders:
+        _decoders[schema] = msgspec.json.Decoder(SCHEMAS[schema])
+    return _decoders[schema]
+
+
+def loads(raw, schema: str = None):
+    """
+    Decodes json bytes (or str).
+
+    Args:
+        raw (bytes): The json document.
+        schema (str): None for a full decode, or 'statsapi' / 'web' to only keep the fields the tidy
+            functions read. Needs msgspec; without it the full document is returned.
+    """
+    if schema is not None and msgspec is not None:
+        try:
+            return _typed_decoder(schema).decode(raw)
+        except msgspec.ValidationError:
+            pass  # valid json, outside of the schema: full decode
+
+    if orjson is not None:
+        return orjson.loads(raw)
+    if msgspec is not None:
+        return msgspec.json.decode(raw)
+    return json.loads(raw)
+
+
+def load(path: str, schema: str = None):
+    """Reads and decodes the json file at `path` (see `loads`)"""
+    with open(path, "rb") as f:
+        return loads(f.read(), schema=schema)
@@ -0,0 +1,82 @@
+"""
+Linescore rink sides, saved in the download manifest.
+
+The statsapi season schedule with `expand=schedule.linescore` gives, for every game, the home and away
+teams and the rink side of each team in every period. `fetch_linescores` parses it once per season
+straight into rows of the manifest (no intermediate list of dicts), and after that reads them back
+from the manifest:
+
+- a season whose games were all final when it was fetched is never downloaded again;
+- a season with games still to play is downloaded again once its rows are older than `ttl` seconds.
+
+Lookups return a DataFrame indexed by (gamePk, period), with the columns away_team_name,
+home_team_name, home_rink_side and away_rink_side (the layout of milestone1_func.game_info_table).
+A game without any period in its linescore keeps its teams in one row with a missing (<NA>) period.
+"""
+
+import logging
+import time
+
+import pandas as pd
+
+from ift6758.data.downloader import default_downloader
+from ift6758.data.manifest import FINAL_STATES, LINESCORE_COLUMNS, Manifest, statsapi_url
+
+
+logger = logging.getLogger(__name__)
+
+
+def linescore_table(rows: list) -> pd.DataFrame:
+    """DataFrame indexed by (gamePk, period) of Manifest.linescores rows"""
+    table = pd.DataFrame.from_records(rows, columns=LINESCORE_COLUMNS)
+    table["period"] = table["period"].astype("Int64")  # <NA> for the games without periods
+    return table.rename(columns={"game_id": "gamePk"}).set_index(["gamePk", "period"])
+
+
+def parse_linescores(schedule: dict):
+    """
+    Rows of a `schedule?expand=schedule.linescore` response: (games, periods, complete), see
+    Manifest.set_linescores. Missing rink sides are 'N/A'.
+    """
+    games, periods = [], []
+    complete = True
+
+    for date in schedule.get("dates", []):
+        for game in date.get("games", []):
+            game_id = game["gamePk"]
+            teams = game["teams"]
+            games.append((game_id, teams["away"]["team"]["name"], teams["home"]["team"]["name"]))
+
+            for period in game.get("linescore", {}).get("periods", []):
+                periods.append((game_id, period["num"], period["home"].get("rinkSide", "N/A"),
+                                period["away"].get("rinkSide", "N/A")))
+
+            complete = complete and game.get("status", {}).get("abstractGameState") in FINAL_STATES
+
+    return games, periods, complete
+
+
+def fetch_linescores(season, manifest: Manifest, downloader=None, base_url=statsapi_url,
+                     ttl: float = 3600) -> pd.DataFrame:
+    """
+    Linescores of a season (e.g. '20162017'), downloaded only when the manifest has none, or stale
+    ones for a season that was not complete. See the module docstring for the returned table.
+    """
+    saved = manifest.get_linescore_season(season)
+    if saved is None or not (saved["complete"] or time.time() - saved["fetched_at"] < ttl):
+        downloader = downloader or default_downloader()
+        fetched_at = time.time()
+        schedule = downloader.get_json(f"{base_url}schedule?season={season}&expand=schedule.linescore")
+
+        if schedule is None:
+            logger.warning("Failed to fetch the linescores for season %s", season)
+        else:
+            games, periods, complete = parse_linescores(schedule)
+            manifest.set_linescores(season, games, periods, fetched_at, complete)
+
+    return linescore_table(manifest.linescores(season=season))
+
+
+def lookup_linescores(manifest: Manifest, game_ids) -> pd.DataFrame:
+    """Saved linescores of the given games (from any season), in one query per few hundred games"""
+    return linescore_table(manifest.linescores(game_ids=game_ids))
@@ -0,0 +1,389 @@
+"""
+Download manifest and incremental season sync.
+
+The manifest is a small SQLite database recording, for every saved game, when it was fetched, its
+game state, a hash of its content and the HTTP validators (ETag / Last-Modified) the server sent.
+It also keeps the last schedule seen for each season, and the linescore rink sides of every game
+(see ift6758.data.linescores). `sync_season` uses it to only fetch the games that are missing or not
+final yet, with conditional requests so unchanged games cost a 304:
+
+    python -m ift6758.data.manifest 20162017 20172018 --store data [--revalidate]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from ift6758.data import jsonio
+from ift6758.data.downloader import default_downloader
+from ift6758.data.raw_store import open_store
+
+
+logger = logging.getLogger(__name__)
+
+statsapi_url = "https://statsapi.web.nhl.com/api/v1/"
+
+FINAL_STATES = {"Final", "OFF", "FINAL"}
+
+COLUMNS = ["game_id", "season", "fetched_at", "game_state", "content_hash", "etag", "last_modified"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id INTEGER PRIMARY KEY,
+    season TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    game_state TEXT,
+    content_hash TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE TABLE IF NOT EXISTS schedules (
+    season TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    games TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS linescore_seasons (
+    season TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    complete INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS linescore_games (
+    game_id INTEGER PRIMARY KEY,
+    season TEXT NOT NULL,
+    away_team_name TEXT,
+    home_team_name TEXT
+);
+CREATE TABLE IF NOT EXISTS linescore_periods (
+    game_id INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    home_rink_side TEXT,
+    away_rink_side TEXT,
+    PRIMARY KEY (game_id, period)
+);
+"""
+
+LINESCORE_COLUMNS = ["game_id", "period", "away_team_name", "home_team_name", "home_rink_side", "away_rink_side"]
+
+# Parameters per query for lookups by game ids
+_MAX_PARAMS = 900
+
+
+def game_state(data: dict):
+    """Game state of a raw game, for both the statsapi and the api-web schemas"""
+    if "gameData" in data:
+        return data["gameData"].get("status", {}).get("abstractGameState")
+    return data.get("gameState")
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def conditional_headers(etag, last_modified) -> dict:
+    headers = dict()
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class Manifest:
+    """
+    Args:
+        path (str): SQLite file. Created if missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, game_id) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM games WHERE game_id = ?", (int(game_id),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(COLUMNS, row))
+
+    def entries(self, season: str = None) -> dict:
+        """gamePk -> manifest entry, optionally for one season"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM games"
+        args = ()
+        if season is not None:
+            query += " WHERE season = ?"
+            args = (str(season)[:4],)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return {row[0]: dict(zip(COLUMNS, row)) for row in rows}
+
+    def record(self, entries: list):
+        """Inserts or replaces a batch of entries (dicts with the games table columns) in one transaction"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO games VALUES "
+                "(:game_id, :season, :fetched_at, :game_state, :content_hash, :etag, :last_modified)",
+                entries)
+
+    def touch(self, game_ids: list, fetched_at: float):
+        """Marks games as checked at `fetched_at` without changing anything else (e.g. after a 304)"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE games SET fetched_at = ? WHERE game_id = ?",
+                [(fetched_at, int(g)) for g in game_ids])
+
+    def get_schedule(self, season: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, etag, last_modified, games FROM schedules WHERE season = ?",
+                (str(season),)).fetchone()
+        if row is None:
+            return None
+        return {"fetched_at": row[0], "etag": row[1], "last_modified": row[2], "games": json.loads(row[3])}
+
+    def set_schedule(self, season: str, games: dict, fetched_at: float, etag: str = None, last_modified: str = None):
+        """Saves a season schedule as {gamePk: game state}"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?, ?)",
+                (str(season), fetched_at, etag, last_modified, json.dumps(games)))
+
+    def get_linescore_season(self, season: str) -> dict:
+        """When the linescores of a season were saved, and whether all its games were final then"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, complete FROM linescore_seasons WHERE season = ?", (str(season)[:4],)).fetchone()
+        if row is None:
+            return None
+        return {"fetched_at": row[0], "complete": bool(row[1])}
+
+    def set_linescores(self, season: str, games: list, periods: list, fetched_at: float, complete: bool):
+        """
+        Replaces the linescores of a season, in one transaction.
+
+        Args:
+            games (list): (game_id, away_team_name, home_team_name) tuples
+            periods (list): (game_id, period, home_rink_side, away_rink_side) tuples
+            complete (bool): All the games of the season were final
+        """
+        season = str(season)[:4]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM linescore_periods WHERE game_id IN (SELECT game_id FROM linescore_games WHERE season = ?)",
+                (season,))
+            self._conn.execute("DELETE FROM linescore_games WHERE season = ?", (season,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO linescore_games VALUES (?, ?, ?, ?)",
+                [(int(g), season, away, home) for g, away, home in games])
+            self._conn.executemany("INSERT OR REPLACE INTO linescore_periods VALUES (?, ?, ?, ?)", periods)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO linescore_seasons VALUES (?, ?, ?)", (season, fetched_at, int(complete)))
+
+    def linescore_games(self, season: str) -> list:
+        """(game_id, away_team_name, home_team_name) of every game of a season, by game_id"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT game_id, away_team_name, home_team_name FROM linescore_games WHERE season = ? "
+                "ORDER BY game_id", (str(season)[:4],)).fetchall()
+
+    def linescores(self, season: str = None, game_ids: list = None) -> list:
+        """
+        LINESCORE_COLUMNS tuples, one per (game, period), sorted, for a season and / or a list of games
+        (all of them by default). A game without periods has one tuple with the period and sides None, for its teams.
+        """
+        query = ("SELECT g.game_id, p.period, g.away_team_name, g.home_team_name, p.home_rink_side, "
+                 "p.away_rink_side FROM linescore_games g LEFT JOIN linescore_periods p ON p.game_id = g.game_id")
+        conditions, args = [], []
+        if season is not None:
+            conditions.append("g.season = ?")
+            args.append(str(season)[:4])
+
+        if game_ids is None:
+            batches = [None]
+        else:
+            game_ids = sorted({int(g) for g in game_ids})
+            batches = [game_ids[i:i + _MAX_PARAMS] for i in range(0, len(game_ids), _MAX_PARAMS)]
+
+        rows = []
+        with self._lock:
+            for batch in batches:
+                where = list(conditions)
+                if batch is not None:
+                    where.append(f"g.game_id IN ({', '.join('?' * len(batch))})")
+                sql = query + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY g.game_id, p.period"
+                rows.extend(self._conn.execute(sql, args + (batch or [])).fetchall())
+        return rows
+
+
+def fetch_schedule(season, manifest: Manifest, downloader=None, base_url=statsapi_url, ttl: float = 3600) -> dict:
+    """
+    Returns the season schedule as {gamePk: game state}.
+
+    A schedule fetched less than `ttl` seconds ago is reused without any request; an older one is
+    revalidated with a conditional request. If the request fails, the saved schedule is returned as is.
+    """
+    downloader = downloader or default_downloader()
+    cached = manifest.get_schedule(season)
+    now = time.time()
+
+    if cached is not None and now - cached["fetched_at"] < ttl:
+        return {int(g): s for g, s in cached["games"].items()}
+
+    headers = conditional_headers(cached["etag"], cached["last_modified"]) if cached else None
+    try:
+        response = downloader.get(f"{base_url}schedule?season={season}", headers=headers)
+    except requests.RequestException as e:
+        logger.warning("Failed to fetch the schedule for season %s: %s", season, e)
+        return {int(g): s for g, s in cached["games"].items()} if cached else dict()
+
+    etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+    if response.status_code == 304 and cached is not None:
+        games = cached["games"]
+        # a 304 may leave the validators out: they are still those of the saved schedule
+        etag = etag or cached["etag"]
+        last_modified = last_modified or cached["last_modified"]
+    elif response.status_code == 200:
+        games = {
+            game["gamePk"]: game.get("status", {}).get("abstractGameState")
+            for date in response.json().get("dates", [])
+            for game in date.get("games", [])
+        }
+    else:
+        logger.warning("Failed to fetch the schedule for season %s: status %s", season, response.status_code)
+        return {int(g): s for g, s in cached["games"].items()} if cached else dict()
+
+    manifest.set_schedule(season, games, now, etag, last_modified)
+
+    return {int(g): s for g, s in games.items()}
+
+
+def sync_season(season, store, manifest: Manifest, downloader=None, base_url=statsapi_url,
+                revalidate: bool = False, schedule_ttl: float = 3600) -> dict:
+    """
+    Brings the raw store up to date for one season.
+
+    Fetches the games that are missing from the store, and the ones not final yet. The latter are
+    requested conditionally with the validators saved in the manifest. With `revalidate`, final games
+    are also revalidated so that corrections made after the fact are picked up.
+
+    Args:
+        season (str): e.g. '20162017'
+        store: Raw store or directory (see ift6758.data.raw_store.open_store).
+        manifest (Manifest): Download manifest.
+        downloader (Downloader): Defaults to the shared downloader.
+        base_url (str): statsapi base url.
+        revalidate (bool): Also send conditional requests for final games.
+        schedule_ttl (float): Seconds during which the saved schedule is reused as is.
+
+    Returns:
+        dict: counts of 'new', 'changed', 'unchanged' and 'failed' games, and of 'skipped' final games.
+    """
+    store = open_store(store)
+    downloader = downloader or default_downloader()
+
+    schedule = fetch_schedule(season, manifest, downloader=downloader, base_url=base_url, ttl=schedule_ttl)
+    entries = manifest.entries(season)
+
+    # Games saved before the manifest existed: record them from their stored content, without validators
+    seeded = []
+    for game_id in schedule:
+        if game_id not in entries and game_id in store:
+            raw = store.get_raw(game_id)
+            seeded.append({
+                "game_id": int(game_id), "season": str(game_id)[:4], "fetched_at": time.time(),
+                "game_state": game_state(jsonio.loads(raw)), "content_hash": content_hash(raw),
+                "etag": None, "last_modified": None,
+            })
+    if seeded:
+        manifest.record(seeded)
+        entries.update({entry["game_id"]: entry for entry in seeded})
+
+    to_fetch = dict()
+    headers = dict()
+    for game_id in schedule:
+        entry = entries.get(game_id)
+        if entry is None or game_id not in store:
+            to_fetch[game_id] = f"{base_url}game/{game_id}/feed/live"
+        elif revalidate or entry["game_state"] not in FINAL_STATES:
+            to_fetch[game_id] = f"{base_url}game/{game_id}/feed/live"
+            headers[game_id] = conditional_headers(entry["etag"], entry["last_modified"])
+
+    fetched_at = time.time()
+
+    def handle(game_id, response):
+        entry = entries.get(game_id)
+
+        if response.status_code == 304:
+            return "unchanged", None
+
+        raw = response.content
+        digest = content_hash(raw)
+        if entry is not None and entry["content_hash"] == digest and game_id in store:
+            status = "unchanged"
+        else:
+            store.put(game_id, raw)
+            status = "changed" if entry is not None else "new"
+
+        return status, {
+            "game_id": int(game_id),
+            "season": str(game_id)[:4],
+            "fetched_at": fetched_at,
+            "game_state": game_state(jsonio.loads(raw)),
+            "content_hash": digest,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    results = downloader.fetch_many(to_fetch, handle=handle, desc=f"sync {season}", headers=headers,
+                                    ok_statuses=(200, 304))
+
+    manifest.record([entry for _, entry in results.values() if entry is not None])
+    manifest.touch([g for g, (status, entry) in results.items() if entry is None], fetched_at)
+
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    for status, _ in results.values():
+        counts[status] += 1
+    counts["failed"] = len(to_fetch) - len(results)
+    counts["skipped"] = len(schedule) - len(to_fetch)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental season sync of the raw game store")
+    parser.add_argument("seasons", nargs="+", help="e.g. 20162017")
+    parser.add_argument("--store", default="data", help="raw store directory")
+    parser.add_argument("--manifest", default=None, help="manifest file, defaults to <store>/manifest.sqlite")
+    parser.add_argument("--revalidate", action="store_true", help="also revalidate final games")
+    parser.add_argument("--schedule-ttl", type=float, default=3600)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    store = open_store(args.store)
+    manifest = Manifest(args.manifest or os.path.join(args.store, "manifest.sqlite"))
+
+    for season in args.seasons:
+        start = time.perf_counter()
+        counts = sync_season(season, store, manifest, revalidate=args.revalidate, schedule_ttl=args.schedule_ttl)
+        print(f"Synced season {season} in {time.perf_counter() - start:.1f}s: {counts}")
+
+    manifest.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Raw game stores: where the downloaded play-by-play json lives.
+
+Two interchangeable backends:
+
+    JsonDirStore  one uncompressed `<gamePk>.json` file per game (the original layout)
+    PackedStore   one compressed `<season>.pack` file per season, holding one gzip/zstd frame per game,
+                  plus a `<season>.idx` offset index keyed by gamePk
+
+`open_store` picks the right backend for an existing directory. Existing json directories can be
+converted with:
+
+    python -m ift6758.data.raw_store migrate data data/packed [--codec zstd]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import threading
+
+from ift6758.data import jsonio
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def season_of(game_id) -> str:
+    """gamePk 2016020001 -> '2016'"""
+    return str(game_id)[:4]
+
+
+class JsonDirStore:
+    """
+    One `<gamePk>.json` file per game in `directory`.
+
+    Args:
+        directory (str): Folder holding the json files. Created if missing.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, game_id) -> str:
+        return os.path.join(self.directory, str(game_id) + ".json")
+
+    def __contains__(self, game_id) -> bool:
+        return os.path.exists(self._path(game_id))
+
+    def game_ids(self, prefix: str = None) -> list:
+        """Sorted gamePks, optionally only those starting with `prefix` (e.g. '2016' or '201602')"""
+        ids = [int(f[:-5]) for f in os.listdir(self.directory) if f.endswith(".json") and f[:-5].isdigit()]
+        if prefix is not None:
+            ids = [g for g in ids if str(g).startswith(str(prefix))]
+        return sorted(ids)
+
+    def get_raw(self, game_id) -> bytes:
+        with open(self._path(game_id), "rb") as f:
+            return f.read()
+
+    def get(self, game_id, schema: str = None) -> dict:
+        return jsonio.loads(self.get_raw(game_id), schema=schema)
+
+    def put(self, game_id, data):
+        """Saves a game, given either as the raw json bytes or as a dict"""
+        if not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+        with open(self._path(game_id), "wb") as f:
+            f.write(data)
+
+    def iter_raw(self, prefix: str = None):
+        """Yields (gamePk, raw json bytes) for every game, optionally only those whose gamePk starts with `prefix`"""
+        for game_id in self.game_ids(prefix):
+            yield game_id, self.get_raw(game_id)
+
+    def iter_games(self, prefix: str = None, schema: str = None):
+        """
+        Yields the decoded games one at a time, optionally only those whose gamePk starts with `prefix`.
+        `schema` selects a slim typed decode (see ift6758.data.jsonio.loads).
+        """
+        for _, raw in self.iter_raw(prefix):
+            yield jsonio.loads(raw, schema=schema)
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return gzip.compress(raw, compresslevel=6)
+
+
+def _decompress(frame: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return gzip.decompress(frame)
+
+
+class PackedStore:
+    """
+    Compressed per-season archives with an offset index.
+
+    Every game is compressed on its own and appended to `<season>.pack`; its offset, length and codec
+    are appended to `<season>.idx` as a `gamePk offset length codec` line. Reading one game is one
+    seek + one frame decompression, and a season is streamed by reading its pack front to back.
+    Saving a game again appends a new frame, and the last index line wins.
+
+    Args:
+        directory (str): Folder holding the pack and index files. Created if missing.
+        codec (str): 'zstd' (needs the zstandard package) or 'gzip'. Defaults to zstd when installed.
+    """
+
+    def __init__(self, directory: str, codec: str = None):
+        if codec is None:
+            codec = "zstd" if zstandard is not None else "gzip"
+        if codec == "zstd" and zstandard is None:
+            raise ImportError("the zstd codec needs the zstandard package (pip install zstandard)")
+        if codec not in {"zstd", "gzip"}:
+            raise ValueError(f"unknown codec {codec}")
+
+        self.directory = directory
+        self.codec = codec
+        self._index = dict()  # season -> {gamePk: (offset, length, codec)}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _pack_path(self, season: str) -> str:
+        return os.path.join(self.directory, season + ".pack")
+
+    def _idx_path(self, season: str) -> str:
+        return os.path.join(self.directory, season + ".idx")
+
+    def seasons(self) -> list:
+        return sorted(f[:-4] for f in os.listdir(self.directory) if f.endswith(".idx"))
+
+    def _season_index(self, season: str) -> dict:
+        if season not in self._index:
+            index = dict()
+            if os.path.exists(self._idx_path(season)):
+                with open(self._idx_path(season), "r") as f:
+                    for line in f:
+                        game_id, offset, length, codec = line.split()
+                        index[int(game_id)] = (int(offset), int(length), codec)
+            self._index[season] = index
+        return self._index[season]
+
+    def __contains__(self, game_id) -> bool:
+        return int(game_id) in self._season_index(season_of(game_id))
+
+    def _prefix_seasons(self, prefix: str = None) -> list:
+        if prefix is None:
+            return self.seasons()
+        return [s for s in self.seasons() if s.startswith(str(prefix)[:4])]
+
+    def game_ids(self, prefix: str = None) -> list:
+        """Sorted gamePks, optionally only those starting with `prefix` (e.g. '2016' or '201602')"""
+        ids = (g for s in self._prefix_seasons(prefix) for g in self._season_index(s))
+        if prefix is not None:
+            ids = (g for g in ids if str(g).startswith(str(prefix)))
+        return sorted(ids)
+
+    def get_raw(self, game_id) -> bytes:
+        offset, length, codec = self._season_index(season_of(game_id))[int(game_id)]
+        with open(self._pack_path(season_of(game_id)), "rb") as f:
+            f.seek(offset)
+            return _decompress(f.read(length), codec)
+
+    def get(self, game_id, schema: str = None) -> dict:
+        return jsonio.loads(self.get_raw(game_id), schema=schema)
+
+    def put(self, game_id, data):
+        """Saves a game, given either as the raw json bytes or as a dict. Safe to call from several threads."""
+        if not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+        frame = _compress(data, self.codec)
+        season = season_of(game_id)
+
+        with self._lock:
+            index = self._season_index(season)
+            with open(self._pack_path(season), "ab") as f:
+                offset = f.tell()
+                f.write(frame)
+            with open(self._idx_path(season), "a") as f:
+                f.write(f"{int(game_id)} {offset} {len(frame)} {self.codec}\n")
+            index[int(game_id)] = (offset, len(frame), self.codec)
+
+    def iter_raw(self, prefix: str = None):
+        """
+        Yields (gamePk, raw json bytes) for every game, optionally only those whose gamePk starts with
+        `prefix`, streaming each season pack sequentially. Skipped games are never decompressed.
+        """
+        for s in self._prefix_seasons(prefix):
+            entries = sorted(self._season_index(s).items(), key=lambda t: t[1][0])
+            if prefix is not None:
+                entries = [t for t in entries if str(t[0]).startswith(str(prefix))]
+            with open(self._pack_path(s), "rb") as f:
+                for game_id, (offset, length, codec) in entries:
+                    f.seek(offset)
+                    yield game_id, _decompress(f.read(length), codec)
+
+    def iter_games(self, prefix: str = None, schema: str = None):
+        """
+        Yields the decoded games one at a time, optionally only those whose gamePk starts with `prefix`.
+        `schema` selects a slim typed decode (see ift6758.data.jsonio.loads).
+        """
+        for _, raw in self.iter_raw(prefix):
+            yield jsonio.loads(raw, schema=schema)
+
+
+def open_store(directory, codec: str = None):
+    """
+    Returns the store for `directory`: a PackedStore if it holds season packs (or if a codec is
+    asked for), a JsonDirStore otherwise. Stores are passed through unchanged.
+    """
+    if isinstance(directory, (JsonDirStore, PackedStore)):
+        return directory
+
+    if codec is not None or (os.path.isdir(directory) and any(f.endswith(".idx") for f in os.listdir(directory))):
+        return PackedStore(directory, codec=codec)
+
+    return JsonDirStore(directory)
+
+
+def migrate(src: str, dst: str, codec: str = None) -> int:
+    """Copies every game of the json directory `src` into a PackedStore at `dst`. Returns the game count."""
+    source = JsonDirStore(src)
+    target = PackedStore(dst, codec=codec)
+
+    n = 0
+    for game_id, raw in source.iter_raw():
+        if game_id not in target:
+            target.put(game_id, raw)
+            n += 1
+
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw game store utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="convert a <gamePk>.json directory to season packs")
+    migrate_parser.add_argument("src")
+    migrate_parser.add_argument("dst")
+    migrate_parser.add_argument("--codec", choices=["zstd", "gzip"], default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        n = migrate(args.src, args.dst, codec=args.codec)
+        print(f"Migrated {n} games from {args.src} to {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
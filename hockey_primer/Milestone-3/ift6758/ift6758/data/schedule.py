@@ -0,0 +1,139 @@
+"""
+Season schedule discovery for the api-web endpoints.
+
+The api-web API has no league-wide season schedule, so the game ids of a season are the union of
+every club's `club-schedule-season`. ScheduleDiscovery fetches those club schedules concurrently,
+only for the franchises active that season, and caches the team list and the season game ids on
+disk so that repeated runs don't hit the network at all until the cache expires.
+"""
+
+import json
+import os
+import time
+
+from ift6758.data.downloader import default_downloader
+
+
+web_api_url = "https://api-web.nhle.com/v1/"
+stats_api_url = "https://api.nhle.com/stats/rest/en/"
+
+default_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "ift6758", "schedule")
+
+
+class ScheduleDiscovery:
+    """
+    Args:
+        cache_dir (str): Folder for the cached json files, or None to disable the disk cache.
+        ttl (float): Seconds a cached entry stays valid.
+        downloader (Downloader): Defaults to the shared downloader.
+        web_api_url (str): api-web base url (club schedules).
+        stats_api_url (str): stats api base url (teams and per-season team summaries).
+    """
+
+    def __init__(self, cache_dir: str = default_cache_dir, ttl: float = 24 * 3600, downloader=None,
+                 web_api_url: str = web_api_url, stats_api_url: str = stats_api_url):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.downloader = downloader or default_downloader()
+        self.web_api_url = web_api_url
+        self.stats_api_url = stats_api_url
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _cached(self, name: str, fetch):
+        """Returns the cached value `name` if fresh, otherwise calls `fetch` and caches its (non None) result"""
+        path = os.path.join(self.cache_dir, name + ".json") if self.cache_dir is not None else None
+
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                entry = json.load(f)
+            if time.time() - entry["fetched_at"] < self.ttl:
+                return entry["data"]
+
+        data = fetch()
+
+        if path is not None and data is not None:
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"fetched_at": time.time(), "data": data}, f)
+            os.replace(tmp, path)
+
+        return data
+
+    def teams(self) -> list:
+        """Every team the stats api knows, defunct ones included"""
+        def fetch():
+            data = self.downloader.get_json(f"{self.stats_api_url}team")
+            return data["data"] if data is not None else None
+
+        return self._cached("teams", fetch) or []
+
+    def active_team_ids(self, season) -> list:
+        """Ids of the teams that played in `season` (e.g. '20232024'), or None if unknown"""
+        def fetch():
+            data = self.downloader.get_json(f"{self.stats_api_url}team/summary?cayenneExp=seasonId={season}")
+            return sorted({team["teamId"] for team in data["data"]}) if data is not None else None
+
+        return self._cached(f"active_teams_{season}", fetch)
+
+    def team_abbreviations(self, season=None) -> list:
+        """
+        Team abbreviations, restricted to the franchises active in `season` when given.
+        Falls back to every team if the active franchises can't be fetched.
+        """
+        teams = self.teams()
+        if season is not None:
+            active = self.active_team_ids(season)
+            if active:
+                active = set(active)
+                teams = [team for team in teams if team["id"] in active]
+
+        return sorted({team["triCode"] for team in teams})
+
+    def _fetch_game_ids(self, season, team_abbreviations) -> tuple:
+        """Returns (sorted game ids, whether every club schedule could be fetched)"""
+        schedule_urls = {
+            team_abbr: f"{self.web_api_url}club-schedule-season/{team_abbr}/{season}"
+            for team_abbr in team_abbreviations
+        }
+        schedules = self.downloader.fetch_many(schedule_urls, desc=f"schedules {season}")
+
+        game_ids = sorted({game["id"] for schedule in schedules.values() for game in schedule.get("games", [])})
+
+        return game_ids, len(schedules) == len(schedule_urls)
+
+    def game_ids(self, season, team_abbreviations=None) -> list:
+        """
+        Sorted game ids of `season`, from the concurrently fetched club schedules of
+        `team_abbreviations`. By default the franchises active that season are used, and the
+        result is cached.
+        """
+        # explicit team lists are not cached: they may be any subset of the league
+        if team_abbreviations is not None:
+            return self._fetch_game_ids(season, team_abbreviations)[0]
+
+        partial = []
+
+        def fetch():
+            game_ids, complete = self._fetch_game_ids(season, self.team_abbreviations(season))
+            if not complete:
+                # returned as is, but a partial schedule must not be cached
+                partial.extend(game_ids)
+                return None
+            return game_ids
+
+        return self._cached(f"game_ids_{season}", fetch) or partial
+
+
+_default_discovery = None
+
+
+def default_discovery() -> ScheduleDiscovery:
+    """Lazily created ScheduleDiscovery with the default disk cache, shared by callers that don't pass their own"""
+    global _default_discovery
+
+    if _default_discovery is None:
+        _default_discovery = ScheduleDiscovery()
+
+    return _default_discovery
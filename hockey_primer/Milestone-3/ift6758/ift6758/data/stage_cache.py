@@ -0,0 +1,233 @@
+"""
+Content-addressed cache of per-game pipeline stage outputs.
+
+Every stage output is stored under the key of what produced it: the content hash of its input (the raw
+json, or the key of the previous stage's output) and the version of the stage code. A stage is only
+recomputed for a game when one of them changes, e.g. a new or corrected game, or an edited feature
+function (then only that stage and the stages after it are recomputed).
+
+    <directory>/<stage>/<gamePk>/<key>.pkl
+
+Only the latest output of a stage is kept for a game: storing a new one evicts the stale ones.
+"""
+
+import hashlib
+import inspect
+import marshal
+import os
+import pickle
+import site
+import sysconfig
+import tempfile
+
+
+def stage_key(*parts) -> str:
+    """Key of a stage output, from the key / content hash of its input and the stage version(s)"""
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+_library_dirs = tuple(
+    d for d in [sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["purelib"], *site.getsitepackages()] if d
+)
+
+
+def _is_project_file(path) -> bool:
+    return path is not None and not path.startswith(_library_dirs)
+
+
+def _is_project_code(obj) -> bool:
+    if not (inspect.isfunction(obj) or inspect.isclass(obj)):
+        return False
+    try:
+        path = inspect.getsourcefile(obj)
+    except TypeError:  # builtins
+        return False
+    return _is_project_file(path)
+
+
+def _is_project_module(obj) -> bool:
+    return inspect.ismodule(obj) and _is_project_file(getattr(obj, "__file__", None))
+
+
+def _functions(obj) -> list:
+    # the functions of a function, or of the methods (and class/static methods, properties) of a class
+    if not inspect.isclass(obj):
+        return [obj]
+    functions = []
+    for f in vars(obj).values():
+        if isinstance(f, (classmethod, staticmethod)):
+            f = f.__func__
+        if isinstance(f, property):
+            functions.extend(g for g in (f.fget, f.fset, f.fdel) if g is not None)
+        elif inspect.isfunction(f):
+            functions.append(f)
+    return functions
+
+
+def _code_objects(obj):
+    todo = [f.__code__ for f in _functions(obj)]
+    while todo:
+        code = todo.pop()
+        yield code
+        todo.extend(c for c in code.co_consts if inspect.iscode(c))
+
+
+def _globals(obj) -> dict:
+    if inspect.isclass(obj):
+        return vars(inspect.getmodule(obj))
+    return obj.__globals__
+
+
+def _source(obj) -> bytes:
+    try:
+        return inspect.getsource(obj).encode()
+    except OSError:  # defined interactively: hash the bytecode instead
+        return b"".join(marshal.dumps(code) for code in _code_objects(obj))
+
+
+def _constant(value):
+    """Stable repr of a module-level constant (numbers, strings, containers and arrays of them), else None"""
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_constant(v) for v in value]
+        if None in items:
+            return None
+        if isinstance(value, (set, frozenset)):  # not in iteration order: it changes with the hash seed
+            items = sorted(items)
+        return f"{type(value).__name__}({', '.join(items)})"
+    if isinstance(value, dict):
+        items = [(_constant(k), _constant(v)) for k, v in value.items()]
+        if any(k is None or v is None for k, v in items):
+            return None
+        return f"dict({', '.join(f'{k}: {v}' for k, v in items)})"
+    if hasattr(value, "dtype") and hasattr(value, "tolist"):  # numpy arrays
+        items = _constant(value.tolist())
+        return None if items is None else f"array({value.dtype}, {items})"
+    return None
+
+
+def code_version(*objs) -> str:
+    """
+    Version of the code of the given functions / classes: a hash of their source, and of what they refer to
+    (recursively, library code excluded):
+
+        - the project functions and classes they name, also as attributes of project modules (jsonio.loads)
+        - the module-level constants they name (UPPER_CASE names of numbers, strings, and lists, dicts, ... of
+          them; not the caches filled at run time)
+        - the classes of their module that define a method or attribute they use (index.opponent), as the
+          class of an object is not known from the code that calls its methods
+
+    Editing any of them changes the version.
+    """
+    found = dict()
+    constants = dict()
+    todo = list(objs)
+    while todo:
+        obj = todo.pop()
+        name = f"{obj.__module__}.{obj.__qualname__}"
+        if name in found:
+            continue
+        found[name] = obj
+
+        namespace = _globals(obj)
+        module = namespace.get("__name__")
+        modules = [v for v in namespace.values() if _is_project_module(v)]
+        classes = [v for v in namespace.values() if inspect.isclass(v) and _is_project_code(v)]
+        for code in _code_objects(obj):
+            for n in code.co_names:
+                if n in namespace:
+                    value = namespace[n]
+                    if _is_project_code(value):
+                        todo.append(value)
+                    elif n.isupper() and _constant(value) is not None:
+                        constants[f"{module}.{n}"] = _constant(value)
+                    continue
+
+                # an attribute: of a project module, or a method / class attribute of a project class
+                for m in modules:
+                    value = getattr(m, n, None)
+                    if _is_project_code(value):
+                        todo.append(value)
+                    elif n.isupper() and _constant(value) is not None:
+                        constants[f"{m.__name__}.{n}"] = _constant(value)
+                todo.extend(c for c in classes if n in vars(c))
+
+    h = hashlib.sha256()
+    for name in sorted(found):
+        h.update(name.encode())
+        h.update(_source(found[name]))
+    for name in sorted(constants):
+        h.update(name.encode())
+        h.update(constants[name].encode())
+    return h.hexdigest()
+
+
+class StageCache:
+    """
+    Per-game stage outputs on disk, see the module docstring.
+
+    Args:
+        directory (str): Folder of the cache. Created if missing.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _game_dir(self, stage: str, game_id) -> str:
+        return os.path.join(self.directory, stage, str(game_id))
+
+    def _path(self, stage: str, game_id, key: str) -> str:
+        return os.path.join(self._game_dir(stage, game_id), key + ".pkl")
+
+    def __contains__(self, item) -> bool:
+        """(stage, game_id, key) in cache"""
+        return os.path.exists(self._path(*item))
+
+    def get(self, stage: str, game_id, key: str, default=None):
+        """The output of `stage` for `game_id` stored under `key`, or `default`"""
+        try:
+            with open(self._path(stage, game_id, key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return default
+
+    def put(self, stage: str, game_id, key: str, value):
+        """Stores an output and evicts the game's other (stale) outputs of that stage"""
+        game_dir = self._game_dir(stage, game_id)
+        os.makedirs(game_dir, exist_ok=True)
+
+        # write then rename, so that concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=game_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(stage, game_id, key))
+
+        for f in os.listdir(game_dir):
+            if f.endswith(".pkl") and f != key + ".pkl":
+                os.remove(os.path.join(game_dir, f))
+
+    def game_ids(self, stage: str) -> list:
+        stage_dir = os.path.join(self.directory, stage)
+        if not os.path.isdir(stage_dir):
+            return []
+        return sorted(int(g) for g in os.listdir(stage_dir) if g.isdigit())
+
+    def evict(self, stage: str, keep) -> int:
+        """Removes the outputs of `stage` for the games not in `keep`. Returns the number of games evicted."""
+        keep = {int(g) for g in keep}
+        n = 0
+        for game_id in self.game_ids(stage):
+            if game_id not in keep:
+                game_dir = self._game_dir(stage, game_id)
+                for f in os.listdir(game_dir):
+                    os.remove(os.path.join(game_dir, f))
+                os.rmdir(game_dir)
+                n += 1
+        return n
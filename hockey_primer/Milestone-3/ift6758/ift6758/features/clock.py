@@ -0,0 +1,49 @@
+"""
+Integer game clock of plays.
+
+The statsapi gives the time of a play as a "MM:SS" string since the start of its period. The tidy stage
+parses it once into integers:
+
+    period_seconds  seconds since the start of the period (int16)
+    game_seconds    seconds since the start of the game (int32), counting every period before as
+                    PERIOD_SECONDS long: plays sort by (period, periodTime) with game_seconds alone
+
+Downstream features (ordering, time between events, penalty windows) use integer arithmetic on these
+columns instead of comparing or parsing the strings. A missing period time gives NaN (and float columns).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+PERIOD_SECONDS = 20 * 60
+
+
+def period_seconds(period_time) -> np.ndarray:
+    """Seconds since the start of the period of "MM:SS" period times"""
+    period_time = pd.Series(period_time, copy=False)
+    missing = period_time.isna().to_numpy()
+
+    # "MM:SS" as a (n, 5) array of digits (':' is 10), parsed without any per row work
+    values = period_time.fillna("00:00").to_numpy(dtype="S5")
+    digits = np.frombuffer(values.tobytes(), dtype=np.uint8).reshape(-1, 5).astype(np.int16) - ord("0")
+
+    if len(digits) and ((digits[:, 2] != 10).any() or (digits[:, [0, 1, 3, 4]] > 9).any()
+                        or (digits < 0).any()):
+        # not all "MM:SS" (e.g. "5:00"), parsed as text
+        parts = period_time.fillna("00:00").str.split(":", n=1, expand=True)
+        seconds = (pd.to_numeric(parts[0]) * 60 + pd.to_numeric(parts[1])).to_numpy(dtype=np.int16)
+    else:
+        seconds = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+
+    if missing.any():
+        seconds = np.where(missing, np.nan, seconds)
+    return seconds
+
+
+def game_seconds(period, period_seconds) -> np.ndarray:
+    """Seconds since the start of the game of plays at `period_seconds` into `period` (1, 2, ...)"""
+    period = np.asarray(period)
+    period_seconds = np.asarray(period_seconds)
+    dtype = np.int32 if period_seconds.dtype.kind in "iu" and period.dtype.kind in "iu" else np.float64
+    return (period.astype(dtype) - 1) * PERIOD_SECONDS + period_seconds.astype(dtype)
@@ -0,0 +1,176 @@
+"""
+Per-game lookups of the teams and rink sides, shared by the feature steps.
+
+A GameIndex holds, for every game of a dataset (built once from its games table, see
+milestone1_func.game_table and ift6758_milestone3.game_table), the ids and names of its away and home
+teams and their rink sides, as arrays sorted by gamePk. The game of each play is found with one
+np.searchsorted of all the plays, so every lookup is vectorized:
+
+    index = GameIndex.from_games(games).set_period_1_sides(load_period_sides())
+    index.opponent(plays['gamePk'], plays['team_id'])
+    index.rink_side(plays['gamePk'], plays['team_id'], plays['period'])
+
+Rink sides are the sides of the first period, flipped on even periods, unless the side of a (game, period)
+was set explicitly (set_period_sides). The index is saved as a compressed .npz:
+
+    index.save(path)
+    index = GameIndex.load(path)
+"""
+
+import numpy as np
+import pandas as pd
+
+from ift6758.features.strength import PERIOD_SPAN
+
+
+AWAY, HOME = 0, 1
+
+# Rink side codes: 0 = unknown
+SIDES = np.array([None, "left", "right"], dtype=object)
+FLIP = np.array([0, 2, 1], dtype=np.int8)
+
+# Team columns of the games tables of both APIs: (away id, home id, away name, home name)
+_GAME_COLUMNS = [
+    ("away_team_id", "home_team_id", "away_team_name", "home_team_name"),
+    ("awayTeamId", "homeTeamId", "awayTeamName", "homeTeamName"),
+]
+
+
+def side_codes(sides) -> np.ndarray:
+    """int8 codes of rink sides ('left' / 'right', anything else is unknown)"""
+    sides = np.asarray(sides, dtype=object)
+    return np.where(sides == "left", 1, np.where(sides == "right", 2, 0)).astype(np.int8)
+
+
+class GameIndex:
+    """
+    Args:
+        game_pk (array): The games.
+        away_team_id, home_team_id (array): Their team ids (NaN when unknown).
+        away_team_name, home_team_name (array): Their team names (optional, for the sides tables keyed by name).
+    """
+
+    def __init__(self, game_pk, away_team_id, home_team_id, away_team_name=None, home_team_name=None):
+        game_pk = np.asarray(game_pk, dtype=np.int64)
+        if away_team_name is None:
+            away_team_name = home_team_name = np.full(len(game_pk), "")
+
+        # sorted by gamePk, the last listing of a game wins
+        order = np.argsort(game_pk, kind="stable")
+        last = np.append(game_pk[order][1:] != game_pk[order][:-1], True) if len(game_pk) else np.zeros(0, bool)
+        order = order[last]
+
+        self.game_pk = game_pk[order]
+        self.team_id = np.column_stack([np.asarray(away_team_id, dtype=float)[order],
+                                        np.asarray(home_team_id, dtype=float)[order]]).reshape(-1, 2)
+        self.team_name = np.column_stack([np.asarray(away_team_name, dtype=str)[order],
+                                          np.asarray(home_team_name, dtype=str)[order]]).reshape(-1, 2)
+        self.period_1_side = np.zeros((len(self.game_pk), 2), dtype=np.int8)
+        # explicit sides of (game, period) keys: gamePk * PERIOD_SPAN + period, sorted
+        self.period_keys = np.zeros(0, dtype=np.int64)
+        self.period_side = np.zeros((0, 2), dtype=np.int8)
+
+    @classmethod
+    def from_games(cls, games: pd.DataFrame) -> "GameIndex":
+        """From a games table of either API, indexed by gamePk or with a gamePk column"""
+        if "gamePk" in games.columns:
+            games = games.set_index("gamePk")
+        for away_id, home_id, away_name, home_name in _GAME_COLUMNS:
+            if away_id in games:
+                return cls(games.index, games[away_id], games[home_id], games[away_name].fillna(""),
+                           games[home_name].fillna(""))
+        raise ValueError(f"no team columns in the games table: {list(games.columns)}")
+
+    def __len__(self):
+        return len(self.game_pk)
+
+    def _rows(self, game_pk):
+        # row of the game of each play, and whether it is in the index
+        game_pk = np.asarray(game_pk, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.game_pk, game_pk), max(len(self.game_pk) - 1, 0))
+        found = self.game_pk[rows] == game_pk if len(self.game_pk) else np.zeros(len(game_pk), dtype=bool)
+        return rows, found
+
+    def contains(self, game_pk) -> np.ndarray:
+        return self._rows(game_pk)[1]
+
+    def team_slot(self, game_pk, team_id) -> np.ndarray:
+        """HOME or AWAY for the team of each play, -1 for plays without team or of another team"""
+        rows, found = self._rows(game_pk)
+        team_id = np.asarray(team_id, dtype=float)
+        teams = self.team_id[rows]
+        slot = np.where(team_id == teams[:, HOME], HOME, np.where(team_id == teams[:, AWAY], AWAY, -1))
+        return np.where(found, slot, -1).astype(np.int8)
+
+    def team_ids(self, game_pk, slot) -> np.ndarray:
+        """Team id of the HOME or AWAY team of the game of each play (NaN for the games not in the index)"""
+        rows, found = self._rows(game_pk)
+        return np.where(found, self.team_id[rows, slot], np.nan)
+
+    def opponent(self, game_pk, team_id) -> np.ndarray:
+        """Team id of the other team of the game of each play (NaN for plays without team)"""
+        rows, _ = self._rows(game_pk)
+        slot = self.team_slot(game_pk, team_id)
+        return np.where(slot >= 0, self.team_id[rows, 1 - np.maximum(slot, 0)], np.nan)
+
+    def set_period_1_sides(self, period_sides: pd.Series) -> "GameIndex":
+        """
+        Sides of the first period from period_1_side values indexed by (gamePk, team_name), such as
+        milestone1_func.load_period_sides. Returns the index.
+        """
+        for slot in (AWAY, HOME):
+            keys = pd.MultiIndex.from_arrays([self.game_pk, self.team_name[:, slot]])
+            self.period_1_side[:, slot] = side_codes(period_sides.reindex(keys).to_numpy(dtype=object))
+        return self
+
+    def set_period_sides(self, game_pk, period, away_side, home_side) -> "GameIndex":
+        """Sides of both teams in (game, period) pairs, over the first period sides. Returns the index."""
+        keys = np.asarray(game_pk, dtype=np.int64) * PERIOD_SPAN + np.asarray(period, dtype=np.int64)
+        sides = np.column_stack([side_codes(away_side), side_codes(home_side)]).reshape(-1, 2)
+
+        keys = np.concatenate([self.period_keys, keys])
+        sides = np.concatenate([self.period_side, sides])
+        # the last sides set for a key win
+        order = np.argsort(keys, kind="stable")
+        last = np.append(keys[order][1:] != keys[order][:-1], True) if len(keys) else np.zeros(0, bool)
+        self.period_keys, self.period_side = keys[order][last], sides[order][last]
+        return self
+
+    def side_codes(self, game_pk, team_id, period) -> np.ndarray:
+        """Rink side codes (see SIDES) of the team of each play in its period"""
+        rows, _ = self._rows(game_pk)
+        slot = self.team_slot(game_pk, team_id)
+        known = slot >= 0
+        slot = np.maximum(slot, 0)
+        period = np.asarray(period, dtype=np.int64)
+
+        codes = self.period_1_side[rows, slot]
+        codes = np.where(period % 2 == 1, codes, FLIP[codes])
+
+        if len(self.period_keys):
+            keys = np.asarray(game_pk, dtype=np.int64) * PERIOD_SPAN + period
+            at = np.minimum(np.searchsorted(self.period_keys, keys), len(self.period_keys) - 1)
+            explicit = self.period_side[at, slot]
+            codes = np.where((self.period_keys[at] == keys) & (explicit > 0), explicit, codes)
+
+        return np.where(known, codes, 0).astype(np.int8)
+
+    def rink_side(self, game_pk, team_id, period) -> np.ndarray:
+        """Rink side ('left' / 'right', None if unknown) of the team of each play in its period"""
+        return SIDES[self.side_codes(game_pk, team_id, period)]
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path, game_pk=self.game_pk, team_id=self.team_id, team_name=self.team_name,
+            period_1_side=self.period_1_side, period_keys=self.period_keys, period_side=self.period_side,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "GameIndex":
+        with np.load(path) as data:
+            index = cls(data["game_pk"], data["team_id"][:, AWAY], data["team_id"][:, HOME],
+                        data["team_name"][:, AWAY], data["team_name"][:, HOME])
+            index.period_1_side = data["period_1_side"]
+            index.period_keys = data["period_keys"]
+            index.period_side = data["period_side"]
+        return index
@@ -0,0 +1,70 @@
+"""
+Shot geometry relative to the net being attacked.
+
+Nets are approximated as the points (-89, 0) and (89, 0). A team whose rink side is 'left' attacks
+the right net (89, 0); any other side attacks the left net (-89, 0).
+
+`shot_geometry` computes, for arrays of shot coordinates, in one pass over a single preallocated
+buffer (float64 or float32):
+
+    x_from_net  distance to the net along the x axis (>= 0)
+    distance    distance to the net
+    angle       angle to the net in degrees: 0 right in front of it, 90 from the goal line
+
+A shot from the net itself (distance 0) has no angle: NaN, without any division warning. Missing
+coordinates give NaN too.
+"""
+
+import numpy as np
+
+
+NET_X = 89.0
+
+
+def attacks_right_net(side) -> np.ndarray:
+    """Boolean array of the rink sides attacking the right net (side 'left')"""
+    side = np.asarray(side)
+    if side.dtype == bool:
+        return side
+    return side == "left"
+
+
+def shot_geometry(x, y, side, dtype=np.float64, out: np.ndarray = None):
+    """
+    Args:
+        x, y (array-like): Shot coordinates.
+        side (array-like): Rink side of the shooting team ('left' / 'right'), or a boolean array that is
+            True when the right net is attacked.
+        dtype: float64 or float32, the dtype of the results (and of the computation).
+        out (np.ndarray): Optional (3, n) buffer of that dtype to write into, reused across calls.
+
+    Returns:
+        (x_from_net, distance, angle): views of one (3, n) buffer.
+    """
+    x = np.asarray(x, dtype=dtype)
+    y = np.asarray(y, dtype=dtype)
+    right = attacks_right_net(side)
+
+    if out is None:
+        out = np.empty((3, len(x)), dtype=dtype)
+    x_from_net, distance, angle = out
+
+    # |89 - x| when attacking the right net, |-89 - x| otherwise
+    np.subtract(NET_X, x, out=x_from_net, where=right)
+    np.add(NET_X, x, out=x_from_net, where=~right)
+    np.abs(x_from_net, out=x_from_net)
+
+    # angle is used as scratch for y ** 2
+    np.multiply(x_from_net, x_from_net, out=distance)
+    np.multiply(y, y, out=angle)
+    np.add(distance, angle, out=distance)
+    np.sqrt(distance, out=distance)
+
+    # the angle is only defined away from the net
+    defined = distance > 0
+    angle.fill(np.nan)
+    np.divide(x_from_net, distance, out=angle, where=defined)
+    np.arccos(angle, out=angle)
+    np.degrees(angle, out=angle)
+
+    return x_from_net, distance, angle
@@ -0,0 +1,162 @@
+"""
+Binned shot counts for the shot figures (feature_engineering_1.q1 / q2 / q3).
+
+A ShotCube counts the shots of a tidied dataset over
+
+    season x distance bin x angle bin x IsGoal x emptyNet
+
+in one pass (one np.bincount). Histograms and goal rates over distance, angle or both are then sums
+over the other axes of a small int array, instead of new passes over the shots. Shots with a missing
+distance or angle, or one outside the bin edges (bad coordinates: no shot is 200 ft from the net), are
+counted in an extra last bin of that axis, left out of the figures.
+
+The cube is updated game by game (games already counted are skipped), and saved as a compressed .npz with
+the version of the code that computed the shots (e.g. a stage_cache.code_version): a saved cube of another
+version is counted again from scratch, as its games would be skipped with stale counts.
+
+    cube = ShotCube.open(path, version)
+    cube.update(new_shots)
+    cube.save(path)
+"""
+
+import os
+
+import numpy as np
+
+
+AXES = ("season", "distance", "angle", "is_goal", "empty_net")
+
+
+class ShotCube:
+    """
+    Args:
+        distance_edges (array): Bin edges of the distance to the net (feet). Defaults to 1 ft bins up to 200.
+        angle_edges (array): Bin edges of the angle to the net (degrees). Defaults to 1 degree bins up to 90.
+        version (str): Version of the code of the counted shots, see the module docstring.
+    """
+
+    def __init__(self, distance_edges=None, angle_edges=None, version: str = None):
+        self.distance_edges = np.arange(0, 201, 1.0) if distance_edges is None else np.asarray(distance_edges, float)
+        self.angle_edges = np.arange(0, 91, 1.0) if angle_edges is None else np.asarray(angle_edges, float)
+        self.version = version
+        self.seasons = []
+        self.game_ids = np.array([], dtype=np.int64)
+        self.counts = np.zeros((0, *self._cell_shape()), dtype=np.int64)
+
+    def _cell_shape(self):
+        # + 1 bin for missing values and values outside the edges
+        return len(self.distance_edges), len(self.angle_edges), 2, 2
+
+    @classmethod
+    def from_frame(cls, df, **kwargs) -> "ShotCube":
+        cube = cls(**kwargs)
+        cube.update(df)
+        return cube
+
+    def _season_index(self, seasons: np.ndarray) -> np.ndarray:
+        new = sorted(set(np.unique(seasons).tolist()) - set(self.seasons))
+        if new:
+            seasons_all = sorted(self.seasons + new)
+            counts = np.zeros((len(seasons_all), *self._cell_shape()), dtype=np.int64)
+            counts[[seasons_all.index(s) for s in self.seasons]] = self.counts
+            self.seasons, self.counts = seasons_all, counts
+        return np.searchsorted(np.array(self.seasons), seasons)
+
+    @staticmethod
+    def _bin(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        # bins of `edges` (the last one includes its right edge, as np.histogram), len(edges) - 1 for missing
+        # values and values outside the edges
+        n = len(edges) - 1
+        index = np.searchsorted(edges, values, side="right") - 1
+        index[values == edges[-1]] = n - 1
+        index[np.isnan(values) | (index < 0) | (index >= n)] = n
+        return index
+
+    def update(self, df) -> int:
+        """
+        Counts the shots (rows with gamePk, Distance_from_net, angle_from_net, IsGoal and emptyNet) of the
+        games not counted yet. Returns the number of shots added.
+        """
+        game_pk = df["gamePk"].to_numpy(dtype=np.int64)
+        new = ~np.isin(game_pk, self.game_ids)
+        if not new.any():
+            return 0
+
+        game_pk = game_pk[new]
+        season = self._season_index(game_pk // 1000000)
+        distance = self._bin(df["Distance_from_net"].to_numpy(dtype=float)[new], self.distance_edges)
+        angle = self._bin(df["angle_from_net"].to_numpy(dtype=float)[new], self.angle_edges)
+        is_goal = df["IsGoal"].to_numpy(dtype=float)[new] == 1
+        empty_net = df["emptyNet"].to_numpy(dtype=float)[new] == 1
+
+        cell = np.ravel_multi_index((season, distance, angle, is_goal, empty_net), self.counts.shape)
+        self.counts += np.bincount(cell, minlength=self.counts.size).reshape(self.counts.shape)
+        self.game_ids = np.union1d(self.game_ids, game_pk)
+
+        return len(game_pk)
+
+    def select(self, keep=("distance",), seasons=None, is_goal=None, empty_net=None, with_missing=False) -> np.ndarray:
+        """
+        Counts summed over every axis but `keep` (names of AXES, in that order), for the given seasons
+        (all by default) and IsGoal / emptyNet values (both by default). Missing (or outside the edges)
+        distances / angles are left out unless `with_missing`.
+        """
+        counts = self.counts
+        if seasons is not None:
+            counts = counts[[self.seasons.index(int(s)) for s in seasons]]
+        if not with_missing:
+            counts = counts[:, :-1, :-1]
+        if is_goal is not None:
+            counts = counts[:, :, :, [int(is_goal)]]
+        if empty_net is not None:
+            counts = counts[:, :, :, :, [int(empty_net)]]
+
+        summed = tuple(i for i, axis in enumerate(AXES) if axis not in keep)
+        return counts.sum(axis=summed)
+
+    def goal_rate(self, axis="distance", seasons=None) -> np.ndarray:
+        """#goals / #shots per bin of `axis` ('distance' or 'angle'), NaN for empty bins"""
+        shots = self.select((axis,), seasons=seasons)
+        goals = self.select((axis,), seasons=seasons, is_goal=True)
+        rate = np.full(shots.shape, np.nan)
+        np.divide(goals, shots, out=rate, where=shots > 0)
+        return rate
+
+    def edges(self, axis: str) -> np.ndarray:
+        return self.distance_edges if axis == "distance" else self.angle_edges
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path, counts=self.counts.astype(np.int32), seasons=np.array(self.seasons, dtype=np.int64),
+            game_ids=self.game_ids, distance_edges=self.distance_edges, angle_edges=self.angle_edges,
+            version=np.array("" if self.version is None else self.version),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ShotCube":
+        with np.load(path) as data:
+            # cubes saved before versions were kept have none
+            version = str(data["version"]) if "version" in data.files else ""
+            cube = cls(data["distance_edges"], data["angle_edges"], version=version or None)
+            cube.counts = data["counts"].astype(np.int64)
+            cube.seasons = data["seasons"].tolist()
+            cube.game_ids = data["game_ids"]
+        return cube
+
+    @classmethod
+    def open(cls, path: str, version: str = None, **kwargs) -> "ShotCube":
+        """
+        The cube saved at `path` if it was counted with `version`, else a new empty cube of `version` (kwargs:
+        its edges), to count all the games again
+        """
+        if os.path.exists(path):
+            cube = cls.load(path)
+            if cube.version == version:
+                return cube
+        return cls(version=version, **kwargs)
+
+
+def rebin(counts: np.ndarray, edges: np.ndarray, factor: int, axis: int = 0):
+    """Merges every `factor` consecutive bins of `axis` (a trailing partial group is merged too)"""
+    starts = np.arange(0, counts.shape[axis], factor)
+    return np.add.reduceat(counts, starts, axis=axis), np.append(edges[starts], edges[-1])
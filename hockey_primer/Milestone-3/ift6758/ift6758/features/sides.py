@@ -0,0 +1,91 @@
+"""
+Rink sides of the teams in the first period, inferred game by game from their shot coordinates.
+
+Teams shoot at the net of the other half of the rink, and switch sides every period: the median x of the
+shots of a team in a period, with the sign flipped on even periods (norm_x), is on the side it attacks in
+the first period. Per game and team, the median norm_x over the periods is taken; the team with the lowest
+one attacks the left net (period_1_side 'right'), the other team the right net ('left').
+
+The inferred sides are kept in a sides table (csv: gamePk, team_name, norm_x, period_1_side), appended as
+new games come in; the games already in it are never inferred again:
+
+    table = SidesTable("resources/period_1_sides.csv")
+    rows = table.infer_missing(shots)   # sides of the games of the shots that are not in the table
+    table.append(rows)
+    table.period_sides()                # period_1_side indexed by (gamePk, team_name)
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+SIDES_COLUMNS = ["gamePk", "team_name", "norm_x", "period_1_side"]
+
+_period_sides = dict()  # path -> (mtime, period_1_side Series indexed by (gamePk, team_name))
+
+
+def infer_period_1_sides(plays: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sides table rows (SIDES_COLUMNS) of the games of `plays` (their shots: gamePk, period, team_name and x
+    columns), one per game and team.
+    """
+    x = plays.groupby(["gamePk", "period", "team_name"], observed=True)["x"].median().reset_index()
+    x["norm_x"] = x["x"].to_numpy(dtype=float) * np.where(x["period"].to_numpy() % 2 == 1, 1, -1)
+
+    sides = x.groupby(["gamePk", "team_name"], observed=True)["norm_x"].median().reset_index()
+    min_x = sides.groupby("gamePk")["norm_x"].transform("min")
+    sides["period_1_side"] = np.where(sides["norm_x"] == min_x, "right", "left")
+    return sides[SIDES_COLUMNS]
+
+
+def game_sides(period_sides: pd.Series, game_ids) -> dict:
+    """{gamePk: ((team_name, period_1_side), ...) or None} of game_ids, e.g. as a part of their cache keys"""
+    game_pk = period_sides.index.get_level_values(0)
+    known = period_sides[game_pk.isin(list(game_ids))]
+    sides = dict.fromkeys(game_ids)
+    for (g, team_name), side in sorted(known.items()):
+        sides[g] = (sides[g] or ()) + ((team_name, side),)
+    return sides
+
+
+class SidesTable:
+    """
+    The sides table at `path` (created by the first append).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def period_sides(self) -> pd.Series:
+        """period_1_side indexed by (gamePk, team_name), read once per process (and again if the file changes)"""
+        if not os.path.exists(self.path):
+            return pd.Series([], index=pd.MultiIndex.from_arrays([[], []], names=["gamePk", "team_name"]),
+                             name="period_1_side", dtype=object)
+
+        mtime = os.path.getmtime(self.path)
+        if self.path not in _period_sides or _period_sides[self.path][0] != mtime:
+            period_sides = pd.read_csv(self.path).drop_duplicates(["gamePk", "team_name"], keep="last")
+            _period_sides[self.path] = (mtime, period_sides.set_index(["gamePk", "team_name"])["period_1_side"])
+        return _period_sides[self.path][1]
+
+    def infer_missing(self, plays: pd.DataFrame) -> pd.DataFrame:
+        """Inferred rows of the games of `plays` that are not in the table (not written, see append)"""
+        known = self.period_sides().index.get_level_values(0)
+        return infer_period_1_sides(plays[~plays["gamePk"].isin(known)])
+
+    def append(self, rows: pd.DataFrame):
+        """Appends the rows of the games that are not in the table yet"""
+        if not len(rows):
+            return
+        period_sides = self.period_sides()
+        rows = rows[~rows["gamePk"].isin(period_sides.index.get_level_values(0))]
+        rows = rows.drop_duplicates(["gamePk", "team_name"], keep="last")
+        if not len(rows):
+            return
+
+        rows[SIDES_COLUMNS].to_csv(self.path, mode="a", index=False, header=not os.path.exists(self.path))
+        # the table read so far + the new rows, instead of reading it all again
+        new = rows.set_index(["gamePk", "team_name"])["period_1_side"]
+        _period_sides[self.path] = (os.path.getmtime(self.path), pd.concat([period_sides, new]))
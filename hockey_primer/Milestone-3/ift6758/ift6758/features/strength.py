@@ -0,0 +1,168 @@
+"""
+On-ice strength of the teams from the penalties of their games.
+
+Every penalty takes a skater off the ice of the penalized team from its start to its end (in seconds of
+the game clock, see ift6758.features.clock), so a penalty taken at the end of a period carries over into
+the next one. A team has SKATERS skaters minus its running penalties: `start <= time < end`.
+
+A PenaltyTimeline keeps the penalty starts and ends of many games as two sorted arrays of integer keys
+
+    ((gamePk * TEAM_SPAN + team_id) * TIME_SPAN + seconds)
+
+the sorted timeline of start and end events of every (game, team). The number of penalties running for a
+play is then the number of starts minus the number of ends before its own key: one np.searchsorted of all
+the plays in each array, whatever the number of penalties per game.
+
+    timeline = PenaltyTimeline.from_plays(plays)
+    n_players, n_opposing_players = timeline.strength(plays['gamePk'], plays['team_id'], plays['game_seconds'])
+
+Powerplays are the penalties of both teams of a (game, period), as open intervals `start < time < end` of
+period seconds. PowerplayWindows merges them once into disjoint windows: the overlapping penalties of a
+window chain back to its first one, the start of the powerplay. The window of each play is found with one
+np.searchsorted of all the plays in the sorted window starts.
+
+    windows = PowerplayWindows.from_plays(plays)
+    time_since_powerplay = windows.time_since_start(plays['gamePk'], plays['period'], plays['period_seconds'])
+"""
+
+import numpy as np
+import pandas as pd
+
+
+SKATERS = 5
+
+TIME_SPAN = 1 << 16  # > any game_seconds (and penalty end)
+TEAM_SPAN = 1 << 10  # > any team id
+PERIOD_SPAN = 1 << 6  # > any period
+
+
+def opposing_team(game_pk, team_id) -> np.ndarray:
+    """Team id of the other team of the game of each play (NaN for plays without team, or games of one team)"""
+    teams = pd.DataFrame({"gamePk": np.asarray(game_pk), "team_id": np.asarray(team_id, dtype=float)})
+    pairs = teams.dropna().groupby("gamePk")["team_id"].agg(["min", "max"])
+    pairs = pairs.reindex(teams["gamePk"]).to_numpy()
+
+    opposing = pairs.sum(axis=1) - teams["team_id"].to_numpy()
+    opposing[pairs[:, 0] == pairs[:, 1]] = np.nan
+    return opposing
+
+
+def _keys(game_pk, team_id, seconds):
+    # int64 keys of (game, team, seconds), and whether both the team and the time are known
+    team_id, seconds = np.asarray(team_id, dtype=float), np.asarray(seconds, dtype=float)
+    known = ~(np.isnan(team_id) | np.isnan(seconds))
+    keys = np.asarray(game_pk, dtype=np.int64) * TEAM_SPAN + np.where(known, team_id, 0).astype(np.int64)
+    return keys * TIME_SPAN + np.where(known, seconds, 0).astype(np.int64), known
+
+
+class PenaltyTimeline:
+    """
+    Args:
+        game_pk, team_id (array-like): Game and penalized team of each penalty.
+        start, end (array-like): Game seconds of the start and end of each penalty.
+    """
+
+    def __init__(self, game_pk, team_id, start, end):
+        start, end = np.asarray(start, dtype=float), np.asarray(end, dtype=float)
+        # penalties without team or time never run
+        valid = ~(np.isnan(np.asarray(team_id, dtype=float)) | np.isnan(start) | np.isnan(end))
+        game_pk, team_id = np.asarray(game_pk)[valid], np.asarray(team_id, dtype=float)[valid]
+
+        self.starts = np.sort(_keys(game_pk, team_id, start[valid])[0])
+        self.ends = np.sort(_keys(game_pk, team_id, end[valid])[0])
+
+    @classmethod
+    def from_plays(cls, plays: pd.DataFrame) -> "PenaltyTimeline":
+        """Timeline of the PENALTY plays (gamePk, team_id, game_seconds, penaltyMinutes) of a tidied dataset"""
+        penalties = plays[plays["eventTypeId"] == "PENALTY"]
+        start = penalties["game_seconds"].to_numpy(dtype=float)
+        return cls(penalties["gamePk"], penalties["team_id"], start,
+                   start + penalties["penaltyMinutes"].to_numpy(dtype=float) * 60)
+
+    def running(self, game_pk, team_id, seconds) -> np.ndarray:
+        """Number of penalties of `team_id` running at `seconds` of `game_pk` (0 for unknown teams or times), int8"""
+        keys, known = _keys(game_pk, team_id, seconds)
+        running = np.searchsorted(self.starts, keys, side="right") - np.searchsorted(self.ends, keys, side="right")
+        return np.where(known, running, 0).astype(np.int8)
+
+    def strength(self, game_pk, team_id, seconds, opposing_team_id=None):
+        """
+        (n_players, n_opposing_players): skaters of the team of each play and of the other team, int8. The
+        other team defaults to opposing_team(game_pk, team_id).
+        """
+        if opposing_team_id is None:
+            opposing_team_id = opposing_team(game_pk, team_id)
+        n_players = SKATERS - self.running(game_pk, team_id, seconds)
+        n_opposing_players = SKATERS - self.running(game_pk, opposing_team_id, seconds)
+        return n_players, n_opposing_players
+
+
+def _period_keys(game_pk, period, seconds):
+    # int64 keys of (game, period, seconds)
+    keys = np.asarray(game_pk, dtype=np.int64) * PERIOD_SPAN + np.asarray(period, dtype=np.int64)
+    return keys * TIME_SPAN + np.asarray(seconds, dtype=np.int64)
+
+
+class PowerplayWindows:
+    """
+    Args:
+        game_pk, period (array-like): Game and period of each penalty.
+        start, end (array-like): Period seconds of the start and end of each penalty.
+    """
+
+    def __init__(self, game_pk, period, start, end):
+        start, end = np.asarray(start, dtype=float), np.asarray(end, dtype=float)
+        # empty (or unknown) intervals contain no play
+        valid = end > start
+        starts = _period_keys(np.asarray(game_pk)[valid], np.asarray(period)[valid], start[valid])
+        ends = _period_keys(np.asarray(game_pk)[valid], np.asarray(period)[valid], end[valid])
+
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+
+        # a penalty starts a window when no penalty started before it is still running: the first of
+        # equal starts, past the ends of all the penalties before (of its own (game, period) or earlier keys)
+        before = np.searchsorted(starts, starts, side="left")
+        ended = np.maximum.accumulate(ends) if len(ends) else ends
+        first = before == np.arange(len(starts))
+        first[1:] &= ended[before[1:] - 1] <= starts[1:]
+
+        positions = np.flatnonzero(first)
+        self.starts = starts[positions]
+        self.ends = np.maximum.reduceat(ends, positions) if len(positions) else ends[:0]
+
+    @classmethod
+    def from_plays(cls, plays: pd.DataFrame) -> "PowerplayWindows":
+        """Windows of the PENALTY plays (gamePk, period, team_id, period_seconds, penaltyMinutes) of a tidied dataset"""
+        penalties = plays[(plays["eventTypeId"] == "PENALTY") & plays["team_id"].notna()]
+        start = penalties["period_seconds"].to_numpy(dtype=float)
+        return cls(penalties["gamePk"], penalties["period"], start,
+                   start + penalties["penaltyMinutes"].to_numpy(dtype=float) * 60)
+
+    def last_windows(self):
+        """
+        (game_pk, period, start, end) arrays of the last window of each game, the only one plays after its
+        start can fall in. Given back as penalties with the penalties that follow, they give the same windows
+        for the plays after it.
+        """
+        group = self.starts // TIME_SPAN
+        last = np.flatnonzero(np.append(group[1:] // PERIOD_SPAN != group[:-1] // PERIOD_SPAN, True))
+        last = last[:len(group)]
+        group = group[last]
+        return (group // PERIOD_SPAN, group % PERIOD_SPAN, self.starts[last] - group * TIME_SPAN,
+                self.ends[last] - group * TIME_SPAN)
+
+    def time_since_start(self, game_pk, period, seconds) -> np.ndarray:
+        """Seconds since the start of the powerplay running at `seconds` of each play, NaN outside powerplays"""
+        seconds = np.asarray(seconds, dtype=float)
+        known = ~np.isnan(seconds)
+        keys = _period_keys(game_pk, period, np.where(known, seconds, 0))
+
+        # window of the last start strictly before each play, if the play is before its end
+        window = np.searchsorted(self.starts, keys, side="left") - 1
+        inside = known & (window >= 0)
+        inside[inside] = keys[inside] < self.ends[window[inside]]
+
+        since = np.full(len(keys), np.nan)
+        since[inside] = keys[inside] - self.starts[window[inside]]
+        return since
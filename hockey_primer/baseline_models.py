@@ -3,6 +3,7 @@ work in progress
 
 """
 
+import numpy as np
 from sklearn.model_selection import train_test_split
 import matplotlib.pyplot as plt
 from sklearn.linear_model import LogisticRegression
@@ -11,9 +12,10 @@ from sklearn.metrics import roc_curve, auc, roc_auc_score
 from sklearn.calibration import calibration_curve, CalibrationDisplay
 
 
-from main import tidied_training_set
+# Only the columns used here, read from the saved dataset (built first if missing: see registry.py)
+from registry import load_dataset
 
-data.iloc[1]
+tidied_training_set = load_dataset('train_f2', columns=['Distance_from_net', 'angle_from_net', 'IsGoal'])
 
 data = tidied_training_set.copy()
 
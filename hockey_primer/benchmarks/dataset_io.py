@@ -0,0 +1,81 @@
+'''
+Size and load time of the tidied SHOT/GOAL dataset as csv (the previous main.py output) vs as a partitioned
+parquet dataset (ift6758.data.dataset), for a full load and for the baseline training load
+(Distance_from_net, angle_from_net and IsGoal of the 2015-2018 regular seasons).
+
+    python -m benchmarks.dataset_io --games-per-season 100
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from ift6758.data.dataset import write_dataset, read_dataset
+from ift6758.data.raw_store import PackedStore
+from feature_engineering_1 import tidy_data_parallel
+from feature_engineering_2 import add_features2
+from benchmarks.synthetic import make_games
+
+
+TRAIN_COLUMNS = ['Distance_from_net', 'angle_from_net', 'IsGoal']
+
+
+def size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def timed(load, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = load()
+        best = min(best, time.perf_counter() - start)
+    return best, df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games-per-season', type=int, default=100)
+    parser.add_argument('--seasons', nargs='+', default=['2015', '2016', '2017', '2018', '2019'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PackedStore(os.path.join(directory, 'raw'))
+        for season in args.seasons:
+            for game in make_games(args.games_per_season, seasons=[season]):
+                store.put(game['gamePk'], game)
+
+        shots = tidy_data_parallel(store, features=add_features2, event_types={'SHOT', 'GOAL'})
+
+        csv_path = os.path.join(directory, 'shots.csv')
+        parquet_path = os.path.join(directory, 'shots')
+        shots.to_csv(csv_path, index=False)
+        write_dataset(shots, parquet_path)
+
+        def csv_train():
+            df = pd.read_csv(csv_path, usecols=TRAIN_COLUMNS + ['gamePk'])
+            keep = (df['gamePk'] // 1000000).between(2015, 2018) & (df['gamePk'] // 10000 % 100 == 2)
+            return df.loc[keep, TRAIN_COLUMNS]
+
+        loads = [
+            ('full', lambda: pd.read_csv(csv_path), lambda: read_dataset(parquet_path)),
+            ('train', csv_train,
+             lambda: read_dataset(parquet_path, columns=TRAIN_COLUMNS, seasons=range(2015, 2019), game_types=[2])),
+        ]
+
+        print(f'{len(shots)} shots, {shots.shape[1]} columns')
+        print(f'size      csv {size(csv_path) / 2 ** 20:>8.1f} MB   parquet {size(parquet_path) / 2 ** 20:>8.1f} MB')
+        for name, csv_load, parquet_load in loads:
+            csv_time, csv_df = timed(csv_load)
+            parquet_time, parquet_df = timed(parquet_load)
+            assert len(csv_df) == len(parquet_df)
+            print(f'{name:<10}csv {csv_time:>8.3f}s    parquet {parquet_time:>8.3f}s {csv_time / parquet_time:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
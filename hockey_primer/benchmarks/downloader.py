@@ -0,0 +1,67 @@
+'''
+Season download throughput: serial requests.get (previous behaviour) vs the concurrent Downloader,
+against the local stand-in server.
+
+    python -m benchmarks.downloader --games 200 --latency 0.05 --error-rate 0.05
+'''
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import requests
+
+from ift6758.data.downloader import Downloader
+from milestone1_func import get_game_ids_for_season, save_game_data_to_local
+from benchmarks.stand_in_server import StandInServer
+
+
+def serial_download(game_ids, directory, base_url):
+    for game_id in game_ids:
+        response = requests.get(f"{base_url}game/{game_id}/feed/live")
+        if response.status_code == 200:
+            with open(os.path.join(directory, str(game_id) + '.json'), 'wb') as file:
+                file.write(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--season', default='20162017')
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16])
+    parser.add_argument('--rate', type=float, default=0, help='requests/s, 0 for no limit')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    server = StandInServer(latency=args.latency).start()
+    try:
+        game_ids = get_game_ids_for_season(args.season, downloader=Downloader(), base_url=server.statsapi_url)
+        game_ids = game_ids[:args.games]
+
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            serial_download(game_ids, directory, server.statsapi_url)
+            serial = time.perf_counter() - start
+            print(f'serial requests.get: {len(game_ids)} games in {serial:.2f}s')
+
+        server.error_rate = args.error_rate
+        for workers in args.workers:
+            downloader = Downloader(max_workers=workers, rate=args.rate, backoff=0.05)
+            with tempfile.TemporaryDirectory() as directory:
+                start = time.perf_counter()
+                save_game_data_to_local(game_ids, directory, downloader=downloader, base_url=server.statsapi_url)
+                elapsed = time.perf_counter() - start
+                n_saved = len(os.listdir(directory))
+            print(f'Downloader({workers} workers): {n_saved}/{len(game_ids)} games in {elapsed:.2f}s '
+                  f'({serial / elapsed:.1f}x)')
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Memory of the tidied frames with the dtype policy (ift6758.data.dtypes) vs the dtypes they had before it
+(strings, int64, float64, object booleans and dates), on a full season of synthetic games:
+
+    plays   tidy_data + add_features2, all the plays
+    shots   the SHOT/GOAL rows main.py keeps (without the dismissed player and secondaryType columns)
+    web     the M3 add_features of api-web games (ift6758_milestone3)
+
+The per-column memory_report of the shots is printed first.
+
+    python -m benchmarks.dtypes --season 2016
+'''
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import add_features2
+from ift6758.client.ift6758_milestone3 import add_features, game_table, get_game_data, get_play_data
+from ift6758.data.dtypes import memory_report
+from benchmarks.synthetic import make_games, make_web_game
+
+
+def expand(df):
+    # df with the dtypes it had before the policy
+    df = df.copy()
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            df[c] = s.astype(s.cat.categories.dtype)
+        elif s.dtype == 'boolean':
+            df[c] = s.astype(object).where(s.notna(), np.nan)
+        elif s.dtype.kind == 'M':
+            df[c] = s.dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        elif s.dtype.kind in 'iu' and c != 'n_players' and c != 'n_opposing_players':
+            df[c] = s.astype(np.int64)
+        elif s.dtype.kind == 'f':
+            df[c] = s.astype(np.float64)
+    return df
+
+
+def megabytes(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--season', default='2016')
+    parser.add_argument('--web-games', type=int, default=200)
+    args = parser.parse_args()
+
+    plays = pd.concat([add_features2(b) for b in tidy_data_batches(make_games(seasons=[args.season]))],
+                      ignore_index=True)
+    dismissed = [c for c in plays if c.endswith('_id') and c != 'team_id' and c != 'last_event_type_id']
+    shots = plays.loc[plays['eventTypeId'].isin(['SHOT', 'GOAL']), [
+        c for c in plays if c not in dismissed and c not in ('secondaryType', 'team_triCode')]]
+
+    memory_report(expand(shots), shots)
+
+    lds = [make_web_game(int(f'{args.season}02{i:04d}')) for i in range(1, args.web_games + 1)]
+    games = game_table(get_game_data(ld) for ld in lds)
+    web = add_features(pd.DataFrame(t for ld in lds for t in get_play_data(ld)), games)
+
+    print()
+    print(f'{"":<8}{"rows":>10}{"before":>12}{"after":>12}{"":>8}')
+    for name, df in (('plays', plays), ('shots', shots), ('web', web)):
+        before, after = megabytes(expand(df)), megabytes(df)
+        print(f'{name:<8}{len(df):>10}{before:>10.1f}MB{after:>10.1f}MB{before / after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
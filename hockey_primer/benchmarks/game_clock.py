@@ -0,0 +1,101 @@
+'''
+"MM:SS" period time strings vs the integer game clock (period_seconds / game_seconds, see
+ift6758.features.clock), on a full season of synthetic games, for each place add_features2 used the strings:
+
+    clock         parsing the strings once in the tidy stage (vectorized), vs nothing (strings kept)
+    sort          sort on (gamePk, periodTime) strings vs (gamePk, game_seconds)
+    penalty ends  datetime + timedelta -> strftime per penalty vs integer addition
+    windows       `start <= time < end` tests of every play against the penalties of its game and period,
+                  on strings vs integers
+    time deltas   datetime parsing of both times per play vs integer subtraction
+
+Results are checked to be the same, and the string sort is shown to mix the periods of a game.
+
+    python -m benchmarks.game_clock --season 2016
+'''
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import add_features2
+from ift6758.features.clock import game_seconds, period_seconds
+from benchmarks.synthetic import make_games
+
+
+def norm_period_time(t):
+    return datetime(2000, 1, 1, 0, int(t.split(':')[0]), int(t.split(':')[1]))
+
+
+def windows(plays, penalties, time, start, end):
+    # number of penalties running at each play, per (gamePk, period)
+    running = dict()
+    for key, group in penalties.groupby(['gamePk', 'period']):
+        running[key] = list(zip(group[start], group[end]))
+    return [
+        sum(s <= t < e for s, e in running.get((g, p), []))
+        for g, p, t in zip(plays['gamePk'], plays['period'], plays[time])
+    ]
+
+
+def timed(name, previous, current, results):
+    start = time.perf_counter()
+    results[name] = [previous()]
+    elapsed_previous = time.perf_counter() - start
+    start = time.perf_counter()
+    results[name].append(current())
+    elapsed = time.perf_counter() - start
+    print(f'{name:<16}{elapsed_previous:>9.3f}s{elapsed:>9.3f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--season', type=int, default=2016)
+    args = parser.parse_args()
+
+    plays = pd.concat(tidy_data_batches(make_games(seasons=[args.season])), ignore_index=True)
+    plays = plays.drop(columns=['period_seconds', 'game_seconds'])
+    print(f'{plays["gamePk"].nunique()} games, {len(plays)} plays')
+    print(f'{"":<16}{"strings":>10}{"integers":>10}')
+
+    results = dict()
+    timed('clock', lambda: None, lambda: plays.assign(
+        period_seconds=period_seconds(plays['periodTime']),
+        game_seconds=lambda df: game_seconds(df['period'], df['period_seconds'])), results)
+    clocked = results['clock'][1]
+
+    timed('sort', lambda: plays.sort_values(['gamePk', 'periodTime']),
+          lambda: clocked.sort_values(['gamePk', 'game_seconds']), results)
+    by_string, by_clock = results['sort']
+    mixed = (by_string.groupby('gamePk')['period'].diff() < 0).sum()
+    assert (by_clock.groupby('gamePk')['period'].diff().fillna(0) >= 0).all()
+    print(f'{"":<16}{mixed} plays sorted before a play of an earlier period by the strings, 0 by the clock')
+
+    penalties = clocked[clocked['eventTypeId'] == 'PENALTY'].copy()
+    timed('penalty ends', lambda: penalties.apply(
+        lambda t: (norm_period_time(t['periodTime']) + timedelta(minutes=t['penaltyMinutes'])).strftime('%M:%S'),
+        axis=1), lambda: penalties['period_seconds'] + penalties['penaltyMinutes'] * 60, results)
+    penalties['periodTimeEnd'], penalties['period_seconds_end'] = results['penalty ends']
+
+    timed('windows', lambda: windows(clocked, penalties, 'periodTime', 'periodTime', 'periodTimeEnd'),
+          lambda: windows(clocked, penalties, 'period_seconds', 'period_seconds', 'period_seconds_end'), results)
+    assert results['windows'][0] == results['windows'][1]
+
+    previous = by_clock.groupby('gamePk')[['periodTime', 'period_seconds']].shift(1)
+    timed('time deltas', lambda: [
+        (norm_period_time(t) - norm_period_time(s)).total_seconds() if isinstance(s, str) else np.nan
+        for s, t in zip(previous['periodTime'], by_clock['periodTime'])
+    ], lambda: by_clock['period_seconds'] - previous['period_seconds'], results)
+    assert np.array_equal(results['time deltas'][0], results['time deltas'][1].to_numpy(), equal_nan=True)
+
+    start = time.perf_counter()
+    add_features2(clocked)
+    print(f'add_features2 {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
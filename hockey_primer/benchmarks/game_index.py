@@ -0,0 +1,115 @@
+'''
+Per-game team and side lookups: the previous ad hoc structures vs one GameIndex (ift6758.features.game_index),
+on synthetic games:
+
+    opponent   opposing_team_dct (built with apply + dict.update, looked up per play) vs GameIndex.opponent
+    rink side  the (gamePk, team_name) sides lookup of add_home_away_rink_side_columns vs GameIndex.rink_side
+    neutral    the M3 matching_row filter (one scan of all the shots per neutral zone shot) vs the per-period
+               sides of the index
+    npz        save + load of the index of the games
+
+Opponents and rink sides are checked to be the same.
+
+    python -m benchmarks.game_index --games 500 --web-games 100
+'''
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from milestone1_func import PlayExtractor, add_home_away_rink_side_columns, game_index
+from ift6758.client.ift6758_milestone3 import add_features, game_table, get_game_data, get_play_data
+from ift6758.features.game_index import GameIndex
+from benchmarks.synthetic import make_games, make_web_game
+
+
+def previous_opponent(df):
+    game_teams = df.groupby('gamePk')['team_id'].agg(
+        lambda t: sorted(map(int, filter(lambda k: not np.isnan(k), np.unique(t.values))))
+    ).reset_index()
+
+    opposing_team_dct = dict()
+    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][0]): t['team_id'][1]}), axis=1)
+    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][1]): t['team_id'][0]}), axis=1)
+
+    return df.apply(lambda t: opposing_team_dct.get((t['gamePk'], t['team_id']), np.nan), axis=1).to_numpy()
+
+
+def previous_neutral_zone(tidied):
+    # the row-wise neutral zone rink side of add_features (before GameIndex)
+    def decide_rink_side_for_neutral_zone(row):
+        if row['zoneCode'] == 'N':
+            matching_row = tidied[
+                (tidied['gamePk'] == row['gamePk']) &
+                (tidied['period'] == row['period']) &
+                (tidied['homeTeamId'] == row['homeTeamId'])
+            ]
+            if not matching_row.empty:
+                return matching_row['rinkSide'].values[0]
+        return row['rinkSide']
+
+    return tidied.apply(decide_rink_side_for_neutral_zone, axis=1)
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--web-games', type=int, default=100)
+    args = parser.parse_args()
+
+    extractor = PlayExtractor(keep_all_events=True)
+    for game in make_games(args.games):
+        extractor.add_game(game)
+    plays = extractor.to_frame()
+    games = extractor.games_frame()
+    print(f'{len(games)} games, {len(plays)} plays')
+    print(f'{"":<12}{"previous":>10}{"index":>10}{"speedup":>10}')
+
+    index, elapsed_index = timed(game_index, games)
+    print(f'{"build":<12}{"":>10}{elapsed_index:>9.3f}s')
+
+    previous, elapsed_previous = timed(previous_opponent, plays)
+    current, elapsed = timed(index.opponent, plays['gamePk'], plays['team_id'])
+    assert np.array_equal(previous, current, equal_nan=True)
+    print(f'{"opponent":<12}{elapsed_previous:>9.3f}s{elapsed:>9.4f}s{elapsed_previous / elapsed:>9.0f}x')
+
+    previous, elapsed_previous = timed(add_home_away_rink_side_columns, plays.copy())
+    current, elapsed = timed(index.rink_side, plays['gamePk'], plays['team_id'], plays['period'])
+    assert (previous['rink_side'].to_numpy(dtype=object) == current).all()
+    print(f'{"rink side":<12}{elapsed_previous:>9.3f}s{elapsed:>9.4f}s{elapsed_previous / elapsed:>9.0f}x')
+
+    lds = [make_web_game(2023020000 + i) for i in range(1, args.web_games + 1)]
+    web_games = game_table(get_game_data(ld) for ld in lds)
+    shots = pd.DataFrame(t for ld in lds for t in get_play_data(ld))
+    with contextlib.redirect_stdout(io.StringIO()):
+        features, elapsed = timed(add_features, shots.copy(), web_games)
+    previous = features.assign(homeTeamId=web_games['homeTeamId'].reindex(features['gamePk']).to_numpy())
+    _, elapsed_previous = timed(previous_neutral_zone, previous)
+    print(f'{"neutral":<12}{elapsed_previous:>9.3f}s{elapsed:>9.3f}s{elapsed_previous / elapsed:>9.0f}x'
+          f'   (index: all of add_features, {(shots["zoneCode"] == "N").sum()} neutral zone shots)')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'game_index.npz')
+        start = time.perf_counter()
+        index.save(path)
+        loaded = GameIndex.load(path)
+        elapsed = time.perf_counter() - start
+        assert np.array_equal(loaded.rink_side(plays['gamePk'], plays['team_id'], plays['period']),
+                              index.rink_side(plays['gamePk'], plays['team_id'], plays['period']))
+        print(f'{"npz":<12}{"":>10}{elapsed:>9.4f}s   {os.path.getsize(path) / 1024:.0f} kB')
+
+
+if __name__ == '__main__':
+    main()
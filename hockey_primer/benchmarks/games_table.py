@@ -0,0 +1,105 @@
+'''
+Game level fields repeated on every play vs a games table (one row per gamePk, joined only when asked for), on a
+season of synthetic games:
+
+    statsapi   gameDateTime / gameEndDateTime strings on every play, parsed per play (parse_game_date) and
+               game_duration computed row-wise (what add_features2 did), vs milestone1_func.game_table
+    web        the six team fields of get_play_data on every play (ift6758_milestone3) vs its games table
+
+Memory is the deep memory_usage of the events (+ games table). The joined columns are checked to be the same as
+the repeated ones.
+
+    python -m benchmarks.games_table --season 2016
+'''
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from milestone1_func import PlayExtractor
+from ift6758.client.ift6758_milestone3 import TEAM_COLUMNS, game_table, get_game_data, get_play_data
+from ift6758.data.dataset import join_games
+from benchmarks.synthetic import make_games, make_web_game
+
+
+def parse_game_date(t):
+    # previous parsing of the game dates (once per play)
+    if not pd.isnull(t):
+        return datetime.strptime(t[:-4], '%Y-%m-%dT%M:%S')
+    else:
+        return np.nan
+
+
+def megabytes(*frames):
+    return sum(f.memory_usage(deep=True).sum() for f in frames) / 2 ** 20
+
+
+def statsapi(season):
+    extractor = PlayExtractor()
+    for game in make_games(seasons=[season]):
+        extractor.add_game(game)
+    events = extractor.to_frame()
+
+    start = time.perf_counter()
+    games = extractor.games_frame()
+    elapsed = time.perf_counter() - start
+
+    # the previous layout: the dates of the game on every play
+    repeated = join_games(events, games[['gameDateTime', 'gameEndDateTime']])
+    for c in ['gameDateTime', 'gameEndDateTime']:
+        repeated[c] = repeated[c].dt.strftime('%Y-%m-%dT%H:%M:%SZ').astype(object)
+    memory_repeated = megabytes(repeated)
+
+    start = time.perf_counter()
+    repeated['gameDateTime'] = repeated['gameDateTime'].map(parse_game_date)
+    repeated['gameEndDateTime'] = repeated['gameEndDateTime'].map(parse_game_date)
+    repeated['game_duration'] = repeated.apply(
+        lambda t:
+            (t['gameEndDateTime'] - t['gameDateTime']).total_seconds()
+            if not pd.isnull(t['gameEndDateTime'])
+            else np.nan,
+        axis=1
+    )
+    elapsed_repeated = time.perf_counter() - start
+
+    return len(events), len(games), memory_repeated, megabytes(events, games), elapsed_repeated, elapsed
+
+
+def web(season, n_games):
+    lds = [make_web_game(int(f'{season}02{i:04d}')) for i in range(1, n_games + 1)]
+    games = game_table(get_game_data(ld) for ld in lds)
+    events = pd.DataFrame(t for ld in lds for t in get_play_data(ld))
+
+    # the previous layout: the teams of the game on every play
+    repeated = events.copy()
+    for ld in lds:
+        for c, v in get_game_data(ld).items():
+            if c in TEAM_COLUMNS:
+                repeated.loc[repeated['gamePk'] == ld['id'], c] = v
+    joined = join_games(events, games, columns=TEAM_COLUMNS)
+    assert joined[TEAM_COLUMNS].astype(object).equals(repeated[TEAM_COLUMNS].astype(object))
+
+    return len(events), len(games), megabytes(repeated), megabytes(events, games)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--season', type=int, default=2016)
+    parser.add_argument('--web-games', type=int, default=200)
+    args = parser.parse_args()
+
+    n_plays, n_games, memory_repeated, memory, elapsed_repeated, elapsed = statsapi(args.season)
+    print(f'statsapi: {n_games} games, {n_plays} plays')
+    print(f'    memory  {memory_repeated:>8.1f} MB (dates on every play) -> {memory:>6.1f} MB (events + games)')
+    print(f'    dates   {elapsed_repeated:>8.2f} s  (per play)            -> {elapsed:>6.3f} s  (per game)')
+
+    n_plays, n_games, memory_repeated, memory = web(args.season, args.web_games)
+    print(f'web: {n_games} games, {n_plays} shots')
+    print(f'    memory  {memory_repeated:>8.1f} MB (teams on every play) -> {memory:>6.1f} MB (events + games)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+'''
+Shot distance / angle: the previous pandas code of tidy_data (temporary Series and a throwaway
+x_distance_from_net column) vs ift6758.features.geometry.shot_geometry in float64 and float32, and with a
+reused output buffer. Reports the time and the peak of allocated memory (tracemalloc) for --shots shots, in total
+and without the result arrays (temporaries).
+
+    python -m benchmarks.geometry --shots 2000000
+'''
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ift6758.features.geometry import shot_geometry
+
+
+def previous(df):
+    df['Distance_from_net'] = np.sqrt(
+        np.where(
+            df['rink_side'] == 'left',
+            (df['x'] - 89) ** 2 + df['y'] ** 2,
+            (df['x'] + 89) ** 2 + df['y'] ** 2
+        )
+    )
+    df['x_distance_from_net'] = np.where(
+        df['rink_side'] == 'left',
+        abs(89 - df['x']),
+        abs(-89 - df['x'])
+    )
+    df['angle_from_net'] = np.degrees(
+        np.arccos(df['x_distance_from_net'] / df['Distance_from_net'])
+    )
+    df.drop(['x_distance_from_net'], axis=1, inplace=True)
+    return df['Distance_from_net'].to_numpy(), df['angle_from_net'].to_numpy()
+
+
+def measure(run, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shots', type=int, default=2000000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'x': rng.integers(-99, 100, args.shots).astype(float),
+        'y': rng.integers(-42, 43, args.shots).astype(float),
+        'rink_side': rng.choice(['left', 'right'], args.shots),
+    })
+    x, y = df['x'].to_numpy(), df['y'].to_numpy()
+    right = df['rink_side'].to_numpy() == 'left'
+    buffer = np.empty((3, args.shots))
+
+    # (name, run, bytes of the results allocated by the run)
+    runs = [
+        ('previous', lambda: previous(df), 2 * 8 * args.shots),
+        ('kernel float64', lambda: shot_geometry(x, y, right)[1:], 3 * 8 * args.shots),
+        ('kernel float32', lambda: shot_geometry(x, y, right, dtype=np.float32)[1:], 3 * 4 * args.shots),
+        ('kernel reused out', lambda: shot_geometry(x, y, right, out=buffer)[1:], 0),
+    ]
+
+    print(f'{args.shots} shots')
+    reference = None
+    for name, run, result_bytes in runs:
+        elapsed, peak, (distance, angle) = measure(run)
+        if reference is None:
+            reference = (distance.copy(), angle.copy())
+        # float32 arccos is off by up to a few 1e-2 degrees for shots right in front of the net
+        assert np.allclose(distance, reference[0], equal_nan=True)
+        assert np.allclose(angle, reference[1], equal_nan=True, atol=0.05)
+        temporary = peak - result_bytes
+        print(f'{name:<20}{elapsed:>8.3f}s {peak / 2 ** 20:>8.1f} MB peak allocations '
+              f'{temporary / 2 ** 20:>8.1f} MB temporaries')
+
+
+if __name__ == '__main__':
+    main()
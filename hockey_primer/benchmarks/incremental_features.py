@@ -0,0 +1,53 @@
+'''
+Live polls of games: add_features2 over all the plays of the games so far at every poll (what the live client
+did) vs IncrementalFeatures2.update with the new plays of the poll only. The features of every poll are checked
+to be the same, and the time per poll is shown as the games go on.
+
+    python -m benchmarks.incremental_features --games 10 --poll-size 8
+'''
+
+import argparse
+import time
+
+import pandas as pd
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import IncrementalFeatures2, add_features2
+from benchmarks.synthetic import make_games
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--poll-size', type=int, default=8, help='new plays per game and poll')
+    args = parser.parse_args()
+
+    plays = pd.concat(tidy_data_batches(make_games(args.games, penalty_weight=10)), ignore_index=True)
+    plays = plays.sort_values(['gamePk', 'game_seconds'], kind='stable')
+    poll = plays.groupby('gamePk').cumcount() // args.poll_size
+    n_polls = poll.max() + 1
+
+    engine = IncrementalFeatures2()
+    timings = {'recompute': [], 'incremental': []}
+    for i in range(n_polls):
+        start = time.perf_counter()
+        expected = add_features2(plays[poll <= i])
+        timings['recompute'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        features = engine.update(plays[poll == i])
+        timings['incremental'].append(time.perf_counter() - start)
+
+        # same values (the categories and smallest dtypes of a poll depend on its plays, see ift6758.data.dtypes)
+        pd.testing.assert_frame_equal(features, expected.loc[features.index], check_dtype=False,
+                                      check_categorical=False, obj=f'poll {i}')
+
+    print(f'{args.games} games, {n_polls} polls of {args.poll_size} plays per game')
+    print(f'{"poll":<8}{"recompute":>12}{"incremental":>14}')
+    for i in sorted({0, n_polls // 4, n_polls // 2, 3 * n_polls // 4, n_polls - 1}):
+        print(f'{i:<8}{timings["recompute"][i] * 1e3:>10.1f}ms{timings["incremental"][i] * 1e3:>12.1f}ms')
+    print(f'{"total":<8}{sum(timings["recompute"]):>11.2f}s{sum(timings["incremental"]):>13.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''
+Json decoding of representative raw game files, for both API schemas:
+stdlib json vs orjson vs msgspec, and the slim typed decode of ift6758.data.jsonio.
+
+    python -m benchmarks.json_decode --games 50
+'''
+
+import argparse
+import json
+import time
+
+from ift6758.data import jsonio
+from benchmarks.synthetic import make_games, make_web_game
+
+
+def bench(decode, docs, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            decode(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=50)
+    args = parser.parse_args()
+
+    corpora = {
+        'statsapi': [json.dumps(g).encode() for g in make_games(args.games, seasons=['2016'])],
+        'web': [json.dumps(make_web_game(2023020001 + i)).encode() for i in range(args.games)],
+    }
+
+    decoders = [('json', json.loads)]
+    if jsonio.orjson is not None:
+        decoders.append(('orjson', jsonio.orjson.loads))
+    if jsonio.msgspec is not None:
+        decoders.append(('msgspec', jsonio.msgspec.json.decode))
+
+    for schema, docs in corpora.items():
+        size = sum(map(len, docs)) / 1e6
+        print(f'{schema}: {len(docs)} games, {size:.1f} MB (jsonio backend: {jsonio.backend})')
+        baseline = bench(json.loads, docs)
+        for name, decode in decoders:
+            elapsed = bench(decode, docs)
+            print(f'  {name:<20}{elapsed * 1e3:>8.1f} ms {size / elapsed:>8.0f} MB/s {baseline / elapsed:>6.1f}x')
+        if jsonio.msgspec is not None:
+            elapsed = bench(lambda doc: jsonio.loads(doc, schema=schema), docs)
+            print(f'  {"msgspec typed":<20}{elapsed * 1e3:>8.1f} ms {size / elapsed:>8.0f} MB/s {baseline / elapsed:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
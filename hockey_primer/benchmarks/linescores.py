@@ -0,0 +1,41 @@
+'''
+create_game_info_list / create_game_info_table against the local stand-in server: the first call downloads and
+saves the season linescores in the manifest, later calls (e.g. every tidy run) read them back without any request.
+
+    python -m benchmarks.linescores --latency 0.3 --seasons 20152016 20162017
+'''
+
+import argparse
+import tempfile
+import time
+
+import milestone1_func
+from milestone1_func import create_game_info_list, create_game_info_table
+from benchmarks.stand_in_server import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--seasons', nargs='+', default=['20152016', '20162017'])
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            milestone1_func.directory = directory
+            milestone1_func.base_url = server.statsapi_url
+
+            for name, build in [('list, cold', create_game_info_list), ('list, saved', create_game_info_list),
+                                ('table, saved', create_game_info_table)]:
+                n_requests = server.n_requests
+                start = time.perf_counter()
+                for season in args.seasons:
+                    build(season)
+                print(f'{name:<14}{time.perf_counter() - start:>8.3f}s {server.n_requests - n_requests:>4} requests')
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''
+Peak RSS of building the SHOT/GOAL dataset from a synthetic multi-season corpus:
+eager (load_data_from_files + pd.DataFrame + tidy_data, the previous main.py) vs streaming
+(iter_games + tidy_data_batches). Each mode runs in its own process.
+
+    python -m benchmarks.memory --games-per-season 150 --seasons 2015 2016 2017 2018
+'''
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def build(mode, directory, batch_size):
+    import pandas as pd
+
+    from milestone1_func import load_data_from_files, iter_games
+    from feature_engineering_1 import tidy_data, tidy_data_batches
+    from feature_engineering_2 import add_features2
+
+    keep = lambda df: df[df.eventTypeId.isin(['SHOT', 'GOAL'])]
+
+    if mode == 'eager':
+        data = pd.DataFrame(load_data_from_files(directory))
+        shots = keep(add_features2(tidy_data(data)))
+    else:
+        shots = pd.concat([keep(add_features2(b)) for b in tidy_data_batches(iter_games(directory), batch_size)])
+
+    return len(shots)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games-per-season', type=int, default=150)
+    parser.add_argument('--seasons', nargs='+', default=['2015', '2016', '2017', '2018'])
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        start = time.perf_counter()
+        n = build(args.run[0], args.run[1], args.batch_size)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on linux
+        print(f'{args.run[0]:<10}{peak:>10.0f} MB peak RSS {elapsed:>8.1f}s {n:>8} shots')
+        return
+
+    from ift6758.data.raw_store import PackedStore
+    from benchmarks.synthetic import make_games
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PackedStore(directory)
+        for season in args.seasons:
+            for game in make_games(args.games_per_season, seasons=[season]):
+                store.put(game['gamePk'], game)
+
+        print(f'{len(store.game_ids())} games, batch size {args.batch_size}')
+        for mode in ['eager', 'streaming']:
+            subprocess.run([sys.executable, '-m', 'benchmarks.memory', '--batch-size', str(args.batch_size),
+                            '--run', mode, directory], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+'''
+Scaling of tidy_data_parallel (tidy + add_features2 per chunk of games) with the number of worker processes.
+
+    python -m benchmarks.parallel_tidy --games 400 --workers 1 2 4 8
+'''
+
+import argparse
+import tempfile
+import time
+
+from ift6758.data.raw_store import PackedStore
+from feature_engineering_1 import tidy_data_parallel
+from feature_engineering_2 import add_features2
+from benchmarks.synthetic import make_games
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=400)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-size', type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PackedStore(directory)
+        for game in make_games(args.games):
+            store.put(game['gamePk'], game)
+
+        print(f'{args.games} games, chunks of {args.chunk_size}')
+        reference = None
+        for n_workers in args.workers:
+            start = time.perf_counter()
+            tidied = tidy_data_parallel(directory, n_workers=n_workers, chunk_size=args.chunk_size,
+                                        features=add_features2)
+            elapsed = time.perf_counter() - start
+
+            if reference is None:
+                reference = (tidied, elapsed)
+            assert tidied.equals(reference[0])
+            print(f'{n_workers:>3} workers {elapsed:>8.2f}s {reference[1] / elapsed:>6.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+'''
+Play extraction of synthetic statsapi games into a DataFrame: the dict-per-play path
+(get_play_data + pd.DataFrame) vs the columnar PlayExtractor, with all the schema columns and with the
+default projection (no player names / links). Time is the best of a few runs, memory the tracemalloc peak.
+
+    python -m benchmarks.play_extract --games 200
+'''
+
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from milestone1_func import get_play_data, extract_plays, PLAY_SCHEMA
+from benchmarks.synthetic import make_games
+
+
+def bench(build, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    df = build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak, df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=200)
+    args = parser.parse_args()
+
+    games = list(make_games(args.games))
+
+    runs = [
+        ('dicts', lambda: pd.DataFrame(t for g in games for t in get_play_data(g, keep_all_events=True))),
+        ('columnar all', lambda: extract_plays(games, columns=list(PLAY_SCHEMA), keep_all_events=True)),
+        ('columnar default', lambda: extract_plays(games, keep_all_events=True)),
+    ]
+
+    print(f'{len(games)} games')
+    for name, build in runs:
+        elapsed, peak, df = bench(build)
+        frame = df.memory_usage(deep=True).sum()
+        print(f'{name:<18}{elapsed:>8.2f}s {peak / 2 ** 20:>8.0f} MB peak {frame / 2 ** 20:>8.0f} MB frame '
+              f'{df.shape[1]:>4} columns')
+
+
+if __name__ == '__main__':
+    main()
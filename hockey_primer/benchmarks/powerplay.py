@@ -0,0 +1,109 @@
+'''
+time_since_powerplay: the previous row-wise implementation (powerplay_start rescanning the penalties of both
+teams in a while loop, back to the first of the overlapping penalties) vs PowerplayWindows
+(ift6758.features.strength: penalties merged once into disjoint windows per (game, period), then one
+np.searchsorted of all the plays), on synthetic games with more and more penalties. Both results are checked
+to be identical.
+
+    python -m benchmarks.powerplay --games 100
+'''
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering_1 import tidy_data_batches
+from ift6758.features.strength import PowerplayWindows
+from benchmarks.synthetic import make_games
+
+
+NO_POWERPLAY = np.iinfo(np.int32).max
+
+
+def previous_time_since_powerplay(df):
+    penalties = df[df.eventTypeId == 'PENALTY'][['gamePk', 'period', 'period_seconds', 'team_id', 'penaltyMinutes']]
+    penalties['period_seconds_end'] = penalties['period_seconds'] + penalties['penaltyMinutes'] * 60
+
+    game_teams = df.groupby('gamePk')['team_id'].agg(
+        lambda t: sorted(map(int, filter(lambda k: not np.isnan(k), np.unique(t.values))))
+    ).reset_index()
+
+    opposing_team_dct = dict()
+    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][0]): t['team_id'][1]}), axis=1)
+    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][1]): t['team_id'][0]}), axis=1)
+
+    penalties_dct = defaultdict(list)
+    penalties[['gamePk', 'period', 'team_id', 'period_seconds', 'period_seconds_end']].apply(
+        lambda t: penalties_dct[(t['gamePk'], t['period'], t['team_id'])].append({
+            'start': t['period_seconds'],
+            'end': t['period_seconds_end']}
+        ), axis=1)
+
+    def powerplay_start(gamepk, period, team, time):
+        if np.isnan(team):
+            return np.nan
+
+        _powerplay_start = NO_POWERPLAY
+        for times in penalties_dct.get((gamepk, period, team), []):
+            if times['start'] < time < times['end']:
+                _powerplay_start = min(_powerplay_start, times['start'])
+
+        for times in penalties_dct.get((gamepk, period, opposing_team_dct[(gamepk, team)]), []):
+            if times['start'] < time < times['end']:
+                _powerplay_start = min(_powerplay_start, times['start'])
+
+        if _powerplay_start == NO_POWERPLAY:
+            return np.nan
+
+        return _powerplay_start
+
+    def time_since_powerplay(gamepk, period, team, time):
+        _start = powerplay_start(gamepk, period, team, time)
+        c_start = _start
+        while not pd.isnull(_start):
+            c_start = _start
+            _start = powerplay_start(gamepk, period, team, _start)
+
+        if pd.isnull(c_start):
+            return np.nan
+
+        return float(time - c_start)
+
+    return df.apply(
+        lambda t: time_since_powerplay(t['gamePk'], t['period'], t['team_id'], t['period_seconds']),
+        axis=1
+    ).to_numpy()
+
+
+def windows_time_since_powerplay(df):
+    windows = PowerplayWindows.from_plays(df)
+    return np.where(df['team_id'].notna(),
+                    windows.time_since_start(df['gamePk'], df['period'], df['period_seconds']), np.nan)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f'{"penalty weight":<16}{"penalties":>10}{"in pp":>8}{"loop":>10}{"windows":>10}{"speedup":>10}')
+    for penalty_weight in (3, 12, 30, 60):
+        df = pd.concat(tidy_data_batches(make_games(args.games, penalty_weight=penalty_weight)), ignore_index=True)
+
+        start = time.perf_counter()
+        previous = previous_time_since_powerplay(df)
+        elapsed_previous = time.perf_counter() - start
+        start = time.perf_counter()
+        current = windows_time_since_powerplay(df)
+        elapsed = time.perf_counter() - start
+
+        assert np.array_equal(previous.astype(float), current, equal_nan=True)
+        print(f'{penalty_weight:<16}{(df["eventTypeId"] == "PENALTY").sum():>10}{np.isfinite(current).mean():>8.0%}'
+              f'{elapsed_previous:>9.2f}s{elapsed:>9.3f}s{elapsed_previous / elapsed:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+'''
+Previous event features of add_features2 (time_from_last_event, dist_from_last_event, rebound, change_in_angle,
+speed): the previous row-wise df.apply(..., axis=1) of each feature vs the column operation that replaced it,
+timed feature by feature on the tidied plays of synthetic games. Each feature is checked to be identical
+(values and dtype, once both have the dtype policy of ift6758.data.dtypes that add_features2 applies), also in
+the add_features2 output, except time_from_last_event (and speed) for the first event of a period: the integer
+game clock counts the time since the last event of the previous period, where the "MM:SS" strings gave a
+negative time.
+
+    python -m benchmarks.previous_event --games 200
+'''
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import add_features2
+from ift6758.data.dtypes import compact
+from benchmarks.synthetic import make_games
+
+
+def norm_period_time(t):
+    return datetime(2000, 1, 1, 0, int(t.split(':')[0]), int(t.split(':')[1]))
+
+
+def period_time_distance(pt1, pt2):
+    if (not isinstance(pt2, str)) or (not isinstance(pt1, str)):
+        return np.nan
+
+    return (norm_period_time(pt2) - norm_period_time(pt1)).total_seconds()
+
+
+ROW_WISE = {
+    'time_from_last_event': lambda df: df.apply(
+        lambda t: period_time_distance(t['last_event_time'], t['periodTime']), axis=1),
+    'dist_from_last_event': lambda df: df.apply(
+        lambda t: np.linalg.norm(np.array([t['x'], t['y']]) - np.array([t['last_event_x'], t['last_event_y']])),
+        axis=1),
+    'rebound': lambda df: df.apply(lambda t: t['eventTypeId'] == t['last_event_type_id'], axis=1),
+    'change_in_angle': lambda df: df.apply(lambda t: abs(t['angle_from_net'] - t['last_event_angle']), axis=1),
+    'speed': lambda df: df.apply(lambda t: t['dist_from_last_event'] / (t['time_from_last_event'] + 1), axis=1),
+}
+
+
+def _dist(df):
+    dx = df['x'].to_numpy(dtype=float) - df['last_event_x'].to_numpy(dtype=float)
+    dy = df['y'].to_numpy(dtype=float) - df['last_event_y'].to_numpy(dtype=float)
+    return pd.Series(np.sqrt(dx * dx + dy * dy), index=df.index)
+
+
+COLUMNS = {
+    'time_from_last_event': lambda df: df['game_seconds'] - df['last_game_seconds'],
+    'dist_from_last_event': _dist,
+    'rebound': lambda df: pd.Series(
+        df['eventTypeId'].to_numpy(dtype=object) == df['last_event_type_id'].to_numpy(dtype=object), index=df.index),
+    'change_in_angle': lambda df: (df['angle_from_net'] - df['last_event_angle']).abs(),
+    'speed': lambda df: df['dist_from_last_event'] / (df['time_from_last_event'] + 1),
+}
+
+
+def previous_event_columns(df):
+    # the last_event_* columns both versions start from
+    df = df.sort_values(['gamePk', 'game_seconds'])
+    last_event = df.groupby('gamePk')[['eventTypeId', 'x', 'y', 'periodTime', 'angle_from_net', 'period', 'game_seconds']].shift(1)
+    df['last_event_type_id'] = last_event['eventTypeId']
+    df['last_event_x'] = last_event['x']
+    df['last_event_y'] = last_event['y']
+    df['last_event_time'] = last_event['periodTime']
+    df['last_event_angle'] = last_event['angle_from_net']
+    df['last_game_seconds'] = last_event['game_seconds']
+    df['same_period'] = df['period'] == last_event['period']
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=200)
+    args = parser.parse_args()
+
+    plays = pd.concat(tidy_data_batches(make_games(args.games)), ignore_index=True)
+    df = previous_event_columns(plays)
+    print(f'{len(df)} plays')
+    print(f'{"feature":<24}{"row-wise":>10}{"columns":>10}{"speedup":>10}')
+
+    for name in ROW_WISE:
+        timings = dict()
+        for version, features in [('row-wise', ROW_WISE), ('columns', COLUMNS)]:
+            start = time.perf_counter()
+            result = features[name](df)
+            timings[version] = time.perf_counter() - start
+            # as stored by add_features2
+            result = compact(result.to_frame(name))[name]
+            if version == 'row-wise':
+                expected = result
+        compared = df['same_period'] if name == 'time_from_last_event' else slice(None)
+        assert result[compared].equals(expected[compared]) and result.dtype == expected.dtype, name
+        df[name] = result
+        print(f'{name:<24}{timings["row-wise"]:>9.3f}s{timings["columns"]:>9.4f}s'
+              f'{timings["row-wise"] / timings["columns"]:>9.0f}x')
+
+    features = add_features2(plays)
+    previous = previous_event_columns(plays)
+    for name, feature in ROW_WISE.items():
+        previous[name] = feature(previous)
+    reference = compact(previous[list(ROW_WISE)])
+    for name in ROW_WISE:
+        compared = previous['same_period'] if name in ('time_from_last_event', 'speed') else slice(None)
+        assert features.loc[previous.index, name][compared].equals(reference.loc[compared, name]), name
+    print('same add_features2 output')
+
+
+if __name__ == '__main__':
+    main()
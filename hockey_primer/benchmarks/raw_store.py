@@ -0,0 +1,60 @@
+'''
+Raw store footprint and read time: one json file per game vs compressed season packs.
+
+    python -m benchmarks.raw_store --games 500
+'''
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from ift6758.data.raw_store import JsonDirStore, PackedStore, migrate, zstandard
+from benchmarks.synthetic import make_games
+
+
+def du(directory):
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+
+def timed(f):
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--season', default='2016')
+    args = parser.parse_args()
+
+    codecs = ['gzip'] + (['zstd'] if zstandard is not None else [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = os.path.join(tmp, 'json')
+        json_store = JsonDirStore(json_dir)
+        for game in make_games(args.games, seasons=[args.season]):
+            json_store.put(game['gamePk'], game)
+
+        game_ids = json_store.game_ids()
+        sample = random.Random(0).sample(game_ids, min(100, len(game_ids)))
+
+        print(f'{len(game_ids)} games of season {args.season}')
+        print(f'{"layout":<16}{"size (MB)":>12}{"season read (s)":>18}{"100 random gets (ms)":>24}')
+
+        stores = [('json files', json_dir, json_store)]
+        for codec in codecs:
+            packed_dir = os.path.join(tmp, codec)
+            migrate(json_dir, packed_dir, codec=codec)
+            stores.append((f'{codec} pack', packed_dir, PackedStore(packed_dir, codec=codec)))
+
+        for name, directory, store in stores:
+            read = timed(lambda: sum(1 for _ in store.iter_games(args.season)))
+            gets = timed(lambda: [store.get(g) for g in sample])
+            print(f'{name:<16}{du(directory) / 1e6:>12.1f}{read:>18.2f}{gets * 1e3:>24.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Start of an experiment that needs the training set (baseline_models.py): the previous `from main import
+tidied_training_set` (the pipeline imported and rerun on both sets, even with a warm stage cache) vs
+registry.load_dataset (only the asked columns of the written dataset). Each is timed in a fresh interpreter,
+run in a temporary directory of synthetic raw games; the loaded columns are checked to be the same.
+
+    python -m benchmarks.registry --games-per-season 100
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_games
+
+
+COLUMNS = ['Distance_from_net', 'angle_from_net', 'IsGoal']
+
+PREVIOUS = f'''
+from registry import build_dataset
+build_dataset('test_f2')
+tidied_training_set, _ = build_dataset('train_f2')
+tidied_training_set[{COLUMNS}].to_pickle('previous.pkl')
+'''
+
+CURRENT = f'''
+from registry import load_dataset
+load_dataset('train_f2', columns={COLUMNS}).to_pickle('current.pkl')
+'''
+
+
+def run(code, directory, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=directory, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games-per-season', type=int, default=100)
+    parser.add_argument('--seasons', nargs='+', default=['2015', '2016', '2017', '2018', '2019'])
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(os.path.abspath(p) for p in sys.path if p))
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, 'data'))
+        for season in args.seasons:
+            for game in make_games(args.games_per_season, seasons=[season]):
+                with open(os.path.join(directory, 'data', f'{game["gamePk"]}.json'), 'w') as f:
+                    json.dump(game, f)
+
+        first = run(CURRENT, directory, env)        # builds both datasets and fills the stage cache
+        previous = run(PREVIOUS, directory, env)    # warm stage cache
+        current = run(CURRENT, directory, env)
+
+        a = pd.read_pickle(os.path.join(directory, 'previous.pkl'))
+        b = pd.read_pickle(os.path.join(directory, 'current.pkl'))
+        a, b = a.sort_values(COLUMNS, ignore_index=True), b.sort_values(COLUMNS, ignore_index=True)
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_categorical=False)
+
+    print(f'{len(b)} shots of {args.games_per_season * len(args.seasons)} games')
+    print(f'{"first load (build)":<22}{first:>8.2f}s')
+    print(f'{"import main":<22}{previous:>8.2f}s')
+    print(f'{"load_dataset":<22}{current:>8.2f}s{previous / current:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+'''
+add_home_away_rink_side_columns: the previous row-wise implementation (csv read, apply(tuple) lookup dict, two
+row-wise applies) vs the join-based one, on the plays of synthetic games. Both outputs are checked to be equal
+for the teams of the sides table. Plays of other teams (or without team) get no side: the previous code meant
+the same (other_side(None) is None), but with recent pandas the None comes back from apply as NaN and was
+flipped to 'left' on even periods.
+
+    python -m benchmarks.rink_side --games 500
+'''
+
+import argparse
+import time
+
+import pandas as pd
+
+from milestone1_func import SIDES_PATH, add_home_away_rink_side_columns, extract_plays
+from benchmarks.synthetic import make_games
+
+
+def previous_add_home_away_rink_side_columns(df):
+    def other_side(s):
+        if s is None:
+            return None
+
+        if s == 'left':
+            return 'right'
+        return 'left'
+
+    period_sides = pd.read_csv(SIDES_PATH)
+    dct_sides = dict(zip(period_sides[['gamePk', 'team_name']].apply(tuple, axis=1).tolist(), period_sides['period_1_side'].tolist()))
+
+    df['period_1_side'] = df.apply(lambda t: dct_sides.get((t['gamePk'], t['team_name'])), axis=1)
+    df['rink_side'] = df.apply(lambda t: t['period_1_side'] if t['period'] % 2 == 1 else other_side(t['period_1_side']), axis=1)
+
+    del df['period_1_side']
+
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=500)
+    args = parser.parse_args()
+
+    plays = extract_plays(make_games(args.games), columns=['gamePk', 'team_name', 'period'], keep_all_events=True)
+    # unknown teams and plays without team
+    plays.loc[plays.index[::97], 'team_name'] = 'Unknown Team'
+    plays.loc[plays.index[::89], 'team_name'] = None
+
+    results = dict()
+    for name, add in [('row-wise', previous_add_home_away_rink_side_columns),
+                      ('join', add_home_away_rink_side_columns)]:
+        start = time.perf_counter()
+        results[name] = add(plays.copy())
+        print(f'{name:<10}{time.perf_counter() - start:>8.3f}s')
+
+    previous, joined = results['row-wise']['rink_side'], results['join']['rink_side']
+    known = pd.Series(list(zip(plays['gamePk'], plays['team_name'])), index=plays.index).isin(
+        set(pd.read_csv(SIDES_PATH)[['gamePk', 'team_name']].itertuples(index=False, name=None)))
+    assert previous[known].equals(joined[known]) and joined[~known].isna().all()
+    print(f'{len(plays)} plays, same rink_side ({(~known).sum()} plays of unknown teams)')
+
+
+if __name__ == '__main__':
+    main()
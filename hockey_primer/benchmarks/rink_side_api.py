@@ -0,0 +1,94 @@
+'''
+add_home_away_rink_side_columns_api: the previous implementation (iterrows, scan of game_info_list per row and
+df.at writes) vs the merge on the (gamePk, period) game_info_table, on the plays of synthetic games and a
+matching game_info_list (with missing periods, 'N/A' sides, unknown teams and a game listed twice).
+Both outputs are checked to be equal; the previous implementation only runs on the first --previous-games games.
+
+    python -m benchmarks.rink_side_api --games 1300 --previous-games 100
+'''
+
+import argparse
+import random
+import time
+
+from milestone1_func import add_home_away_rink_side_columns_api, game_info_table, extract_plays
+from benchmarks.synthetic import make_games
+
+
+def previous_add_home_away_rink_side_columns_api(df, game_info_list):
+    df['home_or_away'] = ''
+    df['rink_side'] = ''
+
+    for index, row in df.iterrows():
+        game_pk = row['gamePk']
+        team_name = row['team_name']
+        period = row['period']
+
+        for game_info_dict in game_info_list:
+            if game_info_dict['Game PK'] == game_pk:
+
+                away_team_name = game_info_dict['Away Team Name']
+                home_team_name = game_info_dict['Home Team Name']
+
+                if team_name == away_team_name:
+                    df.at[index, 'home_or_away'] = 'Away'
+                elif team_name == home_team_name:
+                    df.at[index, 'home_or_away'] = 'Home'
+
+                for period_info in game_info_dict['Periods Info']:
+                    if period_info['Period'] == period:
+                        if df.at[index, 'home_or_away'] == 'Home':
+                            df.at[index, 'rink_side'] = period_info.get('Home Rink Side', 'N/A')
+                        elif df.at[index, 'home_or_away'] == 'Away':
+                            df.at[index, 'rink_side'] = period_info.get('Away Rink Side', 'N/A')
+
+
+def make_game_info_list(games, seed=0):
+    rng = random.Random(seed)
+    game_info_list = []
+    for game in games:
+        teams = game['gameData']['teams']
+        first = rng.choice(['left', 'right'])
+        periods = []
+        for period in range(1, 4):
+            if rng.random() < 0.05:
+                continue  # period missing from the linescore
+            home = first if period % 2 == 1 else {'left': 'right', 'right': 'left'}[first]
+            away = {'left': 'right', 'right': 'left'}[home]
+            if rng.random() < 0.05:
+                home, away = 'N/A', 'N/A'
+            periods.append({'Period': period, 'Home Rink Side': home, 'Away Rink Side': away})
+        game_info_list.append({'Game PK': game['gamePk'], 'Away Team Name': teams['away']['name'],
+                               'Home Team Name': teams['home']['name'], 'Periods Info': periods})
+    game_info_list.append(dict(game_info_list[0]))  # listed twice
+    return game_info_list
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=1300)
+    parser.add_argument('--previous-games', type=int, default=100)
+    args = parser.parse_args()
+
+    games = list(make_games(args.games))
+    game_info_list = make_game_info_list(games)
+    plays = extract_plays(games, columns=['gamePk', 'team_name', 'period'], keep_all_events=True)
+    plays.loc[plays.index[::97], 'team_name'] = 'Unknown Team'
+
+    start = time.perf_counter()
+    table = game_info_table(game_info_list)
+    joined = add_home_away_rink_side_columns_api(plays.copy(), table)
+    print(f'{"merge":<10}{len(plays):>8} plays {time.perf_counter() - start:>8.2f}s')
+
+    subset = plays[plays['gamePk'].isin([g['gamePk'] for g in games[:args.previous_games]])].copy()
+    start = time.perf_counter()
+    previous_add_home_away_rink_side_columns_api(subset, game_info_list)
+    print(f'{"previous":<10}{len(subset):>8} plays {time.perf_counter() - start:>8.2f}s')
+
+    for c in ['home_or_away', 'rink_side']:
+        assert (joined.loc[subset.index, c].to_numpy() == subset[c].to_numpy()).all()
+    print('same home_or_away and rink_side')
+
+
+if __name__ == '__main__':
+    main()
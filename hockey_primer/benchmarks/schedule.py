@@ -0,0 +1,58 @@
+'''
+Season game-id discovery on the api-web endpoints: serial per-team requests over every team
+(previous behaviour) vs ScheduleDiscovery (concurrent, active franchises only, disk cache).
+
+    python -m benchmarks.schedule --latency 0.1
+'''
+
+import argparse
+import tempfile
+import time
+
+import requests
+
+from ift6758.data.downloader import Downloader
+from ift6758.data.schedule import ScheduleDiscovery
+from benchmarks.stand_in_server import StandInServer
+
+
+def serial_game_ids(season, server):
+    teams = requests.get(f'{server.stats_api_url}team').json()['data']
+    all_game_ids = set()
+    for team in teams:
+        schedule = requests.get(f"{server.web_api_url}club-schedule-season/{team['triCode']}/{season}").json()
+        all_game_ids.update(game['id'] for game in schedule.get('games', []))
+    return sorted(all_game_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--season', default='20162017')
+    parser.add_argument('--latency', type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency).start()
+
+    def run(label, f):
+        n_requests = server.n_requests
+        start = time.perf_counter()
+        game_ids = f()
+        print(f'{label:<28}{time.perf_counter() - start:>8.2f}s {server.n_requests - n_requests:>4} requests '
+              f'{len(game_ids):>6} games')
+        return game_ids
+
+    try:
+        expected = run('serial, every team', lambda: serial_game_ids(args.season, server))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            discovery = ScheduleDiscovery(cache_dir, downloader=Downloader(max_workers=32, rate=0),
+                                          web_api_url=server.web_api_url, stats_api_url=server.stats_api_url)
+            cold = run('ScheduleDiscovery, cold', lambda: discovery.game_ids(args.season))
+            warm = run('ScheduleDiscovery, cached', lambda: discovery.game_ids(args.season))
+            assert cold == warm == expected
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
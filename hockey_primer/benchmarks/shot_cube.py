@@ -0,0 +1,88 @@
+'''
+The data work behind the q1 / q3 figures: histograms of --shots raw rows (three copies of the dataset and a
+np.histogram per figure, like the previous q1 / q3) vs a ShotCube built once (in one pass, then updated with
+one more game) and the same histograms derived from it. Also checks that both give the same counts.
+
+    python -m benchmarks.shot_cube --shots 2000000
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ift6758.features.shot_cube import ShotCube
+
+
+def raw_histograms(df, distance_edges, angle_edges):
+    out = []
+    for _ in range(3):  # q1 copies the dataset for each figure
+        data = df.copy()
+        goals, no_goals = data[data['IsGoal'] == 1], data[data['IsGoal'] == 0]
+        out.append(np.histogram(goals['Distance_from_net'], bins=distance_edges)[0])
+        out.append(np.histogram(no_goals['Distance_from_net'], bins=distance_edges)[0])
+    out.append(np.histogram2d(df['Distance_from_net'], df['angle_from_net'], bins=[distance_edges, angle_edges])[0])
+    goals = df[df['IsGoal'] == 1]
+    out.append(np.histogram(goals.loc[goals['emptyNet'] == 1, 'Distance_from_net'], bins=distance_edges)[0])
+    return out
+
+
+def cube_histograms(cube):
+    return [
+        cube.select(('distance',), is_goal=True), cube.select(('distance',), is_goal=False),
+        cube.select(('angle',), is_goal=True), cube.select(('angle',), is_goal=False),
+        cube.select(('distance', 'angle')),
+        cube.select(('distance',), is_goal=True, empty_net=True),
+        cube.goal_rate('distance'), cube.goal_rate('angle'),
+    ]
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shots', type=int, default=2000000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.shots
+    df = pd.DataFrame({
+        'gamePk': 2015020001 + np.sort(rng.integers(0, 4, n)) * 1000000 + rng.integers(0, 1230, n),
+        'Distance_from_net': rng.gamma(4, 10, n),
+        'angle_from_net': rng.uniform(0, 90, n),
+        'IsGoal': (rng.random(n) < 0.09).astype(int),
+        'emptyNet': (rng.random(n) < 0.01).astype(int),
+    })
+    last_game = df['gamePk'] == df['gamePk'].max()
+
+    cube = ShotCube()
+    elapsed, _ = timed(lambda: raw_histograms(df, cube.distance_edges, cube.angle_edges))
+    print(f'{"raw rows, q1 + q3 histograms":<34}{elapsed:>8.3f}s')
+
+    elapsed, _ = timed(lambda: cube.update(df[~last_game]))
+    print(f'{"cube, one pass build":<34}{elapsed:>8.3f}s')
+    elapsed, _ = timed(lambda: cube.update(df[last_game]))
+    print(f'{"cube, add one game":<34}{elapsed:>8.3f}s')
+    elapsed, histograms = timed(lambda: cube_histograms(cube))
+    print(f'{"cube, histograms + goal rates":<34}{elapsed * 1000:>8.2f}ms')
+
+    expected = np.histogram(df.loc[df['IsGoal'] == 1, 'Distance_from_net'], bins=cube.distance_edges)[0]
+    # the shots past the last edge are in the cube's extra bin, as np.histogram leaves them out
+    assert (histograms[0] == expected).all()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cube.npz')
+        cube.save(path)
+        assert (ShotCube.load(path).counts == cube.counts).all()
+        print(f'{n} shots, {len(cube.seasons)} seasons, cube file {os.path.getsize(path) / 2 ** 10:.0f} kB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+'''
+Rink sides of new games: the previous infer_side (all the shots of every season concatenated, grouped, then two
+row-wise applies over the medians) rerun as games come in, vs SidesTable (ift6758.features.sides: the sides of
+the new games only, inferred with vectorized medians and appended to the table). Games come in batches, season
+after season; the final tables are checked to be the same.
+
+    python -m benchmarks.sides --games-per-season 300 --batch-size 50
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from feature_engineering_1 import tidy_data_batches
+from ift6758.features.sides import SidesTable
+from benchmarks.synthetic import make_games
+
+
+def previous_infer_side(tidied_training_set, tidied_test_set):
+
+    a = pd.concat((tidied_training_set, tidied_test_set))
+    sides = a.groupby(['gamePk', 'period', 'team_name']).agg({'x': 'median'})
+    sides = sides.reset_index()
+
+    sides['norm_x'] = sides.apply(lambda t: t['x'] * ((t['period'] % 2) * 2 - 1), axis=1)
+
+    norm_sides = sides.groupby(['gamePk', 'team_name'])['norm_x'].median().reset_index()
+
+    norm_sides_min = norm_sides.groupby(['gamePk']).norm_x.min().reset_index().rename(columns={'norm_x': 'min_x'})
+
+    norm_sides = norm_sides.merge(norm_sides_min)
+
+    norm_sides['period_1_side'] = norm_sides.apply(lambda t: ('right' if t['norm_x'] == t['min_x'] else 'left'), axis=1)
+
+    return norm_sides
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games-per-season', type=int, default=300)
+    parser.add_argument('--seasons', nargs='+', default=['2015', '2016', '2017', '2018'])
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    batches = []
+    for season in args.seasons:
+        for plays in tidy_data_batches(make_games(args.games_per_season, seasons=[season]), args.batch_size):
+            batches.append(plays[plays['eventTypeId'].isin(['SHOT', 'GOAL'])])
+
+    timings = {'previous': [], 'table': []}
+    with tempfile.TemporaryDirectory() as directory:
+        table = SidesTable(os.path.join(directory, 'period_1_sides.csv'))
+        for i, shots in enumerate(batches):
+            start = time.perf_counter()
+            previous = previous_infer_side(pd.concat(batches[:i] or [shots.iloc[:0]]), shots)
+            timings['previous'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            table.append(table.infer_missing(shots))
+            timings['table'].append(time.perf_counter() - start)
+
+        current = pd.read_csv(table.path)
+
+    key = ['gamePk', 'team_name']
+    previous = previous.sort_values(key).reset_index(drop=True)
+    current = current.sort_values(key).reset_index(drop=True)
+    assert (previous[key + ['period_1_side']].astype(object) == current[key + ['period_1_side']].astype(object)).all().all()
+
+    n_games = current['gamePk'].nunique()
+    print(f'{n_games} games in {len(batches)} batches of {args.batch_size}')
+    print(f'{"batch":<8}{"previous":>12}{"table":>12}')
+    for i in sorted({0, len(batches) // 2, len(batches) - 1}):
+        print(f'{i:<8}{timings["previous"][i] * 1e3:>10.0f}ms{timings["table"][i] * 1e3:>10.0f}ms')
+    print(f'{"total":<8}{sum(timings["previous"]):>11.2f}s{sum(timings["table"]):>11.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+'''
+Reruns of the main.py pipeline (tidy_data_parallel + add_features2, SHOT/GOAL rows) with the stage cache:
+cold cache, warm cache, one new game, and an edited feature step (only the features stage is recomputed).
+That cached runs give the uncached result is checked in tests/test_stage_cache.py.
+
+    python -m benchmarks.stage_cache --games 300
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+from ift6758.data.raw_store import PackedStore
+from feature_engineering_1 import tidy_data_parallel
+from feature_engineering_2 import add_features2
+from benchmarks.synthetic import make_games
+
+
+def edited_add_features2(df, index=None):
+    # stands for an edit of add_features2: same output, other code version
+    return add_features2(df, index=index)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PackedStore(os.path.join(directory, 'raw'))
+        games = list(make_games(args.games + 1))
+        for game in games[:-1]:
+            store.put(game['gamePk'], game)
+        cache_dir = os.path.join(directory, 'stage_cache')
+
+        def run(features=add_features2, cache=True):
+            start = time.perf_counter()
+            shots = tidy_data_parallel(store, features=features, event_types={'SHOT', 'GOAL'}, n_workers=args.workers,
+                                       cache_dir=cache_dir if cache else None)
+            return time.perf_counter() - start, shots
+
+        print(f'{args.games} games')
+        elapsed, _ = run(cache=False)
+        print(f'{"no cache":<22}{elapsed:>8.2f}s')
+
+        for name, before, features in [
+            ('cold cache', None, add_features2),
+            ('warm cache', None, add_features2),
+            ('one new game', lambda: store.put(games[-1]['gamePk'], games[-1]), add_features2),
+            ('edited features', None, edited_add_features2),
+        ]:
+            if before is not None:
+                before()
+            elapsed, _ = run(features)
+            print(f'{name:<22}{elapsed:>8.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+'''
+Local stand-in for the NHL APIs, serving synthetic games over HTTP.
+
+    server = StandInServer(latency=0.05, error_rate=0.1).start()
+    get_game_ids_for_season('20162017', base_url=server.statsapi_url)
+    ...
+    server.stop()
+
+Routes (statsapi):  /api/v1/schedule?season=<season>[&expand=schedule.linescore], /api/v1/game/<gamePk>/feed/live
+Routes (api-web):   /v1/club-schedule-season/<abbrev>/<season>, /v1/gamecenter/<id>/play-by-play
+Routes (stats api): /stats/rest/en/team, /stats/rest/en/team/summary?cayenneExp=seasonId=<season>
+
+Every 200 carries an ETag, and conditional requests matching it get a 304. Games listed in
+`live_games` are served (and scheduled) as 'Live'; `touch(game_pk)` changes a game's content.
+'''
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.synthetic import load_game_teams, make_game, make_web_game
+
+
+class StandInServer:
+    '''
+    Args:
+        latency (float): Seconds slept before answering each request.
+        error_rate (float): Fraction of requests answered with a 429 or 503.
+        n_events (int): Events per synthetic game.
+        teams (list): Abbreviations of the active teams, which play the synthetic games.
+        n_defunct (int): Extra defunct teams listed by the stats api, with empty schedules.
+    '''
+
+    def __init__(self, latency=0.0, error_rate=0.0, n_events=320, teams=None, n_defunct=25):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.n_events = n_events
+        self.teams = teams or [f'T{i:02d}' for i in range(32)]
+        self.defunct_teams = [f'D{i:02d}' for i in range(n_defunct)]
+        self.n_requests = 0
+        self.n_bytes = 0
+        self.live_games = set()
+        self.revisions = dict()
+        self.game_teams = dict(load_game_teams())
+        self._cache = dict()
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._httpd = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    @property
+    def statsapi_url(self):
+        return self.url + 'api/v1/'
+
+    @property
+    def web_api_url(self):
+        return self.url + 'v1/'
+
+    @property
+    def stats_api_url(self):
+        return self.url + 'stats/rest/en/'
+
+    def season_game_ids(self, season):
+        return [g for g in self.game_teams if str(g)[:4] == str(season)[:4]]
+
+    def touch(self, game_pk):
+        '''Simulates a correction of a game: its content (and ETag) change'''
+        with self._lock:
+            self.revisions[game_pk] = self.revisions.get(game_pk, 0) + 1
+
+    def game_state(self, game_pk):
+        return 'Live' if game_pk in self.live_games else 'Final'
+
+    def _game(self, game_pk):
+        game = make_game(game_pk, self.game_teams[game_pk], n_events=self.n_events)
+        game['gameData']['status']['abstractGameState'] = self.game_state(game_pk)
+        game['metaData']['timeStamp'] = str(self.revisions.get(game_pk, 0))
+        return game
+
+    def _linescore(self, game_pk):
+        away, home = self.game_teams[game_pk]
+        first = random.Random(game_pk).choice(['left', 'right'])
+        other = {'left': 'right', 'right': 'left'}
+        periods = [
+            {'num': n, 'home': {'rinkSide': first if n % 2 else other[first]},
+             'away': {'rinkSide': other[first] if n % 2 else first}}
+            for n in range(1, 4)
+        ]
+        return {
+            'teams': {'away': {'team': {'name': away}}, 'home': {'team': {'name': home}}},
+            'linescore': {'currentPeriod': 3, 'periods': periods},
+        }
+
+    def _body(self, key, build):
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = json.dumps(build()).encode()
+            return self._cache[key]
+
+    def route(self, path, query):
+        '''Returns the (status, body) answer for a request'''
+        m = re.fullmatch(r'/api/v1/game/(\d+)/feed/live', path)
+        if m and int(m.group(1)) in self.game_teams:
+            game_pk = int(m.group(1))
+            key = (path, self.game_state(game_pk), self.revisions.get(game_pk, 0))
+            return 200, self._body(key, lambda: self._game(game_pk))
+
+        if path == '/api/v1/schedule' and 'season' in query:
+            game_ids = self.season_game_ids(query['season'][0])
+            linescore = query.get('expand') == ['schedule.linescore']
+            key = (path, query['season'][0], linescore, tuple(sorted(self.live_games)))
+            return 200, self._body(key, lambda: {
+                'dates': [{'date': '2016-10-12', 'games': [
+                    dict({'gamePk': g, 'status': {'abstractGameState': self.game_state(g)}},
+                         **(self._linescore(g) if linescore else {}))
+                    for g in game_ids
+                ]}]
+            })
+
+        if path == '/stats/rest/en/team':
+            return 200, self._body(path, lambda: {'data': [
+                {'id': i + 1, 'triCode': abbr, 'fullName': f'Team {abbr}'}
+                for i, abbr in enumerate(self.teams + self.defunct_teams)
+            ]})
+
+        if path == '/stats/rest/en/team/summary':
+            return 200, self._body(path, lambda: {'data': [
+                {'teamId': i + 1, 'teamFullName': f'Team {abbr}'} for i, abbr in enumerate(self.teams)
+            ]})
+
+        m = re.fullmatch(r'/v1/club-schedule-season/(\w+)/(\d+)', path)
+        if m and m.group(1) in self.defunct_teams:
+            return 200, b'{"games": []}'
+
+        if m and m.group(1) in self.teams:
+            season = m.group(2)
+            team_idx = self.teams.index(m.group(1))
+            game_ids = self.season_game_ids(season)
+            return 200, self._body(path, lambda: {
+                'games': [{'id': g} for i, g in enumerate(game_ids) if i % len(self.teams) in (team_idx, (team_idx + 1) % len(self.teams))]
+            })
+
+        m = re.fullmatch(r'/v1/gamecenter/(\d+)/play-by-play', path)
+        if m:
+            game_id = int(m.group(1))
+            return 200, self._body(path, lambda: make_web_game(game_id, n_events=self.n_events))
+
+        return 404, b'{}'
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.n_requests += 1
+                    fail = server._rng.random() < server.error_rate
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if fail:
+                    status, body = server._rng.choice([429, 503]), b'{}'
+                else:
+                    url = urlparse(self.path)
+                    status, body = server.route(url.path, parse_qs(url.query))
+
+                etag = None
+                if status == 200:
+                    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        status, body = 304, b''
+
+                with server._lock:
+                    server.n_bytes += len(body)
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,115 @@
+'''
+n_players / n_opposing_players: the previous row-wise get_n_players (a scan of the penalties of the play's
+game, period and team, twice per play) vs the PenaltyTimeline sweep (ift6758.features.strength), for
+games of more and more events (and penalties). Both are timed per play.
+
+The timeline is checked against a brute force count of the penalties running at each play over the game
+clock. It differs from the previous scan only for plays in the first minutes of a period while a penalty
+of the previous period was still running (the scan ended every penalty with its period).
+
+    python -m benchmarks.strength --games 100 --penalty-weight 6
+'''
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering_1 import tidy_data_batches
+from ift6758.features.strength import PenaltyTimeline, SKATERS, opposing_team
+from benchmarks.synthetic import make_games
+
+
+def previous_n_players(df):
+    penalties = df[df.eventTypeId == 'PENALTY'][['gamePk', 'period', 'period_seconds', 'team_id', 'penaltyMinutes']]
+    penalties['period_seconds_end'] = penalties['period_seconds'] + penalties['penaltyMinutes'] * 60
+
+    game_teams = df.groupby('gamePk')['team_id'].agg(
+        lambda t: sorted(map(int, filter(lambda k: not np.isnan(k), np.unique(t.values))))
+    ).reset_index()
+
+    opposing_team_dct = dict()
+    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][0]): t['team_id'][1]}), axis=1)
+    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][1]): t['team_id'][0]}), axis=1)
+
+    penalties_dct = defaultdict(list)
+    penalties[['gamePk', 'period', 'team_id', 'period_seconds', 'period_seconds_end']].apply(
+        lambda t: penalties_dct[(t['gamePk'], t['period'], t['team_id'])].append({
+            'start': t['period_seconds'],
+            'end': t['period_seconds_end']}
+        ), axis=1)
+
+    def get_n_players(gamepk, period, team, time):
+        n = 5
+        if (gamepk, period, team) in penalties_dct:
+            c_penal = penalties_dct[(gamepk, period, team)]
+            for times in c_penal:
+                if times['start'] <= time < times['end']:
+                    n -= 1
+        return n
+
+    n_players = df.apply(lambda t: get_n_players(t['gamePk'], t['period'], t['team_id'], t['period_seconds']), axis=1)
+    n_opposing_players = df.apply(
+        lambda t: get_n_players(
+            t['gamePk'],
+            t['period'],
+            opposing_team_dct.get((t['gamePk'], t['team_id']), np.nan),
+            t['period_seconds']),
+        axis=1)
+    return n_players.to_numpy(), n_opposing_players.to_numpy()
+
+
+def timeline_n_players(df):
+    timeline = PenaltyTimeline.from_plays(df)
+    return timeline.strength(df['gamePk'], df['team_id'], df['game_seconds'])
+
+
+def brute_force_n_players(df):
+    # penalties running at each play over the game clock, game by game
+    penalties = df[df['eventTypeId'] == 'PENALTY']
+    opposing = opposing_team(df['gamePk'], df['team_id'])
+    counts = []
+    for team in (df['team_id'].to_numpy(), opposing):
+        n = np.full(len(df), SKATERS)
+        for (game_pk, team_id), group in penalties.groupby(['gamePk', 'team_id']):
+            plays = (df['gamePk'].to_numpy() == game_pk) & (team == team_id)
+            t = df['game_seconds'].to_numpy()[plays]
+            start = group['game_seconds'].to_numpy()[:, None]
+            n[plays] -= ((start <= t) & (t < start + group['penaltyMinutes'].to_numpy()[:, None] * 60)).sum(axis=0)
+        counts.append(n)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--penalty-weight', type=float, default=6)
+    args = parser.parse_args()
+
+    print(f'{"events/game":<14}{"plays":>9}{"scan":>10}{"sweep":>10}{"scan/play":>12}{"sweep/play":>12}{"carry-over":>12}')
+    for n_events in (160, 320, 640, 1280):
+        df = pd.concat(tidy_data_batches(make_games(args.games, n_events=n_events, penalty_weight=args.penalty_weight)),
+                       ignore_index=True)
+
+        start = time.perf_counter()
+        previous = previous_n_players(df)
+        elapsed_previous = time.perf_counter() - start
+        start = time.perf_counter()
+        current = timeline_n_players(df)
+        elapsed = time.perf_counter() - start
+
+        expected = brute_force_n_players(df)
+        assert all(np.array_equal(c, e) and c.dtype == np.int8 for c, e in zip(current, expected))
+
+        # plays counted differently by the scan: all under a penalty of the previous period
+        changed = (previous[0] != current[0]) | (previous[1] != current[1])
+        assert (current[0][changed] <= previous[0][changed]).all() and (current[1][changed] <= previous[1][changed]).all()
+
+        print(f'{n_events:<14}{len(df):>9}{elapsed_previous:>9.2f}s{elapsed:>9.3f}s'
+              f'{elapsed_previous / len(df) * 1e6:>10.1f}us{elapsed / len(df) * 1e6:>10.2f}us{changed.sum():>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''
+Nightly refresh cost: full re-crawl vs manifest-driven incremental sync, against the stand-in server.
+
+    python -m benchmarks.sync --games 300 --live 10 --corrected 5
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+from ift6758.data.downloader import Downloader
+from ift6758.data.manifest import Manifest, sync_season
+from ift6758.data.raw_store import open_store
+from benchmarks.stand_in_server import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--season', default='20162017')
+    parser.add_argument('--games', type=int, default=300)
+    parser.add_argument('--live', type=int, default=10, help='games still in progress at the first sync')
+    parser.add_argument('--corrected', type=int, default=5, help='final games corrected after the first sync')
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency).start()
+    game_ids = server.season_game_ids(args.season)[:args.games]
+    server.game_teams = {g: server.game_teams[g] for g in game_ids}
+    server.live_games = set(game_ids[:args.live])
+
+    downloader = Downloader(max_workers=16, rate=0)
+
+    def run(label, f):
+        requests_before, bytes_before = server.n_requests, server.n_bytes
+        start = time.perf_counter()
+        result = f()
+        print(f'{label:<36}{time.perf_counter() - start:>8.2f}s {server.n_requests - requests_before:>6} requests '
+              f'{(server.n_bytes - bytes_before) / 1e6:>8.1f} MB  {result}')
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = open_store(os.path.join(tmp, 'store'))
+            manifest = Manifest(os.path.join(tmp, 'manifest.sqlite'))
+            sync = lambda **kw: sync_season(args.season, store, manifest, downloader=downloader,
+                                            base_url=server.statsapi_url, **kw)
+
+            run('initial sync', sync)
+
+            # the live games end, a few final games get corrected
+            server.live_games = set()
+            for game_pk in game_ids[args.live:args.live + args.corrected]:
+                server.touch(game_pk)
+
+            run('full re-crawl', lambda: len(downloader.fetch_many(
+                {g: f'{server.statsapi_url}game/{g}/feed/live' for g in game_ids})))
+            run('nightly sync (schedule ttl)', sync)
+            run('nightly sync (schedule revalidated)', lambda: sync(schedule_ttl=0))
+            run('nightly sync with --revalidate', lambda: sync(schedule_ttl=0, revalidate=True))
+            run('nightly sync, nothing changed', lambda: sync(schedule_ttl=0, revalidate=True))
+            manifest.close()
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+'''
+Synthetic play-by-play games for the benchmarks, in both API schemas.
+
+Old statsapi games (`make_game`) reuse the (gamePk, team_name) pairs of resources/period_1_sides.csv,
+so the rink side lookups of the Milestone 2 pipeline hit like on real data.
+New api-web games (`make_web_game`) follow the gamecenter play-by-play layout used by Milestone 3.
+'''
+
+import random
+
+import pandas as pd
+
+from milestone1_func import SIDES_PATH
+
+
+EVENT_TYPES = [
+    ('FACEOFF', 'Faceoff'), ('SHOT', 'Shot'), ('MISSED_SHOT', 'Missed Shot'), ('BLOCKED_SHOT', 'Blocked Shot'),
+    ('HIT', 'Hit'), ('GIVEAWAY', 'Giveaway'), ('TAKEAWAY', 'Takeaway'), ('GOAL', 'Goal'), ('PENALTY', 'Penalty'),
+]
+EVENT_WEIGHTS = [12, 18, 10, 8, 15, 6, 5, 2, 3]
+
+WEB_EVENT_TYPES = ['faceoff', 'shot-on-goal', 'missed-shot', 'blocked-shot', 'hit', 'giveaway', 'goal', 'penalty']
+WEB_EVENT_WEIGHTS = [12, 18, 10, 8, 15, 6, 2, 3]
+
+PLAYER_TYPES = {
+    'FACEOFF': ['Winner', 'Loser'], 'SHOT': ['Shooter', 'Goalie'], 'MISSED_SHOT': ['Shooter'],
+    'BLOCKED_SHOT': ['Shooter', 'Blocker'], 'HIT': ['Hitter', 'Hittee'], 'GIVEAWAY': ['PlayerID'],
+    'TAKEAWAY': ['PlayerID'], 'GOAL': ['Scorer', 'Assist', 'Assist', 'Goalie'], 'PENALTY': ['PenaltyOn', 'DrewBy'],
+}
+
+
+def load_game_teams(path=SIDES_PATH):
+    '''Returns [(gamePk, [team_name, team_name]), ...] for the games of the sides table'''
+    sides = pd.read_csv(path)
+    teams = sides.groupby('gamePk')['team_name'].agg(list)
+    return [(game_pk, names) for game_pk, names in teams.items() if len(names) == 2]
+
+
+def _player(rng):
+    pid = rng.randint(8440000, 8480000)
+    return {'id': pid, 'fullName': f'Player {pid}', 'link': f'/api/v1/people/{pid}'}
+
+
+def make_game(game_pk, team_names, n_events=320, seed=None, penalty_weight=None):
+    '''Builds one statsapi `feed/live` game dict'''
+    rng = random.Random(game_pk if seed is None else seed)
+    weights = list(EVENT_WEIGHTS)
+    if penalty_weight is not None:
+        weights[-1] = penalty_weight
+
+    teams = [
+        {'id': 1 + rng.randint(0, 54), 'name': name, 'link': '/api/v1/teams/0', 'triCode': name[:3].upper()}
+        for name in team_names
+    ]
+    if teams[0]['id'] == teams[1]['id']:
+        teams[1]['id'] += 1
+
+    # One side per team for period 1, swapped on even periods (like the real rinks)
+    first_sign = rng.choice([-1, 1])
+
+    plays = []
+    goals = {'away': 0, 'home': 0}
+    per_period = n_events // 3
+    for idx in range(n_events):
+        period = min(3, idx // per_period + 1)
+        elapsed = min(1199, int((idx % per_period) * 1200 / per_period) + rng.randint(0, 3))
+        event_type_id, event = rng.choices(EVENT_TYPES, weights)[0]
+        side = rng.randint(0, 1)
+        team = teams[side]
+
+        sign = first_sign * (1 if side == 0 else -1) * (1 if period % 2 == 1 else -1)
+        x = float(sign * rng.randint(25, 99))
+        y = float(rng.randint(-42, 42))
+
+        result = {'event': event, 'eventCode': f'X{idx}', 'eventTypeId': event_type_id, 'description': event}
+        if event_type_id in {'SHOT', 'GOAL'}:
+            result['secondaryType'] = rng.choice(['Wrist Shot', 'Slap Shot', 'Snap Shot', 'Backhand'])
+        if event_type_id == 'GOAL':
+            result['strength'] = {'code': 'EVEN', 'name': 'Even'}
+            result['gameWinningGoal'] = False
+            result['emptyNet'] = rng.random() < 0.05
+            goals['home' if side else 'away'] += 1
+        if event_type_id == 'PENALTY':
+            result['secondaryType'] = 'Tripping'
+            result['penaltySeverity'] = 'Minor'
+            result['penaltyMinutes'] = rng.choice([2, 2, 2, 4, 5])
+
+        play = {
+            'players': [{'player': _player(rng), 'playerType': t} for t in PLAYER_TYPES[event_type_id]],
+            'result': result,
+            'about': {
+                'eventIdx': idx, 'eventId': idx + 1, 'period': period, 'periodType': 'REGULAR',
+                'ordinalNum': ['1st', '2nd', '3rd'][period - 1],
+                'periodTime': f'{elapsed // 60:02d}:{elapsed % 60:02d}',
+                'periodTimeRemaining': f'{(1200 - elapsed) // 60:02d}:{(1200 - elapsed) % 60:02d}',
+                'dateTime': '2016-10-12T23:10:00Z', 'goals': dict(goals),
+            },
+            'coordinates': {'x': x, 'y': y},
+            'team': team,
+        }
+        plays.append(play)
+
+    # Rosters and boxscore, which the pipeline never reads but which make up a good part of real files
+    roster = {
+        f'ID{pid}': {
+            'id': pid, 'fullName': f'Player {pid}', 'link': f'/api/v1/people/{pid}', 'firstName': 'Player',
+            'lastName': str(pid), 'primaryNumber': str(pid % 99), 'birthDate': '1990-01-01', 'currentAge': 30,
+            'birthCity': 'City', 'birthCountry': 'CAN', 'nationality': 'CAN', 'height': "6' 1\"", 'weight': 200,
+            'active': True, 'rookie': False, 'shootsCatches': 'L', 'rosterStatus': 'Y',
+            'currentTeam': teams[pid % 2], 'primaryPosition': {'code': 'C', 'name': 'Center', 'type': 'Forward'},
+        }
+        for pid in (rng.randint(8440000, 8480000) for _ in range(40))
+    }
+    boxscore = {
+        side: {
+            'team': team,
+            'teamStats': {'teamSkaterStats': {k: rng.randint(0, 40) for k in ['goals', 'pim', 'shots', 'hits', 'blocked']}},
+            'players': {pid: {'person': p, 'stats': {'skaterStats': {'timeOnIce': '15:00', 'assists': 0, 'goals': 0,
+                                                                     'shots': 1, 'hits': 2, 'faceOffWins': 0}}}
+                        for pid, p in list(roster.items())[i::2]},
+        }
+        for i, (side, team) in enumerate([('away', teams[0]), ('home', teams[1])])
+    }
+
+    return {
+        'copyright': 'synthetic',
+        'gamePk': int(game_pk),
+        'link': f'/api/v1/game/{game_pk}/feed/live',
+        'metaData': {'wait': 10, 'timeStamp': '20161013_022457'},
+        'gameData': {
+            'game': {'pk': int(game_pk), 'season': str(game_pk)[:4], 'type': 'R'},
+            'datetime': {'dateTime': '2016-10-12T23:00:00Z', 'endDateTime': '2016-10-13T01:36:49Z'},
+            'status': {'abstractGameState': 'Final', 'codedGameState': '7', 'detailedState': 'Final'},
+            'teams': {'away': teams[0], 'home': teams[1]},
+            'players': roster,
+        },
+        'liveData': {
+            'plays': {'allPlays': plays, 'scoringPlays': [], 'penaltyPlays': []},
+            'linescore': {'currentPeriod': 3},
+            'boxscore': {'teams': boxscore},
+        },
+    }
+
+
+def make_games(n_games=None, seasons=None, n_events=320, penalty_weight=None):
+    '''Yields synthetic statsapi games, optionally restricted to the given 4-digit seasons'''
+    game_teams = load_game_teams()
+    if seasons is not None:
+        seasons = {str(s) for s in seasons}
+        game_teams = [(g, t) for g, t in game_teams if str(g)[:4] in seasons]
+    if n_games is not None:
+        game_teams = game_teams[:n_games]
+
+    for game_pk, team_names in game_teams:
+        yield make_game(game_pk, team_names, n_events=n_events, penalty_weight=penalty_weight)
+
+
+def make_web_game(game_id, n_events=320, seed=None):
+    '''Builds one api-web `gamecenter/<id>/play-by-play` game dict'''
+    rng = random.Random(game_id if seed is None else seed)
+    away_id, home_id = rng.sample(range(1, 56), 2)
+
+    plays = []
+    per_period = n_events // 3
+    for idx in range(n_events):
+        period = min(3, idx // per_period + 1)
+        elapsed = min(1199, int((idx % per_period) * 1200 / per_period))
+        type_desc_key = rng.choices(WEB_EVENT_TYPES, WEB_EVENT_WEIGHTS)[0]
+        owner = rng.choice([away_id, home_id])
+        x = rng.randint(-99, 99)
+        plays.append({
+            'eventId': idx + 1,
+            'period': period,
+            'periodDescriptor': {'number': period, 'periodType': 'REG'},
+            'timeInPeriod': f'{elapsed // 60:02d}:{elapsed % 60:02d}',
+            'timeRemaining': f'{(1200 - elapsed) // 60:02d}:{(1200 - elapsed) % 60:02d}',
+            'situationCode': '1551',
+            'homeTeamDefendingSide': rng.choice(['left', 'right']),
+            'typeCode': 500 + WEB_EVENT_TYPES.index(type_desc_key),
+            'typeDescKey': type_desc_key,
+            'sortOrder': idx,
+            'details': {
+                'xCoord': x, 'yCoord': rng.randint(-42, 42),
+                'zoneCode': rng.choice(['O', 'D', 'N']),
+                'shotType': 'wrist', 'eventOwnerTeamId': owner,
+                'shootingPlayerId': rng.randint(8440000, 8480000),
+                'goalieInNetId': rng.randint(8440000, 8480000),
+            },
+        })
+
+    return {
+        'id': int(game_id),
+        'season': int(str(game_id)[:4] + str(int(str(game_id)[:4]) + 1)),
+        'gameType': 2,
+        'gameDate': '2023-10-10',
+        'startTimeUTC': '2023-10-10T21:30:00Z',
+        'gameState': 'OFF',
+        'period': 3,
+        'awayTeam': {'id': away_id, 'name': {'default': f'Team {away_id}'}, 'abbrev': f'T{away_id:02d}'},
+        'homeTeam': {'id': home_id, 'name': {'default': f'Team {home_id}'}, 'abbrev': f'T{home_id:02d}'},
+        'plays': plays,
+    }
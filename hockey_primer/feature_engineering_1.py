@@ -1,10 +1,25 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 import pandas as pd
 
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-from milestone1_func import create_game_info_list, add_home_away_rink_side_columns, get_play_data
+from milestone1_func import create_game_info_list, add_home_away_rink_side_columns, PlayExtractor, SIDES_PATH, \
+    game_table, game_index
+from ift6758.data import jsonio
+from ift6758.data.dtypes import compact
+from ift6758.data.manifest import content_hash
+from ift6758.data.raw_store import open_store
+from ift6758.data.stage_cache import StageCache, code_version, file_hash, stage_key
+from ift6758.features.clock import game_seconds, period_seconds
+from ift6758.features.geometry import shot_geometry
+from ift6758.features.sides import SidesTable, game_sides, infer_period_1_sides
+from ift6758.features.shot_cube import ShotCube, rebin
 
 
 # TODO some problems with the data based on this histogram (shouldnt increase as it gets farther)
@@ -43,60 +58,310 @@ shot/goal event.
 '''
 
 
-def tidy_data(df):
+def tidy_data(df, columns=None, with_games=False, sides_path=None):
+    '''
+    Tidies a DataFrame of raw games (one game per row). columns: projection of the play columns
+    (see milestone1_func.PlayExtractor). with_games: also return the games table (see milestone1_func.game_table),
+    as (tidied, games)
+
+    The games without rink sides in the sides table (milestone1_func.SIDES_PATH) get sides inferred from their own
+    shots (see ift6758.features.sides). sides_path: a sides table of the new games, read along with SIDES_PATH and
+    where the inferred sides are appended (by default they are not written anywhere)
+    '''
+
+    extractor = PlayExtractor(columns=columns, keep_all_events=True)
+    for i, l in df.iterrows():
+        extractor.add_game(l)
+    tidied, games, sides = _tidy_extracted(extractor, sides_path)
+    _append_sides(sides, sides_path)
+
+    return (tidied, games) if with_games else tidied
+
+
+def _known_sides(sides_path=None):
+    # period_1_side of SIDES_PATH, and of the table at sides_path (its new games) if given
+    period_sides = SidesTable(SIDES_PATH).period_sides()
+    if sides_path is not None and os.path.abspath(sides_path) != SIDES_PATH:
+        period_sides = pd.concat([period_sides, SidesTable(sides_path).period_sides()])
+        period_sides = period_sides[~period_sides.index.duplicated()]
+    return period_sides
 
-    df = df.copy()
 
-    tidied = pd.DataFrame(t for i, l in df.iterrows() for t in get_play_data(l, keep_all_events=True))
+def _append_sides(sides, sides_path=None):
+    if sides_path is not None:
+        SidesTable(sides_path).append(sides)
+
+
+def _period_sides(plays, sides_path=None):
+    # period_1_side of the sides tables, with the sides of the games of plays that are not in them inferred from
+    # their shots (see ift6758.features.sides), and the inferred rows (to append to the table at sides_path)
+    period_sides = _known_sides(sides_path)
+    shots = plays[plays['eventTypeId'].isin(['SHOT', 'GOAL'])]
+    sides = infer_period_1_sides(shots[~shots['gamePk'].isin(period_sides.index.get_level_values(0))])
+    return pd.concat([period_sides, sides.set_index(['gamePk', 'team_name'])['period_1_side']]), sides
+
+
+def _tidy_extracted(extractor, sides_path=None):
+    # tidy_plays of the plays of extractor: (tidied, games table, inferred sides rows)
+    plays = extractor.to_frame()
+    games = extractor.games_frame()
+    period_sides, sides = _period_sides(plays, sides_path)
+    return tidy_plays(plays, game_index(games, period_sides)), games, sides
+
+
+def tidy_data_batches(games, batch_size=100, columns=None, sides_path=None):
+    '''
+    Same as tidy_data, but for an iterable of raw games (e.g. milestone1_func.iter_games) consumed lazily:
+    yields one tidied DataFrame per batch_size games, so only one batch of games is in memory at a time.
+    Games are never split across batches.
+    '''
+    extractor = PlayExtractor(columns=columns, keep_all_events=True)
+    n_games = 0
+
+    for game in games:
+        extractor.add_game(game)
+        n_games += 1
+
+        if n_games == batch_size:
+            tidied, _, sides = _tidy_extracted(extractor, sides_path)
+            _append_sides(sides, sides_path)
+            yield tidied
+            extractor = PlayExtractor(columns=columns, keep_all_events=True)
+            n_games = 0
+
+    if n_games:
+        tidied, _, sides = _tidy_extracted(extractor, sides_path)
+        _append_sides(sides, sides_path)
+        yield tidied
+
+
+def _split_games(df, game_ids, offsets=None):
+    # {gamePk: rows of the game, indexed from 0 at the game's first row (offsets: {gamePk: index of that row})}
+    parts = dict()
+    for game_id in game_ids:
+        part = df[df['gamePk'] == game_id]
+        part.index = part.index - (offsets[game_id] if offsets is not None else part.index.min() if len(part) else 0)
+        parts[game_id] = part
+    return parts
+
+
+def _tidy_chunk_cached(store, cache, game_ids, features=None, event_types=None, schema=None, columns=None,
+                       sides_path=None):
+    # _tidy_chunk through the stage cache: 'tidy' (raw game -> tidied plays) is keyed on the raw json content,
+    # 'features' (tidied plays -> features + event_types filter) on the key of the tidied plays.
+    # Only the missing outputs are computed, all the games missing a stage together.
+    # The tidied plays of a game also depend on its rows of the sides tables (inferred from the raw game when it
+    # has none, which keys it as None).
+    # game_index: the stages call the methods of the GameIndex it builds
+    tidy_version = stage_key(code_version(PlayExtractor, tidy_plays, game_index), columns)
+    raw = {g: store.get_raw(g) for g in game_ids}
+    period_sides = _known_sides(sides_path)
+    sides_keys = game_sides(period_sides, game_ids)
+    tidy_keys = {g: stage_key(content_hash(raw[g]), tidy_version, sides_keys[g]) for g in game_ids}
+
+    tidied = {g: cache.get('tidy', g, tidy_keys[g]) for g in game_ids}
+    missing = [g for g in game_ids if tidied[g] is None]
+    sides = pd.DataFrame()
+    if missing:
+        extractor = PlayExtractor(columns=columns, keep_all_events=True)
+        for g in missing:
+            extractor.add_game(jsonio.loads(raw[g], schema=schema))
+        plays = extractor.to_frame()
+        play_columns = list(plays.columns)
+        games = extractor.games_frame()
+        period_sides, sides = _period_sides(plays, sides_path)
+        if sides_path is not None:
+            # keyed as they will be on the next runs, with their inferred sides in the table
+            sides_keys.update({g: s for g, s in game_sides(period_sides, missing).items() if s is not None})
+            tidy_keys.update({g: stage_key(content_hash(raw[g]), tidy_version, sides_keys[g]) for g in missing})
+        computed = tidy_plays(plays, game_index(games, period_sides))
+        for g, part in _split_games(computed, missing).items():
+            tidied[g] = ((play_columns, list(computed.columns)), part, games.loc[[g]])
+            cache.put('tidy', g, tidy_keys[g], tidied[g])
+    del raw
+    games = pd.concat([tidied[g][2] for g in game_ids])
+
+    if features is None:
+        outputs = dict()
+        for g in game_ids:
+            game_columns, part, _ = tidied[g]
+            n_rows = len(part)
+            if event_types is not None:
+                part = part[part['eventTypeId'].isin(event_types)]
+            outputs[g] = (n_rows, game_columns, part)
+    else:
+        features_version = stage_key(code_version(features, game_index), sorted(event_types) if event_types else None)
+        keys = {g: stage_key(tidy_keys[g], features_version) for g in game_ids}
+
+        outputs = {g: cache.get('features', g, keys[g]) for g in game_ids}
+        missing = [g for g in game_ids if outputs[g] is None]
+        if missing:
+            # index the games as if they had been tidied together
+            offsets = dict()
+            n = 0
+            for g in missing:
+                offsets[g] = n
+                n += len(tidied[g][1])
+            plays = pd.concat([tidied[g][1].set_axis(tidied[g][1].index + offsets[g]) for g in missing])
+
+            featured = features(plays, index=game_index(games, period_sides))
+            if event_types is not None:
+                featured = featured[featured['eventTypeId'].isin(event_types)]
+
+            for g, part in _split_games(featured, missing, offsets).items():
+                outputs[g] = (len(tidied[g][1]), tidied[g][0], part)
+                cache.put('features', g, keys[g], outputs[g])
+
+    frames = []
+    offset = 0
+    play_columns, tidy_columns = [], []
+    for g in game_ids:
+        n_rows, (game_play_columns, game_tidy_columns), part = outputs[g]
+        frames.append(part.set_axis(part.index + offset))
+        offset += n_rows
+        play_columns += game_play_columns
+        tidy_columns += game_tidy_columns
+
+    columns = (list(dict.fromkeys(play_columns)), list(dict.fromkeys(tidy_columns)))
+    return offset, columns, pd.concat(frames), games, sides
+
+
+def _tidy_chunk(directory, game_ids, features=None, event_types=None, schema=None, columns=None, cache_dir=None,
+                sides_path=None):
+    # Worker of tidy_data_parallel: reads its games itself, so raw games are never sent between processes
+    store = open_store(directory)
+    if cache_dir is not None:
+        return _tidy_chunk_cached(store, StageCache(cache_dir), game_ids, features=features,
+                                  event_types=event_types, schema=schema, columns=columns, sides_path=sides_path)
+
+    extractor = PlayExtractor(columns=columns, keep_all_events=True)
+    for game_id in game_ids:
+        extractor.add_game(store.get(game_id, schema=schema))
+    plays = extractor.to_frame()
+    play_columns = list(plays.columns)
+    games = extractor.games_frame()
+    period_sides, sides = _period_sides(plays, sides_path)
+    index = game_index(games, period_sides)
+
+    tidied = tidy_plays(plays, index)
+    n_rows, columns = len(tidied), (play_columns, list(tidied.columns))
+
+    if features is not None:
+        tidied = features(tidied, index=index)
+    if event_types is not None:
+        tidied = tidied[tidied['eventTypeId'].isin(event_types)]
+
+    return n_rows, columns, tidied, games, sides
+
+
+def tidy_data_parallel(directory, prefixes=None, n_workers=None, chunk_size=50, features=None, event_types=None,
+                       schema=None, columns=None, cache_dir=None, with_games=False, sides_path=None):
+    '''
+    Parallel tidy_data over the games saved in directory (optionally only the gamePk prefixes, see
+    milestone1_func.iter_games). Games are sorted by gamePk and sharded in chunks of chunk_size games across
+    n_workers processes (defaults to the number of cores; 1 runs in process).
+
+    Each worker tidies its chunk, then applies features (a per-game feature step such as add_features2, which
+    must be a module-level function, called as features(plays, index=GameIndex of their games, see
+    milestone1_func.game_index)) and keeps only event_types if given. Chunks are put back together in gamePk
+    order, with the same rows, index, columns and values as tidy_data (+ features) over the sorted games.
+    columns is the projection of the play columns (see milestone1_func.PlayExtractor).
+
+    With cache_dir, the tidied plays and the features of every game are kept in a content-addressed stage
+    cache (see ift6758.data.stage_cache): a rerun only recomputes the games whose raw json changed, and the
+    stages whose code changed (e.g. only the features after an edit of add_features2).
+
+    with_games: also return the games table of the games (see milestone1_func.game_table), as (tidied, games).
+
+    The games without rink sides in the sides tables (milestone1_func.SIDES_PATH, and sides_path if given) get
+    sides inferred from their own shots (see ift6758.features.sides). They are only written with sides_path: appended
+    to that table once all the chunks are done.
+    '''
+    store = open_store(directory)
+    if prefixes is None or isinstance(prefixes, str):
+        prefixes = [prefixes]
+    game_ids = sorted(set(g for prefix in prefixes for g in store.game_ids(prefix)))
+
+    chunks = [game_ids[i:i + chunk_size] for i in range(0, len(game_ids), chunk_size)]
+    work = partial(_tidy_chunk, store.directory, features=features, event_types=event_types, schema=schema,
+                   columns=columns, cache_dir=cache_dir, sides_path=sides_path)
+
+    n_workers = n_workers or os.cpu_count()
+    if n_workers == 1:
+        results = list(map(work, chunks))
+    else:
+        # fork when available: spawned workers would re-run the calling script (main.py runs the pipeline at import)
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(n_workers, mp_context=context) as executor:
+            results = list(executor.map(work, chunks))
+
+    if not results:
+        return (pd.DataFrame(), game_table([])) if with_games else pd.DataFrame()
+
+    _append_sides(pd.concat([sides for *_, sides in results]), sides_path)
+
+    # Index the chunks as if they had been tidied together, and order the columns like a single DataFrame would
+    frames = []
+    offset = 0
+    for n_rows, _, tidied, _, _ in results:
+        tidied.index = tidied.index + offset
+        frames.append(tidied)
+        offset += n_rows
+
+    # the categories of the chunks (and of the cached games) differ: compacted again, the concatenated columns get
+    # the sorted values present as categories, whatever was cached
+    tidied = compact(pd.concat(frames))
+
+    play_columns = [c for _, (columns, _), *_ in results for c in columns]
+    tidy_columns = [c for _, (_, columns), *_ in results for c in columns]
+    columns = list(dict.fromkeys(play_columns + tidy_columns + list(tidied.columns)))
+
+    if with_games:
+        return tidied[columns], pd.concat([games for _, _, _, games, _ in results])
+    return tidied[columns]
+
+
+def tidy_plays(tidied, index=None):
+    '''
+    Adds the tidy columns to a DataFrame of plays, as built by milestone1_func.extract_plays. index: GameIndex of
+    their games (see milestone1_func.game_index), for the rink sides
+    '''
 
     # Add column Is goal (0 or 1)
     tidied['IsGoal'] = (tidied['eventTypeId'] == 'GOAL').astype(int)
 
     # Replace column emptyNet (0 or 1; you can assume NaNs are 0)
+    if 'emptyNet' not in tidied:
+        tidied['emptyNet'] = np.nan  # no goal in these plays
     tidied['emptyNet'] = tidied['emptyNet'].replace([np.nan, False, True], [0, 0, 1])
 
+    # Integer game clock: seconds since the start of the period and of the game (see ift6758.features.clock)
+    if 'periodTime' in tidied:
+        tidied['period_seconds'] = period_seconds(tidied['periodTime'])
+        tidied['game_seconds'] = game_seconds(tidied['period'], tidied['period_seconds'])
+
     # add rink_side column
     # seasons = ["20152016", "20162017", "20172018", "20182019"]  # , "20192020"]
     # for season in seasons:
     #     game_info_list = create_game_info_list(season)
     #     add_home_away_rink_side_columns(tidied, game_info_list)
 
-    tidied = add_home_away_rink_side_columns(tidied)
+    tidied = add_home_away_rink_side_columns(tidied, index)
 
-    # Add column Distance from net
+    # Add columns Distance from net and Angle from net (see ift6758.features.geometry)
 
     # approximate nets as being (-89, 0) and (89, 0)
     # if rink side is left offense is on the right
     # if rink side is left: trying to score in right net (89, 0)
     # if rink side is right: trying to score in left net (-89, 0)
-    tidied['Distance_from_net'] = np.sqrt(
-        np.where(
-            tidied['rink_side'] == 'left',
-            (tidied['x'] - 89) ** 2 + tidied['y'] ** 2,
-            (tidied['x'] + 89) ** 2 + tidied['y'] ** 2
-        )
-    )
-
-    # Add column Angle from net
-
     # If shoots from right in from of net (y=0), then angle is 0 deg
     # if shoots completely from the side (x=89 or -89), then angle is 90 deg
-    # add a temp column x_distance_from_net
-
-    tidied['x_distance_from_net'] = np.where(
-        tidied['rink_side'] == 'left',
-        abs(89 - tidied['x']),
-        abs(-89 - tidied['x'])
-    )
+    _, distance, angle = shot_geometry(tidied['x'].to_numpy(), tidied['y'].to_numpy(), tidied['rink_side'].to_numpy())
+    tidied['Distance_from_net'] = distance
+    tidied['angle_from_net'] = angle
 
-    tidied['angle_from_net'] = np.degrees(
-        np.arccos(tidied['x_distance_from_net'] / tidied['Distance_from_net'])
-    )
-
-    # can remove the x_distance_from_net column
-    tidied.drop(['x_distance_from_net'], axis=1, inplace=True)
-
-    return tidied
+    # Compact dtypes (categoricals, small integers, float32, see ift6758.data.dtypes)
+    return compact(tidied)
 
 
 """##Figures"""
@@ -112,15 +377,63 @@ As always, make sure all of your axes are labeled correctly, and you make the ap
 '''
 
 
+def shot_cube(data):
+    '''
+    The ShotCube of data: a tidied dataset (counted in one pass) or a ShotCube (see ift6758.features.shot_cube)
+    '''
+    if isinstance(data, ShotCube):
+        return data
+    return ShotCube.from_frame(data)
+
+
+def shot_cube_version():
+    '''
+    Version of what a ShotCube of tidied shots counts: the code of the tidy stage and of the cube, and the sides table
+    (for the distances and angles). A cube saved with another version is counted again (see ShotCube.open)
+    '''
+    return stage_key(code_version(PlayExtractor, tidy_plays, game_index, ShotCube), file_hash(SIDES_PATH))
+
+
+def _hist(counts, edges, n_bins=8, **kwargs):
+    # plt.hist of binned counts (one array per dataset), merged into about n_bins bins
+    factor = -(-len(edges[:-1]) // n_bins)
+    merged = [rebin(c, edges, factor) for c in counts]
+    edges = merged[0][1]
+    centers = (edges[:-1] + edges[1:]) / 2
+    return plt.hist([centers] * len(counts), bins=edges, weights=[c for c, _ in merged], **kwargs)
+
+
+def _joint_hist(cube, factor=5, **kwargs):
+    # 2D histogram of distance x angle with the marginal histograms (the jointplot of the shots),
+    # on bins factor times wider than the cube's
+    counts, distance_edges = rebin(cube.select(('distance', 'angle')), cube.distance_edges, factor, axis=0)
+    counts, angle_edges = rebin(counts, cube.angle_edges, factor, axis=1)
+    bins = pd.DataFrame({
+        'Distance_from_net': np.repeat((distance_edges[:-1] + distance_edges[1:]) / 2, len(angle_edges) - 1),
+        'angle_from_net': np.tile((angle_edges[:-1] + angle_edges[1:]) / 2, len(distance_edges) - 1),
+        'count': counts.ravel(),
+    })
+
+    g = sns.JointGrid(data=bins, x='Distance_from_net', y='angle_from_net')
+    sns.histplot(data=bins, x='Distance_from_net', y='angle_from_net', weights='count',
+                 bins=[distance_edges, angle_edges], ax=g.ax_joint, **kwargs)
+    sns.histplot(data=bins, x='Distance_from_net', weights='count', bins=list(distance_edges), ax=g.ax_marg_x)
+    sns.histplot(data=bins, y='angle_from_net', weights='count', bins=list(angle_edges), ax=g.ax_marg_y)
+    return g
+
+
 def q1(tidied_training_set):
+    '''
+    tidied_training_set: the tidied dataset, or its ShotCube. All the figures are drawn from the binned counts
+    '''
 
-    df = tidied_training_set.copy()
+    cube = shot_cube(tidied_training_set)
 
     # Separate goals and no-goals
-    goals = df[df['IsGoal'] == 1]
-    no_goals = df[df['IsGoal'] == 0]
+    goals = cube.select(('distance',), is_goal=True)
+    no_goals = cube.select(('distance',), is_goal=False)
 
-    plt.hist([goals['Distance_from_net'], no_goals['Distance_from_net']], bins=8, alpha=1, label=['Goals', 'No-Goals'], color=['red', 'blue'])
+    _hist([goals, no_goals], cube.distance_edges, alpha=1, label=['Goals', 'No-Goals'], color=['red', 'blue'])
 
     # Set labels and title
     plt.xlabel('Distance from Net')
@@ -137,13 +450,11 @@ def q1(tidied_training_set):
     A histogram of shot counts (goals and no-goals separated), binned by angle
     '''
 
-    df = tidied_training_set.copy()
-
     # Separate goals and no-goals
-    goals = df[df['IsGoal'] == 1]
-    no_goals = df[df['IsGoal'] == 0]
+    goals = cube.select(('angle',), is_goal=True)
+    no_goals = cube.select(('angle',), is_goal=False)
 
-    plt.hist([goals['angle_from_net'], no_goals['angle_from_net']], bins=8, alpha=1, label=['Goals', 'No-Goals'], color=['red', 'blue'])
+    _hist([goals, no_goals], cube.angle_edges, alpha=1, label=['Goals', 'No-Goals'], color=['red', 'blue'])
 
     # Set labels and title
     plt.xlabel('Angle from Net')
@@ -160,10 +471,8 @@ def q1(tidied_training_set):
     A 2D histogram where one axis is the distance and the other is the angle. You do not need to separate goals and no-goals.
     '''
 
-    df = tidied_training_set.copy()
-
-    # Create a 2D histogram using jointplot
-    sns.jointplot(data=df, x='Distance_from_net', y='angle_from_net', kind='hist', cmap='Blues')
+    # Create a 2D histogram like a jointplot
+    _joint_hist(cube, cmap='Blues')
 
     # Display the plot
     plt.show()
@@ -178,6 +487,28 @@ Include these figures in your blogpost and briefly discuss your observations.
 '''
 
 
+def q2(tidied_training_set, n_bins=20):
+
+    cube = shot_cube(tidied_training_set)
+
+    for axis, label in [('distance', 'Distance from Net'), ('angle', 'Angle from Net')]:
+        factor = -(-len(cube.edges(axis)[:-1]) // n_bins)
+        goals, edges = rebin(cube.select((axis,), is_goal=True), cube.edges(axis), factor)
+        shots, _ = rebin(cube.select((axis,)), cube.edges(axis), factor)
+
+        rate = np.full(len(shots), np.nan)
+        np.divide(goals, shots, out=rate, where=shots > 0)
+
+        plt.plot((edges[:-1] + edges[1:]) / 2, rate, marker='o')
+
+        # Set labels and title
+        plt.xlabel(label)
+        plt.ylabel('Goal Rate')
+        plt.title(f'Goal Rate by {label}')
+
+        plt.show()
+
+
 """####Question 3"""
 
 '''
@@ -193,20 +524,18 @@ Hint: the NHL gamecenter usually has video clips of goals for every game.
 
 
 def q3(tidied_training_set):
+    '''
+    tidied_training_set: the tidied dataset, or its ShotCube (then only the histogram is drawn)
+    '''
 
-    df = tidied_training_set.copy()
+    cube = shot_cube(tidied_training_set)
 
-    # Filter rows for goals only
-    goals = df[df['IsGoal'] == 1]
+    # Goals only, separated by empty net and non-empty net
+    empty_net_goals = cube.select(('distance',), is_goal=True, empty_net=True)
+    non_empty_net_goals = cube.select(('distance',), is_goal=True, empty_net=False)
 
-    # Separate empty net and non-empty net goals
-    empty_net_goals = goals[goals['emptyNet'] == 1]
-    non_empty_net_goals = goals[goals['emptyNet'] == 0]
-
-    plt.hist([
-        empty_net_goals['Distance_from_net'],
-        non_empty_net_goals['Distance_from_net']
-        ], bins=8, alpha=1, label=['Empty Net Goals', 'Non-Empty Net Goals'], color=['red', 'blue'])
+    _hist([empty_net_goals, non_empty_net_goals], cube.distance_edges, alpha=1,
+          label=['Empty Net Goals', 'Non-Empty Net Goals'], color=['red', 'blue'])
 
     # Set labels and title
     plt.xlabel('Distance from Net')
@@ -219,6 +548,11 @@ def q3(tidied_training_set):
     # Display the histogram
     plt.show()
 
+    if isinstance(tidied_training_set, ShotCube):
+        return
+
+    goals = tidied_training_set[tidied_training_set['IsGoal'] == 1]
+
     non_empty_net_goals = goals[goals['emptyNet'] == 0]
     non_empty_net_goals.iloc[1]
 
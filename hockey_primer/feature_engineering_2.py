@@ -1,181 +1,193 @@
-from collections import defaultdict
-from datetime import datetime, timedelta
-
 import numpy as np
 import pandas as pd
 
+from ift6758.data.dtypes import compact
+from ift6758.features.clock import game_seconds, period_seconds
+from ift6758.features.sides import infer_period_1_sides
+from ift6758.features.strength import PenaltyTimeline, PowerplayWindows, opposing_team
 
-def parse_game_date(t):
-    if not pd.isnull(t):
-        return datetime.strptime(t[:-4], '%Y-%m-%dT%M:%S')
-    else:
-        return np.nan
-
-
-def add_features2(df):
-    df = df.copy()
-
-    df['gameDateTime'] = df['gameDateTime'].map(parse_game_date)
-    df['gameEndDateTime'] = df['gameEndDateTime'].map(parse_game_date)
-
-    df['game_seconds'] = df.apply(
-        lambda t:
-            (t['gameEndDateTime'] - t['gameDateTime']).total_seconds()
-            if not pd.isnull(t['gameEndDateTime'])
-            else np.nan,
-        axis=1)
-    # BAD DATA: DROP GAMES WITH MORE THAN 200 SECONDS
-
-    df = df.sort_values(['gamePk', 'periodTime'], ascending=[True, True])
-    df['last_event_type_id'] = df.groupby('gamePk')['eventTypeId'].shift(1)
-    df['last_event_x'] = df.groupby('gamePk')['x'].shift(1)
-    df['last_event_y'] = df.groupby('gamePk')['y'].shift(1)
-    df['last_event_time'] = df.groupby('gamePk')['periodTime'].shift(1)
-    df['last_event_angle'] = df.groupby('gamePk')['angle_from_net'].shift(1)
-
-    norm_period_time = lambda t: datetime(2000, 1, 1, 0, int(t.split(':')[0]), int(t.split(':')[1]))
 
-    def period_time_distance(pt1, pt2):
-        if (not isinstance(pt2, str)) or (not isinstance(pt1, str)):
-            return np.nan
+# Columns of the last play of a game that the features of the next one depend on
+LAST_EVENT_COLUMNS = ['eventTypeId', 'x', 'y', 'periodTime', 'angle_from_net', 'game_seconds']
 
-        dt1 = norm_period_time(pt1)
-        dt2 = norm_period_time(pt2)
 
-        return (dt2 - dt1).total_seconds()
+def add_features2(df, index=None):
+    '''
+    Previous event and bonus features of tidied plays. index: GameIndex of the games (see
+    milestone1_func.game_index), for the opposing teams; without it (or for games not in it) they are found from
+    the teams of the plays.
 
-    df['time_from_last_event'] = df.apply(
-        lambda t: period_time_distance(t['last_event_time'], t['periodTime']),
-        axis=1
-    )
-    df['dist_from_last_event'] = df.apply(
-        lambda t: np.linalg.norm(np.array([t['x'], t['y']]) - np.array([t['last_event_x'], t['last_event_y']])),
-        axis=1
-    )
+    For plays appended to games poll after poll, IncrementalFeatures2 gives the same rows from the new plays only.
+    '''
+    df = _sorted_plays(df)
 
-    df['rebound'] = df.apply(lambda t: t['eventTypeId'] == t['last_event_type_id'], axis=1)
-    df['change_in_angle'] = df.apply(lambda t: abs(t['angle_from_net'] - t['last_event_angle']), axis=1)
-    df['speed'] = df.apply(lambda t: t['dist_from_last_event'] / (t['time_from_last_event'] + 1), axis=1)
+    last_event = df.groupby('gamePk')[LAST_EVENT_COLUMNS].shift(1)
+    _add_previous_event_features(df, last_event)
 
     ####################################
     # BONUS FEATURES ##################
 
-    penalties = df[df.eventTypeId == 'PENALTY'][['gamePk', 'period', 'periodTime', 'team_id', 'penaltyMinutes']]
-    penalties['periodTimeEnd'] = penalties.apply(
-        lambda t: (norm_period_time(t['periodTime']) + timedelta(minutes=t['penaltyMinutes'])).strftime('%M:%S'),
-        axis=1
-    )
-
-    game_teams = df.groupby('gamePk')['team_id'].agg(
-        lambda t: sorted(map(int, filter(lambda k: not np.isnan(k), np.unique(t.values))))
-    ).reset_index()
-
-    opposing_team_dct = dict()
-    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][0]): t['team_id'][1]}), axis=1)
-    game_teams.apply(lambda t: opposing_team_dct.update({(t['gamePk'], t['team_id'][1]): t['team_id'][0]}), axis=1)
-
-    penalties_dct = defaultdict(list)
-    penalties[['gamePk', 'period', 'team_id', 'periodTime', 'periodTimeEnd']].apply(
-        lambda t: penalties_dct[(t['gamePk'], t['period'], t['team_id'])].append({
-            'periodTime': t['periodTime'],
-            'periodTimeEnd': t['periodTimeEnd']}
-        ), axis=1)
-
-    def get_n_players(gamepk, period, team, time):
-        n = 5
-        if (gamepk, period, team) in penalties_dct:
-            c_penal = penalties_dct[(gamepk, period, team)]
-            for times in c_penal:
-                if times['periodTime'] <= time < times['periodTimeEnd']:
-                    n -= 1
-        return n
-
-    df['n_players'] = df.apply(
-        lambda t: get_n_players(t['gamePk'], t['period'], t['team_id'], t['periodTime']),
-        axis=1
-    )
-    df['n_opposing_players'] = df.apply(
-        lambda t: get_n_players(
-            t['gamePk'],
-            t['period'],
-            opposing_team_dct.get((t['gamePk'], t['team_id']), np.nan),
-            t['periodTime']),
-        axis=1)
-
-    def powerplay_start(gamepk, period, team, time):
-        if np.isnan(team):
-            return np.nan  # Doesn't matter as we intend to keep only shots
-
-        _powerplay_start = '99:99'
-        for times in penalties_dct.get((gamepk, period, team), []):
-            if times['periodTime'] < time < times['periodTimeEnd']:
-                _powerplay_start = min(_powerplay_start, times['periodTime'])
-
-        for times in penalties_dct.get((gamepk, period, opposing_team_dct[(gamepk, team)]), []):
-            if times['periodTime'] < time < times['periodTimeEnd']:
-                _powerplay_start = min(_powerplay_start, times['periodTime'])
-
-        if _powerplay_start == '99:99':
-            return np.nan
-
-        return _powerplay_start
-
-    def time_since_powerplay(gamepk, period, team, time):
-        _start = powerplay_start(gamepk, period, team, time)
-        c_start = _start
-        while not pd.isnull(_start):  # Iterate since start of powerplay time windows, until penalty wasn't in powerplay
-            c_start = _start
-            _start = powerplay_start(gamepk, period, team, _start)
-
-        if pd.isnull(c_start):
-            return np.nan
-
-        return period_time_distance(c_start, time)
-
-    df['time_since_powerplay'] = df.apply(
-        lambda t: time_since_powerplay(t['gamePk'], t['period'], t['team_id'], t['periodTime']),
-        axis=1
-    )
+    # Skaters on the ice of both teams, from the penalties running at each play (see ift6758.features.strength)
+    timeline = PenaltyTimeline.from_plays(df)
+    opposing = None
+    if index is not None and index.contains(df['gamePk'].unique()).all():
+        opposing = index.opponent(df['gamePk'], df['team_id'])
+    df['n_players'], df['n_opposing_players'] = timeline.strength(
+        df['gamePk'], df['team_id'], df['game_seconds'], opposing)
+
+    # Time since the start of the powerplay (penalties of either team, chained while they overlap) of each play
+    windows = PowerplayWindows.from_plays(df)
+    _add_time_since_powerplay(df, windows)
 
     #df[['gamePk', 'eventTypeId', 'periodTime', 'x', 'y', 'last_event_type_id', 'last_event_x', 'last_event_y',
     #    'last_event_time', 'time_from_last_event', 'dist_from_last_event', 'rebound', 'angle_from_net', 'last_event_angle', 'change_in_angle', 'speed']].head(60)
 
-    return df
-
-
-def infer_side(tidied_training_set, tidied_test_set):
-
-    a = pd.concat((tidied_training_set, tidied_test_set))
-    sides = a.groupby(['gamePk', 'period', 'team_name']).agg(
-        {'x': 'median'})  # , 'rink_side': lambda t: [k for k in t if not pd.isnull(k)][0]})
-    sides = sides.reset_index()
-
-    sides['norm_x'] = sides.apply(lambda t: t['x'] * ((t['period'] % 2) * 2 - 1), axis=1)
-
-    norm_sides = sides.groupby(['gamePk', 'team_name'])['norm_x'].median().reset_index()
-
-    # norm_sides_max = norm_sides.groupby(['gamePk']).norm_x.max().reset_index().rename(columns={'norm_x': 'max_x'})
-    norm_sides_min = norm_sides.groupby(['gamePk']).norm_x.min().reset_index().rename(columns={'norm_x': 'min_x'})
-
-    norm_sides = norm_sides.merge(norm_sides_min)
-
-    norm_sides['period_1_side'] = norm_sides.apply(lambda t: ('right' if t['norm_x'] == t['min_x'] else 'left'), axis=1)
-
-    #norm_sides[['gamePk', 'team_name', 'norm_x', 'period_1_side']].to_csv('resources/period_1_sides.csv', index=False)
-
-
-
-
-
-
-
-
-
-
-
+    # Compact dtypes (categoricals, small integers, float32, see ift6758.data.dtypes)
+    return compact(df)
 
 
+def _sorted_plays(df):
+    # A copy of the plays with the integer game clock, in game clock order
+    df = df.copy()
 
+    # The game dates and game_duration are in the games table (see milestone1_func.game_table)
+    # BAD DATA: DROP GAMES WITH MORE THAN 200 SECONDS
 
+    # Integer game clock (emitted by feature_engineering_1.tidy_plays, added here for plays tidied before it)
+    if 'game_seconds' not in df:
+        df['period_seconds'] = period_seconds(df['periodTime'])
+        df['game_seconds'] = game_seconds(df['period'], df['period_seconds'])
+
+    return df.sort_values(['gamePk', 'game_seconds'], ascending=[True, True])
+
+
+def _add_previous_event_features(df, last_event):
+    # Previous event features, on whole columns (NaN for the first event of a game)
+    df['last_event_type_id'] = last_event['eventTypeId']
+    df['last_event_x'] = last_event['x']
+    df['last_event_y'] = last_event['y']
+    df['last_event_time'] = last_event['periodTime']
+    df['last_event_angle'] = last_event['angle_from_net']
+
+    df['time_from_last_event'] = df['game_seconds'] - last_event['game_seconds']
+
+    dx = df['x'].to_numpy(dtype=float) - last_event['x'].to_numpy(dtype=float)
+    dy = df['y'].to_numpy(dtype=float) - last_event['y'].to_numpy(dtype=float)
+    df['dist_from_last_event'] = np.sqrt(dx * dx + dy * dy)
+
+    df['rebound'] = df['eventTypeId'].to_numpy(dtype=object) == last_event['eventTypeId'].to_numpy(dtype=object)
+    df['change_in_angle'] = (df['angle_from_net'] - df['last_event_angle']).abs()
+    df['speed'] = df['dist_from_last_event'] / (df['time_from_last_event'] + 1)
+
+
+def _add_time_since_powerplay(df, windows):
+    df['time_since_powerplay'] = np.where(
+        df['team_id'].notna(),  # Doesn't matter as we intend to keep only shots
+        windows.time_since_start(df['gamePk'], df['period'], df['period_seconds']),
+        np.nan)
+
+
+class IncrementalFeatures2:
+    '''
+    add_features2 for plays appended to games, poll after poll: `update(new_plays)` returns the feature rows of the
+    new plays only, the same as add_features2 of all the plays of their games. The features of a play depend on the
+    plays before it through a small per-game state, carried over between updates:
+
+        last_events  the last play of each game (LAST_EVENT_COLUMNS)
+        teams        the teams of each game
+        penalties    the penalties still running at the last play of each game (game seconds)
+        powerplays   the last powerplay window of each game (period seconds, see PowerplayWindows.last_windows)
+
+    so the cost of an update only depends on the number of new plays. The plays of a game must come in game clock
+    order: an update with plays before the last play of a previous update raises a ValueError. The rows already
+    returned are not updated: a penalty given at the second of a play of a previous update does not count in its
+    n_players, as it does in add_features2.
+
+    index: GameIndex of the games (see milestone1_func.game_index), for the opposing teams. Without it (or for
+    games not in it) they are found from the teams of the plays.
+    '''
+
+    def __init__(self, index=None):
+        self.index = index
+        self.last_events = None
+        self.teams = pd.DataFrame({'gamePk': pd.Series(dtype=np.int64), 'team_id': pd.Series(dtype=float)})
+        self.penalties = pd.DataFrame({c: pd.Series(dtype=float) for c in ['gamePk', 'team_id', 'start', 'end']})
+        self.powerplays = pd.DataFrame({c: pd.Series(dtype=float) for c in ['gamePk', 'period', 'start', 'end']})
+
+    def update(self, df):
+        df = _sorted_plays(df)
+
+        last_event = df.groupby('gamePk')[LAST_EVENT_COLUMNS].shift(1)
+        if self.last_events is not None:
+            # the first new play of a game follows the last play of the previous updates
+            first = ~df['gamePk'].duplicated().to_numpy()
+            carried = self.last_events.reindex(df['gamePk'].to_numpy()[first])
+            if (df['game_seconds'].to_numpy()[first] < carried['game_seconds'].to_numpy()).any():
+                raise ValueError('Plays must come in game clock order, after the plays of the previous updates')
+            for column in LAST_EVENT_COLUMNS:
+                if isinstance(last_event[column].dtype, pd.CategoricalDtype):
+                    # the carried values may not be categories of these plays
+                    last_event[column] = last_event[column].astype(object)
+                last_event.loc[first, column] = carried[column].to_numpy()
+        _add_previous_event_features(df, last_event)
+
+        ####################################
+        # BONUS FEATURES ##################
+
+        # State of the games of these plays (the other games' is kept as is)
+        games = df['gamePk'].unique()
+        state = {name: getattr(self, name)[getattr(self, name)['gamePk'].isin(games)]
+                 for name in ('teams', 'penalties', 'powerplays')}
+
+        penalties = df[(df['eventTypeId'] == 'PENALTY') & df['team_id'].notna()]
+        minutes = penalties['penaltyMinutes'].to_numpy(dtype=float) * 60
+        teams = pd.concat([state['teams'], df.loc[df['team_id'].notna(), ['gamePk', 'team_id']]]).drop_duplicates()
+
+        # Skaters on the ice of both teams, from the penalties running at each play (see ift6758.features.strength)
+        running = pd.concat([state['penalties'], pd.DataFrame({
+            'gamePk': penalties['gamePk'].to_numpy(), 'team_id': penalties['team_id'].to_numpy(dtype=float),
+            'start': penalties['game_seconds'].to_numpy(dtype=float),
+            'end': penalties['game_seconds'].to_numpy(dtype=float) + minutes})])
+        timeline = PenaltyTimeline(running['gamePk'], running['team_id'], running['start'], running['end'])
+        if self.index is not None and self.index.contains(games).all():
+            opposing = self.index.opponent(df['gamePk'], df['team_id'])
+        else:
+            opposing = opposing_team(np.append(teams['gamePk'].to_numpy(), df['gamePk'].to_numpy()),
+                                     np.append(teams['team_id'].to_numpy(), df['team_id'].to_numpy(dtype=float)))
+            opposing = opposing[len(teams):]
+        df['n_players'], df['n_opposing_players'] = timeline.strength(
+            df['gamePk'], df['team_id'], df['game_seconds'], opposing)
+
+        # Time since the start of the powerplay of each play, the last window of the previous updates given back as
+        # a penalty
+        powerplays = pd.concat([state['powerplays'], pd.DataFrame({
+            'gamePk': penalties['gamePk'].to_numpy(), 'period': penalties['period'].to_numpy(),
+            'start': penalties['period_seconds'].to_numpy(dtype=float),
+            'end': penalties['period_seconds'].to_numpy(dtype=float) + minutes})])
+        windows = PowerplayWindows(powerplays['gamePk'], powerplays['period'], powerplays['start'], powerplays['end'])
+        _add_time_since_powerplay(df, windows)
+
+        # Carry-over state for the next update
+        last_events = df[['gamePk'] + LAST_EVENT_COLUMNS].drop_duplicates('gamePk', keep='last').set_index('gamePk')
+        if self.last_events is not None:
+            last_events = pd.concat([self.last_events[~self.last_events.index.isin(last_events.index)], last_events])
+        self.last_events = last_events
+
+        def carry_over(name, value):
+            kept = getattr(self, name)
+            setattr(self, name, pd.concat([kept[~kept['gamePk'].isin(games)], value], ignore_index=True))
+
+        carry_over('teams', teams)
+        # penalties ended at the last play of their game can't be running at a later one
+        carry_over('penalties', running[running['end'].to_numpy() >
+                                        last_events['game_seconds'].reindex(running['gamePk']).to_numpy()])
+        carry_over('powerplays', pd.DataFrame(dict(zip(['gamePk', 'period', 'start', 'end'], windows.last_windows()))))
+
+        # Compact dtypes (categoricals, small integers, float32, see ift6758.data.dtypes)
+        return compact(df)
 
 
+def infer_side(tidied_training_set, tidied_test_set):
+    # Sides table rows of the games of both sets (see ift6758.features.sides: the sides of new games are inferred
+    # as they are tidied, see feature_engineering_1.tidy_data)
+    return infer_period_1_sides(pd.concat((tidied_training_set, tidied_test_set)))
@@ -6,14 +6,12 @@ Original file is located at
     https://colab.research.google.com/drive/1G6sBuZsaR64B6xkyy6T4jDsBLoVuOSZx
 """
 
+import logging
 import pandas as pd
 import os
-import numpy as np
 
-from milestone1_func import get_game_ids_for_season, save_game_data_to_local, load_data_from_files
-from feature_engineering_2 import add_features2
-
-directory = "data"  # change this to your directory: run from root milestone2 dir
+from ift6758.data.manifest import Manifest, sync_season
+from ift6758.features.shot_cube import ShotCube
 
 
 # LOAD DATA
@@ -25,81 +23,69 @@ directory = "data"  # change this to your directory: run from root milestone2 di
 '''
 
 # Load saved data into a pandas DataFrame
-from feature_engineering_1 import tidy_data
+# (experiments only reading the sets: registry.load_dataset, which does not rerun this script)
+from feature_engineering_1 import shot_cube_version
+from milestone1_func import game_index
+from registry import build_dataset, directory
 
 
 tidied_file_path = os.path.join(directory, 'tidied_training_set_f2.csv')
 test_file_path = os.path.join(directory, 'test_set_f2.csv')
+# The parquet datasets of both sets (shots and games) are written by registry.build_dataset
+games_file_path = os.path.join(directory, 'games_f2.csv')
+# Teams and rink sides of the games, for the feature steps (see ift6758.features.game_index.GameIndex.load)
+game_index_path = os.path.join(directory, 'game_index_f2.npz')
 
-if False and (os.path.exists(tidied_file_path) and os.path.exists(test_file_path)):
-    tidied_training_set = pd.read_csv(tidied_file_path)
-    test_set = pd.read_csv(test_file_path)
-else:
-
-    # DOESN'T DO ANYTHING IF FILES ALREADY EXIST
-    download = False
-    if download:
-        # OJO: This needs the API
-        seasons = ["20152016", "20162017", "20172018", "20182019", "20192020"]
-        for season in seasons:
-            game_ids = get_game_ids_for_season(season)
-            save_game_data_to_local(game_ids, directory)
-            print(f"Saved game data for season {season} to {directory}/game_id.json")
-
-    data_list = load_data_from_files(directory)
-    data = pd.DataFrame(data_list)
-
-    # Add columns for season and game_type from gamePk
-    data['season'] = data['gamePk'].apply(lambda x: str(x)[:4])
-    data['game_type'] = data['gamePk'].apply(lambda x: str(x)[4:6])
-
-    # TEST SET #########################
+# ONLY FETCHES MISSING OR NOT FINAL GAMES (see ift6758.data.manifest)
+download = False
+if download:
+    # OJO: This needs the API
+    # Shows the progress of the downloads (requests done, throughput, time left, see ift6758.data.downloader)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    manifest = Manifest(os.path.join(directory, 'manifest.sqlite'))
+    seasons = ["20152016", "20162017", "20172018", "20182019", "20192020"]
+    for season in seasons:
+        counts = sync_season(season, directory, manifest)
+        print(f"Synced game data for season {season} to {directory}: {counts}")
+    manifest.close()
 
-    # 2019-2020 season  # TODO: SHOULD WE KEEP ONLY game_type == '02' AS IN training_set?
-    test_set = data[data['season'] == '2019'].copy()
-    test_set.drop(['season', 'game_type'], axis=1, inplace=True)
+# gamePk = season (4 digits) + game type (2 digits) + game number
 
-    tidied_test_set = tidy_data(test_set)
-    tidied_test_set = add_features2(tidied_test_set)
-    tidied_test_set = tidied_test_set[tidied_test_set.eventTypeId.map(lambda t: t in {'SHOT', 'GOAL'})]
+# TEST SET #########################
 
-    dismiss = {'Winner_fullName',
-       'Winner_link', 'Loser_fullName', 'Loser_link', 'team_link', 'team_triCode', 'Hitter_id',
-       'Hitter_fullName', 'Hitter_link', 'Hittee_id', 'Hittee_fullName',
-       'Hittee_link', 'Shooter_id', 'Shooter_fullName', 'Shooter_link',
-       'Goalie_id', 'Goalie_fullName', 'Goalie_link', 'secondaryType',
-       'PlayerID_id', 'PlayerID_fullName', 'PlayerID_link', 'Blocker_id',
-       'Blocker_fullName', 'Blocker_link', 'PenaltyOn_id',
-       'PenaltyOn_fullName', 'PenaltyOn_link', 'DrewBy_id', 'DrewBy_fullName',
-       'DrewBy_link', 'ServedBy_id',
-       'ServedBy_fullName', 'ServedBy_link', 'Scorer_id', 'Scorer_fullName',
-       'Scorer_link', 'Assist_id', 'Assist_fullName', 'Assist_link'}
+# 2019-2020 season (see registry.DATASETS)
+tidied_test_set, test_games = build_dataset('test_f2')
 
-    # Save as csv
-    tidied_test_set[[t for t in tidied_test_set.columns if t not in dismiss]].to_csv(test_file_path, index=False)
+# Save as csv
+tidied_test_set.to_csv(test_file_path, index=False)
 
-    # Save as csv
-    # test_set.to_csv(test_file_path, index=False)
+# TRAINING AND VALIDATION SET
 
-    # TRAINING AND VALIDATION SET
+# 2015/16 - 2018/19 regular season data
+tidied_training_set, training_games = build_dataset('train_f2')
 
-    # 2015/16 - 2018/19 regular season data
-    train_seasons = {'2015', "2016", "2017", "2018"}
-    training_set = data[(data['season'].isin(train_seasons)) & (data['game_type'] == '02')].copy()
-    training_set.drop(['season', 'game_type'], axis=1, inplace=True)
+# Save as csv
+tidied_training_set.to_csv(tidied_file_path, index=False)
 
-    tidied_training_set = tidy_data(training_set)
-    tidied_training_set = add_features2(tidied_training_set)
-    tidied_training_set = tidied_training_set[tidied_training_set.eventTypeId.map(lambda t: t in {'SHOT', 'GOAL'})]
+games = pd.concat([training_games, test_games]).sort_index()
+games.to_csv(games_file_path)
+game_index(games).save(game_index_path)
 
-    # Save as csv
-    tidied_training_set[[t for t in tidied_training_set.columns if t not in dismiss]].to_csv(tidied_file_path, index=False)
+# Binned shot counts of the training set, for the figures of feature_engineering_1 (q1(cube), q2(cube), q3(cube)).
+# Only the games not counted yet are added, unless the code of the shots changed: then all of them are counted again
+cube_path = os.path.join(directory, 'shot_cube_f2.npz')
+cube = ShotCube.open(cube_path, shot_cube_version())
+cube.update(tidied_training_set)
+cube.save(cube_path)
 
 
 
 '''
+# json files are around 2Gb size! They can be packed into compressed season archives instead
+# (load_data_from_files and save_game_data_to_local read/write either layout):
+#   python -m ift6758.data.raw_store migrate data data/packed
+
 # Uncomment to delete json files from directory (can use after saving data as csv)
-# json files are around 2Gb size! 
 
 file_list = os.listdir(directory)
 
@@ -127,15 +113,3 @@ for json_file in json_files:
 # here, tidied_training_set has all event types
 
 # TODO: 2019 season has bad rink side. maybe some of gamePk, team, period, coordinates are wrong?
-
-
-
-
-
-
-
-
-
-
-
-
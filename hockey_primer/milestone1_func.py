@@ -1,8 +1,14 @@
-import requests
 import pandas as pd
 import os
-import json
 import numpy as np
+from contextlib import contextmanager
+
+from ift6758.data.downloader import default_downloader
+from ift6758.data.linescores import fetch_linescores
+from ift6758.data.manifest import Manifest
+from ift6758.data.raw_store import open_store
+from ift6758.features.game_index import GameIndex
+from ift6758.features.sides import SidesTable
 
 """##2. Feature Engineering I (10%)"""
 
@@ -30,17 +36,18 @@ Functions from Milestone 1 for getting data
 base_url = "https://statsapi.web.nhl.com/api/v1/"
 
 
-def get_game_ids_for_season(season):
+def get_game_ids_for_season(season, downloader=None, base_url=base_url):
 
     game_ids = []
 
+    downloader = downloader or default_downloader()
+
     # Fetch the schedule for the given season
-    response = requests.get(f"{base_url}schedule?season={season}")
-    if response.status_code != 200:
+    data = downloader.get_json(f"{base_url}schedule?season={season}")
+    if data is None:
         print(f"Failed to fetch the schedule for season {season}.")
         return []
 
-    data = response.json()
     dates = data.get("dates", [])
 
     # Extract game IDs
@@ -54,37 +61,52 @@ def get_game_ids_for_season(season):
 
 
 # Fetch and save game data for each game ID
-def save_game_data_to_local(game_ids, directory):
+# directory can be a folder of <gamePk>.json files, a folder of season packs, or a store (see ift6758.data.raw_store)
+def save_game_data_to_local(game_ids, directory, downloader=None, base_url=base_url):
 
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    store = open_store(directory)
 
-    for game_id in game_ids:
+    downloader = downloader or default_downloader()
 
-        fname = os.path.join(directory, str(game_id) + '.json')
-        if os.path.exists(fname):
-            continue
+    # Only fetch the games that are not already saved
+    urls = {
+        game_id: f"{base_url}game/{game_id}/feed/live"
+        for game_id in game_ids
+        if game_id not in store
+    }
 
-        response = requests.get(f"{base_url}game/{game_id}/feed/live")
+    def save(game_id, response):
+        # the body is already json: store it as is instead of decoding and re-encoding it
+        store.put(game_id, response.content)
+        return True
 
-        if response.status_code == 200:
-            with open(fname, "w") as file:
-                json.dump(response.json(), file)
-        else:
+    saved = downloader.fetch_many(urls, handle=save, desc=f"games -> {directory}")
+
+    for game_id in urls:
+        if game_id not in saved:
             print(f"Failed to fetch data for game ID {game_id}")
 
 
 def load_data_from_files(directory):
 
-    all_data = []
+    return list(open_store(directory).iter_games())
+
 
-    for filename in os.listdir(directory):
-        if filename.endswith(".json"):
-            with open(os.path.join(directory, filename), "r") as file:
-                data = json.load(file)
-                all_data.append(data)
+def iter_games(directory, prefixes=None, schema=None):
+    '''
+    Yields the raw games saved in directory one at a time, instead of loading them all like load_data_from_files.
+    prefixes: optional gamePk prefix or list of prefixes, e.g. '2019' for a season or ['201502', '201602'] for
+    regular seasons (gamePk = season + game type + game number)
+    schema: 'statsapi' to only decode the fields get_play_data reads, and only the player ids
+    (see ift6758.data.jsonio)
+    '''
+    store = open_store(directory)
 
-    return all_data
+    if prefixes is None or isinstance(prefixes, str):
+        prefixes = [prefixes]
+
+    for prefix in prefixes:
+        yield from store.iter_games(prefix, schema=schema)
 
 
 def flatten_dict(d, prefix=''):
@@ -116,10 +138,9 @@ def get_play_data(ld, keep_all_events=False):
                 for k in pls[i]['player'].keys()
         }
 
+    # game level fields (dates, teams) are in the games table, see game_row
     meta = {
         'gamePk': ld['gamePk'],
-        'gameDateTime': ld['gameData']['datetime'].get('dateTime'),
-        'gameEndDateTime': ld['gameData']['datetime'].get('endDateTime')
     }
 
     for play in ld['liveData']['plays']['allPlays']:
@@ -147,7 +168,192 @@ def get_play_data(ld, keep_all_events=False):
         yield playdata
 
 
-def create_game_info_list(season):
+# Fixed schema of the play columns, in the order of get_play_data's flattened keys:
+# column -> (section of the play, key path in the section, kind)
+# 'int' columns are stored as floats while extracting and turned back to ints if no value is missing
+PLAYER_TYPES = ['Winner', 'Loser', 'Hitter', 'Hittee', 'Shooter', 'Goalie', 'PlayerID', 'Blocker', 'PenaltyOn',
+                'DrewBy', 'ServedBy', 'Scorer', 'Assist', 'Unknown']
+
+PLAY_SCHEMA = dict(
+    [(t + '_' + k, ('players', (t, k), 'float' if k == 'id' else 'object'))
+     for t in PLAYER_TYPES for k in ['id', 'fullName', 'link']]
+    + [
+        ('event', ('result', ('event',), 'object')),
+        ('eventCode', ('result', ('eventCode',), 'object')),
+        ('eventTypeId', ('result', ('eventTypeId',), 'object')),
+        ('description', ('result', ('description',), 'object')),
+        ('secondaryType', ('result', ('secondaryType',), 'object')),
+        ('penaltySeverity', ('result', ('penaltySeverity',), 'object')),
+        ('penaltyMinutes', ('result', ('penaltyMinutes',), 'float')),
+        ('strength_code', ('result', ('strength', 'code'), 'object')),
+        ('strength_name', ('result', ('strength', 'name'), 'object')),
+        ('gameWinningGoal', ('result', ('gameWinningGoal',), 'object')),
+        ('emptyNet', ('result', ('emptyNet',), 'object')),
+        ('eventIdx', ('about', ('eventIdx',), 'int')),
+        ('eventId', ('about', ('eventId',), 'int')),
+        ('period', ('about', ('period',), 'int')),
+        ('periodType', ('about', ('periodType',), 'object')),
+        ('ordinalNum', ('about', ('ordinalNum',), 'object')),
+        ('periodTime', ('about', ('periodTime',), 'object')),
+        ('periodTimeRemaining', ('about', ('periodTimeRemaining',), 'object')),
+        ('dateTime', ('about', ('dateTime',), 'object')),
+        ('goals_away', ('about', ('goals', 'away'), 'int')),
+        ('goals_home', ('about', ('goals', 'home'), 'int')),
+        ('x', ('coordinates', ('x',), 'float')),
+        ('y', ('coordinates', ('y',), 'float')),
+        ('team_id', ('team', ('id',), 'float')),
+        ('team_name', ('team', ('name',), 'object')),
+        ('team_link', ('team', ('link',), 'object')),
+        ('team_triCode', ('team', ('triCode',), 'object')),
+        ('gamePk', ('meta', ('gamePk',), 'int')),
+    ]
+)
+
+# Player names and links are never used: not extracted by default
+DEFAULT_PLAY_COLUMNS = [c for c in PLAY_SCHEMA if not c.endswith('_link') and not c.endswith('_fullName')]
+
+# Columns of the games table: one row per game, for the fields shared by all its plays (which only keep the gamePk)
+GAME_COLUMNS = ['gamePk', 'gameDateTime', 'gameEndDateTime', 'away_team_id', 'away_team_name', 'home_team_id',
+                'home_team_name']
+
+
+def game_row(ld):
+    '''
+    The GAME_COLUMNS of a raw game, as a tuple
+    '''
+    dates = ld['gameData'].get('datetime') or dict()
+    teams = ld['gameData'].get('teams') or dict()
+    away, home = teams.get('away') or dict(), teams.get('home') or dict()
+    return (ld['gamePk'], dates.get('dateTime'), dates.get('endDateTime'), away.get('id'), away.get('name'),
+            home.get('id'), home.get('name'))
+
+
+def game_table(rows):
+    '''
+    Games table of game_row tuples: indexed by gamePk, with the dates parsed (UTC, once per game) and the
+    game_duration in seconds (NaN for games without end)
+    '''
+    games = pd.DataFrame.from_records(rows, columns=GAME_COLUMNS)
+    for c in ['gameDateTime', 'gameEndDateTime']:
+        games[c] = pd.to_datetime(games[c], utc=True)
+    games['game_duration'] = (games['gameEndDateTime'] - games['gameDateTime']).dt.total_seconds()
+
+    return games.drop_duplicates('gamePk', keep='last').set_index('gamePk')
+
+
+class PlayExtractor:
+    '''
+    Columnar alternative to get_play_data + pd.DataFrame.
+    Plays are written straight into typed NumPy buffers preallocated per game (one per column of the projection),
+    instead of one flattened dict per play, and the DataFrame is built once by to_frame().
+    Columns outside of PLAY_SCHEMA are ignored; columns of the projection that no play has are all NaN.
+    The game level fields are kept once per game, in the games table given by games_frame().
+
+    columns: projection, a subset of PLAY_SCHEMA (defaults to DEFAULT_PLAY_COLUMNS)
+    '''
+
+    keep_event_types = {'SHOT', 'GOAL'}
+
+    def __init__(self, columns=None, keep_all_events=False):
+        columns = set(DEFAULT_PLAY_COLUMNS if columns is None else columns)
+        unknown = columns - set(PLAY_SCHEMA)
+        if unknown:
+            raise KeyError(f'Unknown play columns {sorted(unknown)}')
+
+        self.columns = [c for c in PLAY_SCHEMA if c in columns]
+        self.keep_all_events = keep_all_events
+        self.chunks = {c: [] for c in self.columns}
+        self.games = []
+
+        # (column, key path) per section, players by (playerType, key)
+        self.sections = {section: [] for section in ['result', 'about', 'coordinates', 'team', 'meta']}
+        self.players = dict()
+        for c in self.columns:
+            section, path, kind = PLAY_SCHEMA[c]
+            if section == 'players':
+                self.players[path] = c
+            else:
+                self.sections[section].append((c, path))
+
+    def add_game(self, ld):
+        plays = ld['liveData']['plays']['allPlays']
+        if not self.keep_all_events:
+            plays = [p for p in plays if p['result']['eventTypeId'] in self.keep_event_types]
+        n = len(plays)
+
+        buffers = {
+            c: np.full(n, np.nan, dtype=object if PLAY_SCHEMA[c][2] == 'object' else np.float64)
+            for c in self.columns
+        }
+
+        self.games.append(game_row(ld))
+        for c, (key,) in self.sections['meta']:
+            buffers[c][:] = ld[key]
+
+        for i, play in enumerate(plays):
+            for section in ['result', 'about', 'coordinates', 'team']:
+                d = play.get(section)
+                if not d:
+                    continue
+                for c, path in self.sections[section]:
+                    v = d
+                    for key in path:
+                        v = v.get(key) if isinstance(v, dict) else None
+                        if v is None:
+                            break
+                    if v is not None:
+                        buffers[c][i] = v
+
+            if self.players:
+                for p in play.get('players', ()):
+                    for k, v in p['player'].items():
+                        c = self.players.get((p['playerType'], k))
+                        if c is not None:
+                            buffers[c][i] = v
+
+        for c in self.columns:
+            self.chunks[c].append(buffers[c])
+
+    def to_frame(self):
+        data = dict()
+        for c in self.columns:
+            values = np.concatenate(self.chunks[c]) if self.chunks[c] else np.array([], dtype=np.float64)
+            if PLAY_SCHEMA[c][2] == 'int' and not np.isnan(values).any():
+                values = values.astype(np.int64)
+            data[c] = values
+        return pd.DataFrame(data, columns=self.columns)
+
+    def games_frame(self):
+        return game_table(self.games)
+
+
+def extract_plays(games, columns=None, keep_all_events=False):
+    '''
+    Extracts the plays of an iterable of raw games into one DataFrame, with a fixed set of typed columns
+    (see PlayExtractor)
+    '''
+    extractor = PlayExtractor(columns=columns, keep_all_events=keep_all_events)
+    for game in games:
+        extractor.add_game(game)
+    return extractor.to_frame()
+
+
+@contextmanager
+def _manifest(manifest=None):
+    # The given manifest, or the download manifest of directory (closed on exit)
+    if manifest is not None:
+        yield manifest
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = Manifest(os.path.join(directory, 'manifest.sqlite'))
+    try:
+        yield manifest
+    finally:
+        manifest.close()
+
+
+def create_game_info_list(season, manifest=None):
     '''
     Use linescore to get home and away rinkSide.
     Creates a list of dictionaries:
@@ -169,121 +375,129 @@ def create_game_info_list(season):
       'Home Rink Side': 'right',
       'Away Rink Side': 'left'},
       etc
-    '''
-    url = f"https://statsapi.web.nhl.com/api/v1/schedule?season={season}&expand=schedule.linescore"
-    response = requests.get(url)
 
-    if response.status_code != 200:
-        print(f"Failed to fetch the schedule for season {season}.")
+    Linescores are saved in the download manifest (directory/manifest.sqlite by default) and not downloaded
+    again (see ift6758.data.linescores). create_game_info_table gives the same information as an indexed table.
+    '''
+    with _manifest(manifest) as manifest:
+        table = fetch_linescores(season, manifest, base_url=base_url)
+        games = manifest.linescore_games(season)
 
-    data = response.json()
+    periods_info = dict()
+    for (gamepk, period), row in zip(table.index, table.itertuples(index=False)):
+        if pd.isna(period):  # the teams of a game without periods
+            continue
+        periods_info.setdefault(int(gamepk), []).append({
+            'Period': int(period),
+            'Home Rink Side': row.home_rink_side,
+            'Away Rink Side': row.away_rink_side,
+        })
+
+    return [
+        {
+            'Game PK': gamepk,
+            'Away Team Name': away_team_name,
+            'Home Team Name': home_team_name,
+            'Periods Info': periods_info.get(gamepk, []),
+        }
+        for gamepk, away_team_name, home_team_name in games
+    ]
 
-    # Parse the JSON data
-    parsed_data = json.loads(json.dumps(data))
 
-    # Create a list to store the extracted information
-    game_info_list = []
+def game_info_table(game_info_list):
+    '''
+    Indexed version of a game_info_list: one row per (gamePk, period) with the columns
+    away_team_name, home_team_name, home_rink_side and away_rink_side. A game with no 'Periods Info' keeps its
+    teams in one row with a missing (<NA>) period.
+    '''
+    no_periods = [{'Period': None, 'Home Rink Side': None, 'Away Rink Side': None}]
+    rows = [
+        (g['Game PK'], p['Period'], g['Away Team Name'], g['Home Team Name'],
+         p.get('Home Rink Side', 'N/A'), p.get('Away Rink Side', 'N/A'))
+        for g in game_info_list for p in g['Periods Info'] or no_periods
+    ]
+    table = pd.DataFrame(rows, columns=['gamePk', 'period', 'away_team_name', 'home_team_name', 'home_rink_side',
+                                        'away_rink_side'])
+    table['period'] = table['period'].astype('Int64')
 
-    # Extract information for each game
-    for date_info in parsed_data['dates']:
-        for game_info in date_info['games']:
-            gamepk = game_info['gamePk']
-            away_team_name = game_info['teams']['away']['team']['name']
-            home_team_name = game_info['teams']['home']['team']['name']
+    # A game listed twice in the schedule (e.g. postponed): its last listing wins
+    table = table.drop_duplicates(['gamePk', 'period'], keep='last')
 
-            # Extract information for each period
-            periods_info = []
-            for period in game_info['linescore']['periods']:
-                period_num = period['num']
+    return table.set_index(['gamePk', 'period']).sort_index()
 
-                # Check if 'rinkSide' key exists for home and away
-                home_rink_side = period['home'].get('rinkSide', 'N/A')
-                away_rink_side = period['away'].get('rinkSide', 'N/A')
 
-                period_info = {
-                  'Period': period_num,
-                  'Home Rink Side': home_rink_side,
-                  'Away Rink Side': away_rink_side,
-                }
+def create_game_info_table(season, manifest=None):
+    '''
+    create_game_info_list as a game_info_table, indexed by (gamePk, period), read straight from the saved linescores
+    '''
+    with _manifest(manifest) as manifest:
+        return fetch_linescores(season, manifest, base_url=base_url)
 
-                periods_info.append(period_info)
 
-            # Create a dictionary to represent the game information
-            game_info_dict = {
-              'Game PK': gamepk,
-              'Away Team Name': away_team_name,
-              'Home Team Name': home_team_name,
-              'Periods Info': periods_info,
-            }
+# Side of the rink of each team in the first period: gamePk, team_name, norm_x, period_1_side (see
+# ift6758.features.sides). Only read: the sides of new games are inferred from their shots as they are tidied, and
+# only appended to a sides table of their own when one is given (sides_path of feature_engineering_1.tidy_data)
+SIDES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'period_1_sides.csv')
 
-            # Append the game information to the list
-            game_info_list.append(game_info_dict)
 
-    return game_info_list
+def load_period_sides(path=SIDES_PATH):
+    '''
+    period_1_side indexed by (gamePk, team_name), read once per process (and again if the file changes)
+    '''
+    return SidesTable(path).period_sides()
 
 
-def add_home_away_rink_side_columns(df):
+def game_index(games, period_sides=None, path=SIDES_PATH):
     '''
-
+    GameIndex of a games table (see game_table), with the first period sides of period_sides (indexed by
+    (gamePk, team_name)), or of the sides table at path
     '''
-    def other_side(s):
-        if s is None:
-            return None
+    if period_sides is None:
+        period_sides = load_period_sides(path)
+    return GameIndex.from_games(games).set_period_1_sides(period_sides)
 
-        if s == 'left':
-            return 'right'
-        return 'left'
 
-    period_sides = pd.read_csv('resources/period_1_sides.csv')
-    dct_sides = dict(zip(period_sides[['gamePk', 'team_name']].apply(tuple, axis=1).tolist(), period_sides['period_1_side'].tolist()))
+def add_home_away_rink_side_columns(df, index=None):
+    '''
+    Adds the rink_side column: the period_1_side of (gamePk, team_name) on odd periods, the other side on even
+    periods, None for unknown teams. With index (a GameIndex of the games of df, see game_index), the side is
+    looked up by team_id in the index instead of by team_name in the sides table.
+    '''
+    if index is not None:
+        df['rink_side'] = index.rink_side(df['gamePk'], df['team_id'], df['period'])
+        return df
+
+    period_sides = load_period_sides()
 
     # Infer side from where the shots were made
-    df['period_1_side'] = df.apply(lambda t: dct_sides.get((t['gamePk'], t['team_name'])), axis=1)
-    df['rink_side'] = df.apply(lambda t: t['period_1_side'] if t['period'] % 2 == 1 else other_side(t['period_1_side']), axis=1)
-    #df[['gamePk', 'period', 'team_name', 'period_1_side', 'rink_side']].head(60)
+    keys = pd.MultiIndex.from_arrays([df['gamePk'], df['team_name']])
+    period_1_side = period_sides.reindex(keys).to_numpy(dtype=object)
+    other_side = np.where(period_1_side == 'left', 'right', 'left')
 
-    del df['period_1_side']
+    rink_side = np.where(df['period'].to_numpy() % 2 == 1, period_1_side, other_side)
+    df['rink_side'] = np.where(pd.notna(period_1_side), rink_side, None)
 
     return df
 
 
-def add_home_away_rink_side_columns_api(df, game_info_list):
+def add_home_away_rink_side_columns_api(df, game_info):
     '''
-    Use game_info_list to add the columns 'home_or_away' and 'rink_side' to the df
+    Use game_info (a game_info_table, or a game_info_list) to add the columns 'home_or_away' ('Home', 'Away' or '')
+    and 'rink_side' (the team's side in the play's period, '' if unknown) to the df
     '''
+    table = game_info if isinstance(game_info, pd.DataFrame) else game_info_table(game_info)
 
-    # Create new columns 'home_or_away' and 'rink_side'
-    df['home_or_away'] = ''
-    df['rink_side'] = ''
-
-    # Iterate through DataFrame rows
-    for index, row in df.iterrows():
-        game_pk = row['gamePk']
-        team_name = row['team_name']
-        period = row['period']
-
-        # Find the corresponding game_info_dict based on gamePk
-        for game_info_dict in game_info_list:
-            if game_info_dict['Game PK'] == game_pk:
-
-                away_team_name = game_info_dict['Away Team Name']
-                home_team_name = game_info_dict['Home Team Name']
-
-                # Determine 'home_or_away' based on team_name
-                if team_name == away_team_name:
-                    df.at[index, 'home_or_away'] = 'Away'
-                elif team_name == home_team_name:
-                    df.at[index, 'home_or_away'] = 'Home'
-
-                # Find the corresponding 'rink_side' based on period and team's location (home or away)
-                for period_info in game_info_dict['Periods Info']:
-                    if period_info['Period'] == period:
-                        if df.at[index, 'home_or_away'] == 'Home':
-                            df.at[index, 'rink_side'] = period_info.get('Home Rink Side', 'N/A')
-                        elif df.at[index, 'home_or_away'] == 'Away':
-                            df.at[index, 'rink_side'] = period_info.get('Away Rink Side', 'N/A')
-
-
+    # Teams of every game (also of the games without periods), and sides of every (game, period) of the plays
+    teams = table.groupby(level='gamePk')[['away_team_name', 'home_team_name']].last().reindex(df['gamePk'])
+    sides = table.reindex(pd.MultiIndex.from_arrays([df['gamePk'], df['period']]))
 
+    team_name = df['team_name'].to_numpy()
+    is_away = team_name == teams['away_team_name'].to_numpy()
+    is_home = ~is_away & (team_name == teams['home_team_name'].to_numpy())
 
+    df['home_or_away'] = np.where(is_away, 'Away', np.where(is_home, 'Home', ''))
+    rink_side = np.where(is_away, sides['away_rink_side'].to_numpy(),
+                         np.where(is_home, sides['home_rink_side'].to_numpy(), ''))
+    df['rink_side'] = np.where(pd.isna(rink_side), '', rink_side)
 
+    return df
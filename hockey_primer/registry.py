@@ -0,0 +1,128 @@
+"""
+Named datasets of the milestone 2 models, read from the parquet datasets main.py writes (see
+ift6758.data.dataset) and only built when they are missing:
+
+    from registry import load_dataset
+    train = load_dataset('train_f2', columns=['Distance_from_net', 'angle_from_net', 'IsGoal'])
+
+A dataset is a set of partitions (seasons, game types) of the shots or games dataset: loading one reads only
+these partitions and the asked columns. If any of its partitions is missing, the games of its seasons and game
+types are tidied and featurized first (build_dataset, with the stage cache: only the games not cached are
+recomputed), and both their shots and games partitions are written.
+
+Importing this module does not import the pipeline (tidying, features): experiments that only read the
+datasets start without it.
+"""
+
+import os
+
+import pandas as pd
+
+from ift6758.data.dataset import read_dataset, write_dataset
+
+directory = "data"  # change this to your directory: run from root milestone2 dir
+
+# Parquet dataset of the shots of both sets, partitioned by season and game type
+dataset_path = os.path.join(directory, 'shots_f2')
+# Games table of both sets (dates, teams, duration: one row per gamePk, see ift6758.data.dataset.join_games)
+games_dataset_path = os.path.join(directory, 'games_f2')
+# Tidied plays and features of every game (see ift6758.data.stage_cache): rebuilds only recompute new or
+# changed games, and the stages whose code changed
+cache_dir = os.path.join(directory, 'stage_cache')
+# Rink sides of the games that are not in the sides table of the repo (milestone1_func.SIDES_PATH), inferred from
+# their shots as they are built (see ift6758.features.sides)
+sides_path = os.path.join(directory, 'period_1_sides.csv')
+
+dismiss = {'Winner_fullName',
+    'Winner_link', 'Loser_fullName', 'Loser_link', 'team_link', 'team_triCode', 'Hitter_id',
+    'Hitter_fullName', 'Hitter_link', 'Hittee_id', 'Hittee_fullName',
+    'Hittee_link', 'Shooter_id', 'Shooter_fullName', 'Shooter_link',
+    'Goalie_id', 'Goalie_fullName', 'Goalie_link', 'secondaryType',
+    'PlayerID_id', 'PlayerID_fullName', 'PlayerID_link', 'Blocker_id',
+    'Blocker_fullName', 'Blocker_link', 'PenaltyOn_id',
+    'PenaltyOn_fullName', 'PenaltyOn_link', 'DrewBy_id', 'DrewBy_fullName',
+    'DrewBy_link', 'ServedBy_id',
+    'ServedBy_fullName', 'ServedBy_link', 'Scorer_id', 'Scorer_fullName',
+    'Scorer_link', 'Assist_id', 'Assist_fullName', 'Assist_link',
+    'Unknown_id', 'Unknown_fullName', 'Unknown_link'}
+
+# name -> (dataset path, seasons, game types or None for all of them)
+DATASETS = {
+    # 2015/16 - 2018/19 regular season
+    'train_f2': (dataset_path, [2015, 2016, 2017, 2018], [2]),
+    # 2019/20 season  # TODO: SHOULD WE KEEP ONLY game_type == '02' AS IN training_set?
+    'test_f2': (dataset_path, [2019], None),
+    'train_games_f2': (games_dataset_path, [2015, 2016, 2017, 2018], [2]),
+    'test_games_f2': (games_dataset_path, [2019], None),
+}
+
+
+def _dataset(name):
+    if name not in DATASETS:
+        raise KeyError(f"unknown dataset {name!r} (one of {', '.join(DATASETS)})")
+    return DATASETS[name]
+
+
+def prefixes(name: str) -> list:
+    """gamePk prefixes of the games of a dataset: season (4 digits) + game type (2 digits) when it has game types"""
+    _, seasons, game_types = _dataset(name)
+    if game_types is None:
+        return [str(s) for s in seasons]
+    return [f'{s}{t:02d}' for s in seasons for t in game_types]
+
+
+def is_built(name: str) -> bool:
+    """Whether all the partitions of a dataset are written"""
+    path, seasons, game_types = _dataset(name)
+    for s in seasons:
+        season_dir = os.path.join(path, f'season={s}')
+        if not os.path.isdir(season_dir):
+            return False
+        if game_types is not None and not all(os.path.isdir(os.path.join(season_dir, f'game_type={t}'))
+                                              for t in game_types):
+            return False
+    return True
+
+
+def build_shots(prefixes):
+    # Imported here: only building needs the pipeline
+    from feature_engineering_1 import tidy_data_parallel
+    from feature_engineering_2 import add_features2
+    from milestone1_func import PLAY_SCHEMA
+
+    # The dismissed play columns are never extracted from the raw games
+    play_columns = [c for c in PLAY_SCHEMA if c not in dismiss]
+
+    # Games are tidied and featurized in parallel, chunk by chunk (add_features2 only looks at one game at a
+    # time): each worker only holds one chunk of raw games and only sends back the SHOT/GOAL rows.
+    # schema='statsapi' skips the parts of the raw json we don't use (player names and links are dismissed anyway)
+    shots, games = tidy_data_parallel(directory, prefixes, features=add_features2, event_types={'SHOT', 'GOAL'},
+                                      schema='statsapi', columns=play_columns, cache_dir=cache_dir, with_games=True,
+                                      sides_path=sides_path)
+    return shots[[t for t in shots.columns if t not in dismiss]], games
+
+
+def build_dataset(name: str):
+    """
+    Builds the games of a dataset from the raw games in `directory` and writes their shots and games
+    partitions (replacing them if they exist). Returns (shots, games indexed by gamePk).
+    """
+    shots, games = build_shots(prefixes(name))
+    write_dataset(shots, dataset_path)
+    write_dataset(games.reset_index(), games_dataset_path)
+    return shots, games
+
+
+def load_dataset(name: str, columns: list = None, rebuild: bool = False) -> pd.DataFrame:
+    """
+    Reads a dataset of DATASETS, built first if any of its partitions is missing.
+
+    Args:
+        name (str): The dataset, e.g. 'train_f2'.
+        columns (list): Columns to read (all of them by default).
+        rebuild (bool): Build it again even if it is written (e.g. after new games were downloaded).
+    """
+    path, seasons, game_types = _dataset(name)
+    if rebuild or not is_built(name):
+        build_dataset(name)
+    return read_dataset(path, columns=columns, seasons=seasons, game_types=game_types)
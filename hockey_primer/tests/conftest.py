@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scripts of hockey_primer and the ift6758 package, as when running from the root milestone2 dir
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(root, 'Milestone-3', 'ift6758'), root):
+    if path not in sys.path:
+        sys.path.insert(0, path)
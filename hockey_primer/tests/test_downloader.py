@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from ift6758.data.downloader import Downloader
+from benchmarks.stand_in_server import StandInServer
+
+
+@pytest.fixture
+def server():
+    server = StandInServer(n_events=20).start()
+    yield server
+    server.stop()
+
+
+def game_urls(server, n_games=12):
+    game_ids = server.season_game_ids('20162017')[:n_games]
+    return {g: f'{server.statsapi_url}game/{g}/feed/live' for g in game_ids}
+
+
+def test_fetch_many_retries_rate_limited_and_failed_requests(server):
+    server.error_rate = 0.3
+    urls = game_urls(server)
+
+    results = Downloader(max_workers=4, rate=0, max_retries=10, backoff=0.001).fetch_many(urls)
+
+    assert sorted(results) == sorted(urls)
+    assert all(game['gamePk'] == g for g, game in results.items())
+
+
+def test_fetch_many_keeps_the_other_results_when_a_request_or_its_handler_fails(server):
+    urls = game_urls(server)
+    failing = list(urls)[3]
+    urls[0] = f'{server.statsapi_url}game/0/feed/live'  # 404
+
+    def handle(key, response):
+        if key == failing:
+            raise ValueError('truncated body')
+        return response.json()['gamePk']
+
+    results = Downloader(max_workers=4, rate=0).fetch_many(urls, handle=handle)
+
+    assert sorted(results) == sorted(k for k in urls if k not in (0, failing))
+    assert all(results[k] == k for k in results)
+
+
+def test_fetch_many_reports_progress_and_time_left(server, caplog):
+    urls = game_urls(server, n_games=6)
+
+    with caplog.at_level(logging.INFO, logger='ift6758.data.downloader'):
+        Downloader(max_workers=1, rate=0).fetch_many(urls, desc='games', progress_every=0)
+
+    lines = [r.getMessage() for r in caplog.records if r.getMessage().startswith('games: ')]
+    assert len(lines) == len(urls) + 1  # one per request, and the final summary
+    assert all('req/s' in line for line in lines)
+    assert 's left' in lines[0] and 's left' not in lines[-1]
+    assert lines[-1].startswith(f'games: {len(urls)}/{len(urls)} done, 0 failed')
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import IncrementalFeatures2, add_features2
+from benchmarks.synthetic import make_games
+
+
+@pytest.fixture(scope='module')
+def plays():
+    plays = pd.concat(tidy_data_batches(make_games(3, penalty_weight=10)), ignore_index=True)
+    return plays.sort_values(['gamePk', 'game_seconds'], kind='stable')
+
+
+def polls(plays, poll_size):
+    # poll of each play: poll_size seconds of the game clock with plays at a time, so that the plays of a same second
+    # (and the penalties given at it) are in the same poll
+    second = plays.groupby('gamePk')['game_seconds'].rank(method='dense').astype(int) - 1
+    return second // poll_size
+
+
+@pytest.mark.parametrize('poll_size', [5, 60])
+def test_incremental_features_are_the_full_recompute(plays, poll_size):
+    poll = polls(plays, poll_size)
+    assert (plays['eventTypeId'] == 'PENALTY').sum() > 10
+
+    engine = IncrementalFeatures2()
+    for i in range(poll.max() + 1):
+        features = engine.update(plays[poll == i])
+        expected = add_features2(plays[poll <= i]).loc[features.index]
+        # same values (the categories and smallest dtypes of a poll depend on its plays, see ift6758.data.dtypes)
+        pd.testing.assert_frame_equal(features, expected, check_dtype=False, check_categorical=False,
+                                      obj=f'poll {i}')
+
+
+def test_incremental_state_only_keeps_what_later_plays_depend_on(plays):
+    engine = IncrementalFeatures2()
+    engine.update(plays)
+
+    assert list(engine.last_events.index) == sorted(plays['gamePk'].unique())
+    last_seconds = engine.last_events['game_seconds'].reindex(engine.penalties['gamePk']).to_numpy()
+    assert (engine.penalties['end'].to_numpy() > last_seconds).all()
+    assert engine.powerplays['gamePk'].is_unique
+
+
+def test_incremental_features_reject_plays_before_the_previous_updates(plays):
+    game = plays[plays['gamePk'] == plays['gamePk'].iloc[0]]
+    engine = IncrementalFeatures2()
+    engine.update(game.iloc[10:])
+
+    with pytest.raises(ValueError):
+        engine.update(game.iloc[:10])
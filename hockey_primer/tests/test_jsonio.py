@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+import pytest
+
+from ift6758.data import jsonio
+from milestone1_func import extract_plays
+from benchmarks.synthetic import make_games
+
+pytest.importorskip('msgspec')
+
+
+def malformed_games():
+    # a shot whose shooter has no id, and a play with a null team and null coordinates
+    first, second = make_games(2)
+    shot = next(p for p in first['liveData']['plays']['allPlays'] if p['result']['eventTypeId'] == 'SHOT')
+    del shot['players'][0]['player']['id']
+    play = second['liveData']['plays']['allPlays'][5]
+    play['team'], play['coordinates'] = None, None
+    return [json.dumps(g).encode() for g in (first, second)]
+
+
+def test_typed_decode_tolerates_plays_outside_of_the_schema():
+    raws = malformed_games()
+
+    typed = [jsonio.loads(raw, schema='statsapi') for raw in raws]
+    full = [json.loads(raw) for raw in raws]
+
+    assert [g['gamePk'] for g in typed] == [g['gamePk'] for g in full]
+    pd.testing.assert_frame_equal(extract_plays(typed, keep_all_events=True),
+                                  extract_plays(full, keep_all_events=True))
+
+
+def test_typed_decode_skips_the_fields_the_tidy_functions_do_not_read():
+    raw = json.dumps(next(iter(make_games(1)))).encode()
+    typed = jsonio.loads(raw, schema='statsapi')
+    assert 'boxscore' not in typed['liveData'] and 'players' not in typed['gameData']
@@ -0,0 +1,66 @@
+import pytest
+import requests
+
+from ift6758.data.manifest import Manifest, fetch_schedule
+
+
+class StubDownloader:
+    def __init__(self, response=None, error=None):
+        self.response, self.error = response, error
+        self.headers = []
+
+    def get(self, url, headers=None):
+        self.headers.append(headers)
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+def response(status_code, headers=None):
+    r = requests.Response()
+    r.status_code = status_code
+    r.headers.update(headers or {})
+    return r
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = Manifest(str(tmp_path / 'manifest.sqlite'))
+    manifest.set_schedule('20162017', {2016020001: 'Final', 2016020002: 'Preview'}, fetched_at=0,
+                          etag='"v1"', last_modified='Sat, 01 Oct 2016 00:00:00 GMT')
+    yield manifest
+    manifest.close()
+
+
+def test_fetch_schedule_falls_back_to_the_saved_schedule_on_request_errors(manifest):
+    downloader = StubDownloader(error=requests.ConnectionError('connection reset'))
+
+    schedule = fetch_schedule('20162017', manifest, downloader=downloader, ttl=0)
+
+    assert schedule == {2016020001: 'Final', 2016020002: 'Preview'}
+    assert downloader.headers == [{'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 01 Oct 2016 00:00:00 GMT'}]
+    assert fetch_schedule('20172018', manifest, downloader=downloader, ttl=0) == {}
+
+
+def test_fetch_schedule_keeps_the_saved_validators_on_a_304_without_them(manifest):
+    downloader = StubDownloader(response(304))
+
+    schedule = fetch_schedule('20162017', manifest, downloader=downloader, ttl=0)
+
+    assert schedule == {2016020001: 'Final', 2016020002: 'Preview'}
+    saved = manifest.get_schedule('20162017')
+    assert saved['fetched_at'] > 0
+    assert (saved['etag'], saved['last_modified']) == ('"v1"', 'Sat, 01 Oct 2016 00:00:00 GMT')
+
+    fetch_schedule('20162017', manifest, downloader=downloader, ttl=0)
+    assert downloader.headers[-1] == downloader.headers[0]
+
+
+def test_default_manifest_creates_the_data_directory(tmp_path, monkeypatch):
+    import milestone1_func
+
+    monkeypatch.setattr(milestone1_func, 'directory', str(tmp_path / 'data'))
+
+    with milestone1_func._manifest() as manifest:
+        assert manifest.get_schedule('20162017') is None
+    assert (tmp_path / 'data' / 'manifest.sqlite').exists()
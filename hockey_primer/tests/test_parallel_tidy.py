@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from feature_engineering_1 import tidy_data, tidy_data_parallel
+from feature_engineering_2 import add_features2
+from ift6758.data.dtypes import compact
+from ift6758.data.raw_store import PackedStore
+from benchmarks.synthetic import make_games
+
+
+@pytest.fixture(scope='module')
+def games(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('raw'))
+    store = PackedStore(directory)
+    games = sorted(make_games(7), key=lambda g: g['gamePk'])
+    for game in reversed(games):
+        store.put(game['gamePk'], game)
+    return directory, games
+
+
+@pytest.mark.parametrize('n_workers, chunk_size', [(1, 50), (1, 2), (2, 3)])
+def test_parallel_tidy_is_the_serial_tidy(games, n_workers, chunk_size):
+    directory, raw_games = games
+    serial = compact(tidy_data(pd.DataFrame(raw_games)))
+
+    tidied = tidy_data_parallel(directory, n_workers=n_workers, chunk_size=chunk_size)
+
+    assert tidied.equals(serial)
+    assert list(tidied.columns) == list(serial.columns)
+
+
+@pytest.mark.parametrize('n_workers, chunk_size', [(1, 50), (2, 3)])
+def test_parallel_features_are_the_serial_features(games, n_workers, chunk_size):
+    directory, raw_games = games
+    serial = add_features2(tidy_data(pd.DataFrame(raw_games)))
+    serial = serial[serial['eventTypeId'].isin({'SHOT', 'GOAL'})]
+
+    tidied = tidy_data_parallel(directory, n_workers=n_workers, chunk_size=chunk_size, features=add_features2,
+                                event_types={'SHOT', 'GOAL'})
+
+    assert tidied.equals(compact(serial))
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import add_features2
+from ift6758.features.strength import PowerplayWindows
+from benchmarks.powerplay import previous_time_since_powerplay, windows_time_since_powerplay
+from benchmarks.synthetic import make_games
+
+
+@pytest.mark.parametrize('penalty_weight', [3, 30])
+def test_powerplay_windows_are_the_previous_loop(penalty_weight):
+    # more penalties give more overlapping ones, chained back to the first of them
+    plays = pd.concat(tidy_data_batches(make_games(3, penalty_weight=penalty_weight)), ignore_index=True)
+
+    previous = previous_time_since_powerplay(plays).astype(float)
+    current = windows_time_since_powerplay(plays)
+
+    penalties = (plays['eventTypeId'] == 'PENALTY') & plays['team_id'].notna()
+    assert len(PowerplayWindows.from_plays(plays).starts) < penalties.sum()  # windows of overlapping penalties
+    assert np.isfinite(current).any()
+    assert np.array_equal(current, previous, equal_nan=True)
+
+    features = add_features2(plays)['time_since_powerplay'].reindex(plays.index).to_numpy()
+    assert np.array_equal(features, previous.astype(features.dtype), equal_nan=True)
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import add_features2
+from ift6758.data.dtypes import compact
+from benchmarks.previous_event import ROW_WISE, previous_event_columns
+from benchmarks.synthetic import make_games
+
+
+@pytest.fixture(scope='module')
+def plays():
+    return pd.concat(tidy_data_batches(make_games(3)), ignore_index=True)
+
+
+@pytest.fixture(scope='module')
+def row_wise(plays):
+    # the previous df.apply(..., axis=1) features, with the dtype policy add_features2 applies
+    previous = previous_event_columns(plays)
+    for name, feature in ROW_WISE.items():
+        previous[name] = feature(previous)
+    return previous, compact(previous[list(ROW_WISE)])
+
+
+@pytest.fixture(scope='module')
+def features(plays):
+    return add_features2(plays)
+
+
+@pytest.mark.parametrize('name', list(ROW_WISE))
+def test_previous_event_features_are_the_row_wise_features(row_wise, features, name):
+    previous, expected = row_wise
+
+    # the "MM:SS" strings gave a negative time to the first event of a period, the game clock the time since the
+    # last event of the previous period
+    compared = previous['same_period'] if name in ('time_from_last_event', 'speed') else slice(None)
+    result = features.loc[previous.index, name][compared]
+    assert result.dtype == expected[name].dtype
+    assert result.equals(expected.loc[compared, name])
+
+
+def test_first_events_of_a_period_count_the_time_since_the_previous_period(row_wise, features):
+    previous, _ = row_wise
+    features = features.loc[previous.index]
+
+    first = previous['same_period'].eq(False) & previous['last_game_seconds'].notna()
+    assert first.any()
+    expected = previous.loc[first, 'game_seconds'] - previous.loc[first, 'last_game_seconds']
+    assert (features.loc[first, 'time_from_last_event'] == expected).all()
+    assert (features.loc[first, 'time_from_last_event'] >= 0).all()
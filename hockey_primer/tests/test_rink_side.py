@@ -0,0 +1,37 @@
+import pandas as pd
+
+from milestone1_func import PlayExtractor, add_home_away_rink_side_columns, game_index
+from benchmarks.rink_side import previous_add_home_away_rink_side_columns
+from benchmarks.synthetic import make_games
+
+
+def synthetic_plays(n_games=3):
+    extractor = PlayExtractor(keep_all_events=True)
+    for game in make_games(n_games):
+        extractor.add_game(game)
+    plays = extractor.to_frame()
+    # a team that is not in the sides table, and plays without team
+    plays.loc[plays.index[::17], 'team_name'] = 'Unknown Team'
+    plays.loc[plays.index[::13], ['team_name', 'team_id']] = None
+    return plays, extractor.games_frame()
+
+
+def test_rink_side_is_the_row_wise_rink_side():
+    plays, _ = synthetic_plays()
+    expected = previous_add_home_away_rink_side_columns(plays.copy())['rink_side']
+    rink_side = add_home_away_rink_side_columns(plays.copy())['rink_side']
+
+    known = plays['team_name'].notna() & (plays['team_name'] != 'Unknown Team')
+    assert known.any() and (~known).any()
+    assert rink_side[known].equals(expected[known])
+    # the row-wise version flipped the NaN of unknown teams to 'left' on even periods
+    assert rink_side[~known].isna().all()
+
+
+def test_rink_side_from_the_game_index_is_the_same():
+    plays, games = synthetic_plays()
+    plays = plays[plays['team_name'] != 'Unknown Team']
+    by_name = add_home_away_rink_side_columns(plays.copy())['rink_side']
+    by_index = add_home_away_rink_side_columns(plays.copy(), game_index(games))['rink_side']
+    pd.testing.assert_series_equal(pd.Series(by_index, index=plays.index, dtype=object, name='rink_side'),
+                                   by_name.astype(object))
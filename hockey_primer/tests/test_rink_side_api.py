@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from milestone1_func import add_home_away_rink_side_columns_api, extract_plays, game_info_table
+from ift6758.client.ift6758_milestone3 import add_features, game_table
+from ift6758.data.linescores import lookup_linescores
+from ift6758.data.manifest import Manifest
+from benchmarks.rink_side_api import make_game_info_list, previous_add_home_away_rink_side_columns_api
+from benchmarks.synthetic import make_games
+
+
+def game_info(game_info_list, source, tmp_path):
+    # the game_info_list as is, as a game_info_table, or saved in a manifest and read back as a table
+    if source == 'list':
+        return game_info_list
+    if source == 'table':
+        return game_info_table(game_info_list)
+
+    manifest = Manifest(str(tmp_path / 'manifest.sqlite'))
+    games = [(g['Game PK'], g['Away Team Name'], g['Home Team Name']) for g in game_info_list]
+    periods = [(g['Game PK'], p['Period'], p['Home Rink Side'], p['Away Rink Side'])
+               for g in game_info_list for p in g['Periods Info']]
+    manifest.set_linescores('20162017', games, periods, fetched_at=0, complete=True)
+    table = lookup_linescores(manifest, [g for g, _, _ in games])
+    manifest.close()
+    return table
+
+
+@pytest.mark.parametrize('source', ['list', 'table', 'manifest'])
+def test_rink_side_api_is_the_previous_rink_side(source, tmp_path):
+    # missing periods, a game without any period, 'N/A' sides, a game listed twice and a team that is not in the game
+    games = list(make_games(4))
+    game_info_list = make_game_info_list(games, seed=2)  # with a missing period and 'N/A' sides
+    game_info_list[1] = dict(game_info_list[1], **{'Periods Info': []})
+    plays = extract_plays(games, columns=['gamePk', 'team_name', 'period'], keep_all_events=True)
+    plays.loc[plays.index[::23], 'team_name'] = 'Unknown Team'
+
+    expected = plays.copy()
+    previous_add_home_away_rink_side_columns_api(expected, game_info_list)
+    result = add_home_away_rink_side_columns_api(plays.copy(), game_info(game_info_list, source, tmp_path))
+
+    for c in ['home_or_away', 'rink_side']:
+        assert (result[c].to_numpy() == expected[c].to_numpy()).all(), c
+    assert set(result['home_or_away']) == {'Away', 'Home', ''}
+    assert {'', 'N/A', 'left', 'right'} <= set(result['rink_side'])
+    # the plays of the game without periods are still told Home / Away, without a rink side
+    no_periods = result[result['gamePk'] == game_info_list[1]['Game PK']]
+    assert set(no_periods['home_or_away']) >= {'Away', 'Home'} and set(no_periods['rink_side']) == {''}
+
+
+def web_shots():
+    # api-web shots of one game (away team 10, home team 20), with the rink side of each team in each period known
+    # from its shots in the offensive / defensive zones, and neutral zone shots
+    games = game_table([{
+        'gamePk': 2023020001, 'gameDateTime': '2023-10-10T23:00:00Z',
+        'awayTeamId': 10, 'awayTeamName': 'Away', 'awayTeamAbbrev': 'AWY',
+        'homeTeamId': 20, 'homeTeamName': 'Home', 'homeTeamAbbrev': 'HOM',
+    }])
+    columns = ['period', 'eventOwnerTeamId', 'xCoord', 'yCoord', 'zoneCode']
+    shots = pd.DataFrame([
+        (1, 10, -70, 5, 'O'),    # away: right in period 1
+        (1, 20, -60, -8, 'D'),   # home: left in period 1
+        (1, 20, 10, 3, 'N'),     # home, neutral zone: left
+        (1, 10, -5, 12, 'N'),    # away, neutral zone: right
+        (2, 20, 65, 0, 'D'),     # home: right in period 2
+        (2, 10, 15, -4, 'N'),    # away, neutral zone, no other shot in period 2: the other side than home
+    ], columns=columns)
+    shots.insert(0, 'gamePk', 2023020001)
+    shots['typeDescKey'] = 'shot-on-goal'
+    shots['situationCode'] = '1551'
+    return shots, games
+
+
+def test_neutral_zone_shots_get_the_side_of_their_team_in_the_period():
+    shots, games = web_shots()
+    features = add_features(shots.copy(), games)
+
+    assert list(features['rinkSide'].astype(object)) == ['right', 'left', 'left', 'right', 'right', 'left']
+    # the neutral zone shots are then measured from the net their team attacks
+    neutral = features['zoneCode'] == 'N'
+    assert features.loc[neutral, 'distanceFromNet'].notna().all()
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from ift6758.features.shot_cube import ShotCube
+
+
+def shots(n=5000, seed=0):
+    # shots of 2 seasons, with distances past the last edge (bad coordinates), shots on an edge and missing angles
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'gamePk': rng.choice([2015020001, 2015020002, 2016020001, 2016020002], n),
+        'Distance_from_net': rng.gamma(4, 12, n).round(1),
+        'angle_from_net': rng.uniform(0, 90, n),
+        'IsGoal': (rng.random(n) < 0.1).astype(int),
+        'emptyNet': (rng.random(n) < 0.05).astype(float),
+    })
+    df.loc[df.index[::97], 'Distance_from_net'] = 250.0
+    df.loc[df.index[::89], 'Distance_from_net'] = 200.0
+    df.loc[df.index[::61], 'angle_from_net'] = np.nan
+    df.loc[df.index[::53], 'angle_from_net'] = 90.0
+    return df
+
+
+def expected_counts(df, cube):
+    # direct groupby of the shots in the bins of the cube (right edge of the last bin included, as np.histogram)
+    distance = pd.cut(df['Distance_from_net'], cube.distance_edges, right=False, labels=False)
+    distance[df['Distance_from_net'] == cube.distance_edges[-1]] = len(cube.distance_edges) - 2
+    angle = pd.cut(df['angle_from_net'], cube.angle_edges, right=False, labels=False)
+    angle[df['angle_from_net'] == cube.angle_edges[-1]] = len(cube.angle_edges) - 2
+    binned = pd.DataFrame({'season': df['gamePk'] // 1000000, 'distance': distance, 'angle': angle,
+                           'IsGoal': df['IsGoal']}).dropna()
+    return binned.groupby(['season', 'distance', 'angle', 'IsGoal']).size()
+
+
+def test_cube_counts_are_the_groupby_counts():
+    df = shots()
+    cube = ShotCube.from_frame(df)
+
+    counts = cube.select(('season', 'distance', 'angle', 'is_goal'))
+    cells = np.nonzero(counts)
+    seasons = np.array(cube.seasons)[cells[0]]
+    actual = pd.Series(counts[cells], index=pd.MultiIndex.from_arrays([seasons, *cells[1:]]))
+    expected = expected_counts(df, cube)
+
+    assert actual.to_dict() == expected.to_dict()
+    # the shots past the last edge and the missing angles are only counted with the missing values
+    outside = (df['Distance_from_net'] > 200) | df['angle_from_net'].isna()
+    assert counts.sum() == (~outside).sum()
+    assert cube.select(('season',), with_missing=True).sum() == len(df)
+
+
+def test_update_skips_the_counted_games():
+    df = shots()
+    cube = ShotCube.from_frame(df[df['gamePk'] < 2016000000])
+
+    assert cube.update(df) == (df['gamePk'] > 2016000000).sum()
+    assert cube.update(df) == 0
+    assert (cube.counts == ShotCube.from_frame(df).counts).all()
+
+
+def test_a_cube_of_another_version_is_counted_again(tmp_path):
+    path = str(tmp_path / 'cube.npz')
+    df = shots()
+    cube = ShotCube.open(path, 'v1')
+    cube.update(df)
+    cube.save(path)
+
+    reopened = ShotCube.open(path, 'v1')
+    assert reopened.update(df) == 0 and (reopened.counts == cube.counts).all()
+
+    edited = ShotCube.open(path, 'v2')
+    assert edited.version == 'v2' and not edited.counts.any()
+    assert edited.update(df) == len(df)
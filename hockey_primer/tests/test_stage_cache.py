@@ -0,0 +1,84 @@
+import importlib.util
+import sys
+import textwrap
+
+import pytest
+
+from feature_engineering_1 import tidy_data_parallel
+from feature_engineering_2 import add_features2
+from ift6758.data.raw_store import PackedStore
+from ift6758.data.stage_cache import StageCache, code_version, stage_key
+from benchmarks.synthetic import make_games
+
+
+STAGE = '''
+SCALE = {scale}
+_cache = dict()
+
+
+class Scaler:
+    def scale(self, x):
+        return x * {factor}
+
+
+def stage(x, scaler):
+    _cache[x] = x
+    return scaler.scale(x) + SCALE
+'''
+
+
+def load_stage(directory, scale=2, factor=3):
+    # a fresh module 'stage_module' with these constants, as if its file had been edited
+    directory.mkdir()
+    path = directory / 'stage_module.py'
+    path.write_text(textwrap.dedent(STAGE.format(scale=scale, factor=factor)))
+    spec = importlib.util.spec_from_file_location('stage_module', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['stage_module'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_editing_a_constant_invalidates_the_cache(tmp_path):
+    module = load_stage(tmp_path / 'before')
+    cache = StageCache(str(tmp_path / 'cache'))
+    cache.put('stage', 1, stage_key('raw', code_version(module.stage)), module.stage(1, module.Scaler()))
+
+    assert cache.get('stage', 1, stage_key('raw', code_version(module.stage))) == 5
+
+    edited = load_stage(tmp_path / 'after', scale=4)
+    assert cache.get('stage', 1, stage_key('raw', code_version(edited.stage))) is None
+
+
+def test_editing_a_method_called_on_an_argument_changes_the_version(tmp_path):
+    before = code_version(load_stage(tmp_path / 'before').stage)
+    after = code_version(load_stage(tmp_path / 'after', factor=4).stage)
+    assert before != after
+
+
+def test_runtime_caches_do_not_change_the_version(tmp_path):
+    module = load_stage(tmp_path / 'before')
+    version = code_version(module.stage)
+    module.stage(1, module.Scaler())
+    assert code_version(module.stage) == version
+    assert code_version(load_stage(tmp_path / 'again').stage) == version
+
+
+@pytest.mark.parametrize('features', [None, add_features2])
+def test_cached_runs_are_the_uncached_run(tmp_path, features):
+    # cold cache, warm cache, then one new game: the cached games keep the categories of the run that computed them,
+    # the uncached run (one chunk) the categories of all the plays of the chunk
+    store = PackedStore(str(tmp_path / 'raw'))
+    games = list(make_games(7))
+    for game in games[:-1]:
+        store.put(game['gamePk'], game)
+
+    def run(cache_dir=None):
+        return tidy_data_parallel(store, features=features, event_types={'SHOT', 'GOAL'}, n_workers=1,
+                                  cache_dir=cache_dir)
+
+    for before in [None, None, lambda: store.put(games[-1]['gamePk'], games[-1])]:
+        if before is not None:
+            before()
+        shots = run(str(tmp_path / 'cache'))
+        assert shots.equals(run())
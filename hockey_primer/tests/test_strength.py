@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering_1 import tidy_data_batches
+from feature_engineering_2 import add_features2
+from ift6758.features.strength import opposing_team
+from benchmarks.strength import brute_force_n_players, previous_n_players, timeline_n_players
+from benchmarks.synthetic import make_games
+
+
+@pytest.fixture(scope='module')
+def plays():
+    return pd.concat(tidy_data_batches(make_games(4, penalty_weight=8)), ignore_index=True)
+
+
+def carried_over(df):
+    # plays while a penalty of an earlier period of their game is running, for their team or the other one
+    penalties = df[df['eventTypeId'] == 'PENALTY']
+    carried = np.zeros(len(df), dtype=bool)
+    for team in (df['team_id'].to_numpy(), opposing_team(df['gamePk'], df['team_id'])):
+        for p in penalties.itertuples():
+            end = p.game_seconds + p.penaltyMinutes * 60
+            carried |= ((df['gamePk'].to_numpy() == p.gamePk) & (team == p.team_id) &
+                        (df['period'].to_numpy() > p.period) & (df['game_seconds'].to_numpy() < end))
+    return carried
+
+
+def test_timeline_is_the_brute_force_count(plays):
+    current = timeline_n_players(plays)
+    expected = brute_force_n_players(plays)
+
+    for c, e in zip(current, expected):
+        assert c.dtype == np.int8 and np.array_equal(c, e)
+    assert (current[0] < 5).any() and (current[1] < 5).any()
+
+
+def test_timeline_is_the_previous_scan_but_for_penalties_carried_over_a_period(plays):
+    current = timeline_n_players(plays)
+    previous = previous_n_players(plays)
+
+    # the scan ended every penalty with its period
+    changed = (current[0] != previous[0]) | (current[1] != previous[1])
+    assert changed.any() and np.array_equal(changed, carried_over(plays))
+
+
+def test_add_features2_strength_is_the_brute_force_count(plays):
+    features = add_features2(plays)
+    expected = brute_force_n_players(plays)
+
+    for column, e in zip(['n_players', 'n_opposing_players'], expected):
+        assert np.array_equal(features[column].reindex(plays.index).to_numpy(), e), column